@@ -0,0 +1,146 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from Crypto.Random import get_random_bytes
+from lib.metrics import timed
+from lib.session import (
+    CLOSE, DATA, FRAME_HEADER, HELLO, KEY, NONCE_SIZE, REJECT, RESUME, RESUME_OK, SESSION_ID_SIZE,
+    ProtocolError, SessionCache, decode_frame_header, derive_cipher, encode_frame, expect,
+    resume_salt, server_handshake,
+)
+
+STOP_POLL_INTERVAL = 0.25 # seconds between checks of the stop event
+
+# read one length-prefixed frame, returns (type, payload)
+async def read_frame(reader, timeout):
+    header = await asyncio.wait_for(reader.readexactly(FRAME_HEADER.size), timeout)
+    length, frame_type = decode_frame_header(header)
+    payload = await asyncio.wait_for(reader.readexactly(length), timeout)
+    return frame_type, payload
+
+# write one frame and wait for the transport buffer to drain
+async def write_frame(writer, frame_type, payload, timeout):
+    writer.write(encode_frame(frame_type, payload))
+    await asyncio.wait_for(writer.drain(), timeout)
+
+# full rsa handshake work (runs in executor, off the event loop)
+@timed("net.server_handshake")
+def _handshake_for_client(rsa_handler, client_public_key_pem):
+    client_public_key = rsa_handler.import_key(client_public_key_pem)
+    return server_handshake(client_public_key)
+
+# establish a session key with the client, resuming a cached session when possible
+async def _accept_session(reader, writer, rsa_handler, sessions, handshake_slots, executor, timeout, stats, compress):
+    frame_type, payload = await read_frame(reader, timeout)
+
+    if frame_type == RESUME:
+        master_secret = sessions.get(payload[:SESSION_ID_SIZE])
+        if master_secret is not None: # known session, no rsa needed
+            server_nonce = get_random_bytes(NONCE_SIZE)
+            await write_frame(writer, RESUME_OK, server_nonce, timeout)
+            stats["resumed"] += 1
+            return derive_cipher(master_secret, resume_salt(payload[SESSION_ID_SIZE:], server_nonce), is_server=True, compress=compress)
+        await write_frame(writer, REJECT, b"", timeout)
+        frame_type, payload = await read_frame(reader, timeout) # client retries with HELLO
+
+    client_public_key_pem = expect((frame_type, payload), HELLO)
+    async with handshake_slots: # cap concurrent rsa handshakes
+        loop = asyncio.get_running_loop()
+        session_id, master_secret, key_payload = await loop.run_in_executor(
+            executor, _handshake_for_client, rsa_handler, client_public_key_pem
+        )
+    sessions.store(session_id, master_secret)
+    await write_frame(writer, KEY, key_payload, timeout)
+    return derive_cipher(master_secret, session_id, is_server=True, compress=compress)
+
+# serve one client: handshake, send message, then answer client messages on the same session
+async def _handle_client(reader, writer, rsa_handler, message, sessions, handshake_slots, executor, timeout, session_timeout, stats, on_event, compress):
+    addr = writer.get_extra_info("peername")
+    try:
+        channel = await _accept_session(reader, writer, rsa_handler, sessions, handshake_slots, executor, timeout, stats, compress)
+        await write_frame(writer, DATA, channel.seal(message.encode()), timeout)
+        stats["served"] += 1
+        on_event(f"encrypted message sent to {addr}")
+
+        while True:
+            try:
+                frame_type, payload = await read_frame(reader, session_timeout) # peer may idle between messages
+            except asyncio.IncompleteReadError as e:
+                if e.partial: # eof in the middle of a frame
+                    raise
+                break # clean eof between frames
+            if frame_type == CLOSE:
+                break
+            incoming = channel.open(expect((frame_type, payload), DATA))
+            stats["messages"] += 1
+            on_event(f"{addr}: {incoming.decode(errors='replace')}")
+            await write_frame(writer, DATA, channel.seal(f"received {len(incoming)} bytes".encode()), timeout)
+    except asyncio.TimeoutError:
+        stats["failed"] += 1
+        on_event(f"err: timeout waiting for {addr}")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        stats["failed"] += 1
+        on_event(f"err: {addr} disconnected mid-frame")
+    except ProtocolError as e:
+        stats["failed"] += 1
+        on_event(f"err: protocol error from {addr}: {str(e)}")
+    except Exception as e: # bad key, encryption failure
+        stats["failed"] += 1
+        on_event(f"err serving {addr}: {str(e)}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+# run key-exchange server for many concurrent clients.
+# compress is off by default: compressing attacker-influenced messages before aes-gcm leaks them through length
+async def serve(rsa_handler, host, port, message, max_handshakes=64, timeout=10, session_timeout=300,
+                idle_timeout=None, executor=None, sessions=None, on_event=None, stop=None, compress=None):
+    on_event = on_event or (lambda _msg: None)
+    sessions = sessions if sessions is not None else SessionCache()
+    stats = {"served": 0, "failed": 0, "active": 0, "connections": 0, "resumed": 0, "messages": 0}
+    handshake_slots = asyncio.Semaphore(max_handshakes)
+    own_executor = executor is None
+    executor = executor or ThreadPoolExecutor() # rsa math releases the gil in native code
+    last_activity = asyncio.Event()
+
+    async def on_connect(reader, writer):
+        stats["connections"] += 1
+        stats["active"] += 1
+        last_activity.set()
+        try:
+            await _handle_client(
+                reader, writer, rsa_handler, message, sessions, handshake_slots, executor, timeout, session_timeout, stats, on_event, compress
+            )
+        finally:
+            stats["active"] -= 1
+            last_activity.set()
+
+    server = await asyncio.start_server(on_connect, host, port, backlog=max(128, max_handshakes))
+    on_event(f"server listening on {host}:{port}")
+    try:
+        async with server:
+            if idle_timeout is None and stop is None:
+                await server.serve_forever()
+            else: # stop after idle_timeout seconds with no connection activity, or once stop is set
+                loop = asyncio.get_running_loop()
+                poll = STOP_POLL_INTERVAL if stop is not None else idle_timeout
+                idle_since = loop.time()
+                while stop is None or not stop.is_set():
+                    last_activity.clear()
+                    try:
+                        await asyncio.wait_for(last_activity.wait(), poll)
+                        idle_since = loop.time()
+                    except asyncio.TimeoutError:
+                        idle = loop.time() - idle_since
+                        if idle_timeout is not None and idle >= idle_timeout and stats["active"] == 0:
+                            break
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+    return stats
+
+# blocking wrapper for callers outside asyncio
+def run_server(rsa_handler, host, port, message, **kwargs):
+    return asyncio.run(serve(rsa_handler, host, port, message, **kwargs))
@@ -0,0 +1,266 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from Crypto.Hash import SHA256
+from Crypto.Signature import pss
+from lib.batch import BatchPool
+from lib.keycache import key_cache
+from lib.multiprime import max_primes
+from lib.rsa import RSAHandler
+
+DEFAULT_KEY_SIZES = [1024, 2048, 3072, 4096]
+DEFAULT_PAYLOAD_SIZES = [16, 64, 190] # bytes, capped per key size at the oaep limit
+DEFAULT_FILE_SIZES = [64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+DEFAULT_PRIMES = [2, 3, 4] # prime counts compared for private-key ops, capped per key size
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_TOLERANCE = 0.10 # allowed ops/s drop before a case counts as a regression
+
+# largest plaintext pkcs1 oaep (sha-1) accepts for a key
+def oaep_max_payload(key_size):
+    return key_size // 8 - 2 * 20 - 2
+
+# time func() iterations times, returns per-call latencies in seconds
+def measure(func, iterations, warmup=1):
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+# nearest-rank percentile of sorted samples
+def percentile(sorted_samples, fraction):
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+# turn latencies into a result record, ops counts operations per call (batch size)
+def summarize(name, params, latencies, ops=1):
+    samples = sorted(latencies)
+    total = sum(samples)
+    return {
+        "name": name,
+        "params": params,
+        "iterations": len(samples),
+        "ops_per_s": (len(samples) * ops) / total if total else float("inf"),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+    }
+
+# stable id used to match cases against a baseline
+def case_id(result):
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+# benchmark every RSAHandler operation for one key size
+def bench_key_size(key_size, args, workdir):
+    results = []
+    rsa_handler = RSAHandler(key_size)
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.verbose else (lambda _msg: None)
+
+    log(f"[{key_size}] generate_keypair")
+    results.append(summarize("generate_keypair", {"key_size": key_size},
+                             measure(rsa_handler.generate_keypair, args.keygen_iterations, warmup=0)))
+    public_key, private_key = rsa_handler.generate_keypair()
+
+    # key loading: cold parses the file every time, warm hits the key cache.
+    # pem re-runs the primality checks on every parse, the binary format skips them
+    log(f"[{key_size}] load_key / import_key")
+    for key_format in ("pem", "binary"):
+        private_path = os.path.join(workdir, f"rsa_{key_size}.{key_format}")
+        rsa_handler.save_key(private_key, private_path, key_format)
+        with open(private_path, "rb") as f:
+            private_data = f.read()
+
+        def load_cold():
+            key_cache.invalidate(private_path)
+            rsa_handler.load_key(private_path)
+
+        params = {"key_size": key_size, "format": key_format}
+        results.append(summarize("load_key", {**params, "cache": "cold"}, measure(load_cold, args.iterations)))
+        results.append(summarize("load_key", {**params, "cache": "warm"},
+                                 measure(lambda: rsa_handler.load_key(private_path), args.iterations)))
+        results.append(summarize("import_key", params, measure(lambda: rsa_handler.import_key(private_data), args.iterations)))
+
+    # single-message encrypt / decrypt per payload size
+    for payload_size in args.payload_sizes:
+        if payload_size > oaep_max_payload(key_size):
+            continue
+        message = "x" * payload_size
+        ciphertext = rsa_handler.encrypt(public_key, message)
+        params = {"key_size": key_size, "payload": payload_size}
+        log(f"[{key_size}] encrypt/decrypt payload={payload_size}")
+        results.append(summarize("encrypt", params, measure(lambda: rsa_handler.encrypt(public_key, message), args.iterations)))
+        results.append(summarize("decrypt", params, measure(lambda: rsa_handler.decrypt(private_key, ciphertext), args.iterations)))
+
+    # batch vs single: same messages through encrypt_many / decrypt_many
+    if args.batch_size:
+        messages = ["x" * 32] * args.batch_size
+        ciphertexts = rsa_handler.encrypt_many(public_key, messages, workers=1)
+        params = {"key_size": key_size, "batch": args.batch_size, "workers": args.workers or os.cpu_count()}
+        log(f"[{key_size}] batch x{args.batch_size}")
+        batch_iterations = max(1, args.iterations // 10)
+        # one pool for every iteration (the private key also encrypts), workers start during warmup
+        with BatchPool(private_key, args.workers) as pool:
+            results.append(summarize("encrypt_many", params, measure(
+                lambda: rsa_handler.encrypt_many(public_key, messages, pool=pool), batch_iterations), ops=args.batch_size))
+            results.append(summarize("decrypt_many", params, measure(
+                lambda: rsa_handler.decrypt_many(private_key, ciphertexts, pool=pool), batch_iterations), ops=args.batch_size))
+
+    # file round trips through the hybrid stream format
+    for file_size in args.file_sizes:
+        plaintext = os.urandom(file_size)
+        encrypted = io.BytesIO()
+        rsa_handler.encrypt_stream(public_key, io.BytesIO(plaintext), encrypted)
+        encrypted_path = os.path.join(workdir, f"bench_{key_size}_{file_size}.enc")
+        with open(encrypted_path, "wb") as f:
+            f.write(encrypted.getvalue())
+        params = {"key_size": key_size, "file_size": file_size}
+        file_iterations = max(1, args.iterations // 20)
+        log(f"[{key_size}] file round trip size={file_size}")
+
+        def encrypt_file():
+            rsa_handler.encrypt_stream(public_key, io.BytesIO(plaintext), io.BytesIO())
+
+        def decrypt_file():
+            with open(encrypted_path, "rb") as reader:
+                rsa_handler.decrypt_mapped(private_key, reader, io.BytesIO())
+
+        for name, func in (("file_encrypt", encrypt_file), ("file_decrypt", decrypt_file)):
+            result = summarize(name, params, measure(func, file_iterations))
+            result["mb_per_s"] = result["ops_per_s"] * file_size / (1024 * 1024)
+            results.append(result)
+    return results
+
+# private-key ops (decrypt, pss sign) for two-prime vs multi-prime keys of one size
+def bench_multiprime(key_size, args):
+    results = []
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.verbose else (lambda _msg: None)
+    digest = SHA256.new(b"x" * 32)
+    two_prime = {}
+    for primes in args.primes:
+        if primes > max_primes(key_size):
+            continue
+        log(f"[{key_size}] private ops primes={primes}")
+        rsa_handler = RSAHandler(key_size, primes=primes)
+        public_key, private_key = rsa_handler.generate_keypair()
+        ciphertext = rsa_handler.encrypt(public_key, "x" * 32)
+        signer = pss.new(private_key)
+        params = {"key_size": key_size, "primes": primes}
+        for name, func in (("private_decrypt", lambda: rsa_handler.decrypt(private_key, ciphertext)),
+                           ("private_sign", lambda: signer.sign(digest))):
+            result = summarize(name, params, measure(func, args.iterations))
+            if primes == 2:
+                two_prime[name] = result["ops_per_s"]
+            elif name in two_prime:
+                result["speedup_vs_two_prime"] = result["ops_per_s"] / two_prime[name]
+            results.append(result)
+    return results
+
+# backend a baseline was measured with, older baselines predate backend selection
+def baseline_backend(baseline):
+    return baseline.get("backend", "pycryptodome")
+
+# compare results with a stored baseline, returns list of regressions
+def compare(results, baseline, tolerance):
+    baseline_by_id = {case_id(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        previous = baseline_by_id.get(case_id(result))
+        if previous is None:
+            continue
+        ratio = result["ops_per_s"] / previous["ops_per_s"] if previous["ops_per_s"] else 1.0
+        result["baseline_ratio"] = ratio
+        if ratio < 1.0 - tolerance:
+            regressions.append({"case": case_id(result), "ratio": ratio,
+                                "baseline_ops_per_s": previous["ops_per_s"], "ops_per_s": result["ops_per_s"]})
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="benchmark RSAHandler operations")
+    parser.add_argument("--key-sizes", type=int, nargs="+")
+    parser.add_argument("--payload-sizes", type=int, nargs="+", default=DEFAULT_PAYLOAD_SIZES)
+    parser.add_argument("--file-sizes", type=int, nargs="*")
+    parser.add_argument("--batch-size", type=int, help="0 disables batch cases")
+    parser.add_argument("--primes", type=int, nargs="*", help="prime counts for the multi-prime cases, empty disables them")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size for batch cases")
+    parser.add_argument("--iterations", type=int)
+    parser.add_argument("--keygen-iterations", type=int)
+    parser.add_argument("--quick", action="store_true", help="small sweep for smoke runs (explicit options still win)")
+    parser.add_argument("--output", help="write json report here instead of stdout")
+    parser.add_argument("--baseline", help="json report to compare against")
+    parser.add_argument("--save-baseline", help="also write this run as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--backend", choices=("auto", "pycryptodome", "openssl"), help="crypto backend to measure (default: $RSA_BACKEND or auto)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    # fill unset options from the full or quick profile
+    profile = {
+        "key_sizes": [1024, 2048] if args.quick else DEFAULT_KEY_SIZES,
+        "file_sizes": [64 * 1024] if args.quick else DEFAULT_FILE_SIZES,
+        "batch_size": 64 if args.quick else DEFAULT_BATCH_SIZE,
+        "primes": [2, 3] if args.quick else DEFAULT_PRIMES,
+        "iterations": 20 if args.quick else 100,
+        "keygen_iterations": 1 if args.quick else 3,
+    }
+    for name, value in profile.items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backend:
+        RSAHandler.set_backend(args.backend)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        # numbers from different backends differ several-fold, comparing them is meaningless
+        if baseline_backend(baseline) != RSAHandler.backend_name():
+            print(f"baseline {args.baseline} was measured with the {baseline_backend(baseline)} backend, "
+                  f"this run uses {RSAHandler.backend_name()} (pass --backend {baseline_backend(baseline)})", file=sys.stderr)
+            return 2
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for key_size in args.key_sizes:
+            results.extend(bench_key_size(key_size, args, workdir))
+            results.extend(bench_multiprime(key_size, args))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": RSAHandler.backend_name(),
+        "results": results,
+    }
+    exit_code = 0
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        report["baseline_backend"] = baseline_backend(baseline)
+        report["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"backend": report["backend"], "results": results}, f, indent=2)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
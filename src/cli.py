@@ -0,0 +1,384 @@
+import argparse
+import os
+import sys
+
+# non-interactive entry point, no curses and no tty needed.
+# every subcommand imports only what it uses, so cold start stays short.
+
+PUBLIC_KEY_NAME = "rsa_pkcs1_oaep.pub"
+PRIVATE_KEY_NAME = "rsa_pkcs1_oaep"
+
+# keygen: add a keypair to <out>/.keys and make it the active one, like the menu action does
+def cmd_keygen(args):
+    from lib.keystore import Keystore
+    from lib.rsa import RSAHandler
+    keys_folder = os.path.join(args.out, ".keys")
+    rsa_handler = RSAHandler(args.bits, primes=args.primes)
+    _, private_key = rsa_handler.generate_keypair()
+    key_id = Keystore(keys_folder, args.format).add(private_key)
+    print(keys_folder)
+    print(key_id.hex())
+    return 0
+
+# convert-keys: rewrite a keystore's private keys (or one key file) as pem or the fast-loading binary format
+def cmd_convert_keys(args):
+    from lib.keyformat import encode, import_key
+    from lib.keystore import Keystore, _write_key
+    if args.input:
+        with open(args.input, "rb") as f:
+            key = import_key(f.read())
+        _write_key(args.output or args.input, encode(key, args.to), private=key.has_private()) # atomic, private keys stay 0600
+        return 0
+    if not args.keys:
+        raise ValueError("give --keys or -i.")
+    print(f"{Keystore(args.keys).convert(args.to)} private keys written as {args.to}", file=sys.stderr)
+    return 0
+
+# keys: list every keypair in the keystore, oldest first
+def cmd_keys(args):
+    from lib.keystore import Keystore
+    for entry in Keystore(args.keys).list_keys():
+        print(f"{entry['key_id']} {entry['bits']} bits {entry['primes']} primes created {entry['created']}")
+    return 0
+
+# encrypt: stream input through hybrid encryption to output
+def cmd_encrypt(args):
+    from lib.rsa import RSAHandler
+    rsa_handler = RSAHandler()
+    public_key = rsa_handler.load_key(os.path.join(args.keys, PUBLIC_KEY_NAME))
+    with _open_input(args.input) as reader, _open_output(args.output) as writer:
+        rsa_handler.encrypt_stream(public_key, reader, writer, args.chunk_size, args.compress)
+    return 0
+
+# decrypt: mmap for regular files, chunked stream for pipes.
+# --offset/--length read only the chunks covering that plaintext range (needs a seekable input)
+def cmd_decrypt(args):
+    from lib.hybrid import MAGIC, is_hybrid, resolve_key
+    from lib.rsa import RSAHandler
+    rsa_handler = RSAHandler()
+    private_key = _private_key(rsa_handler, args)
+    if args.offset is not None or args.length is not None:
+        if args.input == "-":
+            raise ValueError("--offset/--length need a file given with -i.")
+        with open(args.input, "rb") as reader:
+            data = rsa_handler.decrypt_range(private_key, reader, args.offset or 0, args.length)
+        with _open_output(args.output) as writer:
+            writer.write(data)
+        return 0
+    with _open_input(args.input) as reader, _open_output(args.output) as writer:
+        if not is_hybrid(reader.peek(len(MAGIC))[: len(MAGIC)]): # legacy single oaep blob
+            writer.write(rsa_handler.decrypt(resolve_key(private_key, None), reader.read()).encode("utf-8"))
+        elif args.input != "-" and os.path.isfile(args.input):
+            rsa_handler.decrypt_mapped(private_key, reader, writer)
+        else:
+            rsa_handler.decrypt_stream(private_key, reader, writer)
+    return 0
+
+# send: stream files encrypted to the receiver's public key over one connection.
+# an interrupted transfer resumes where the receiver stopped when the same file is sent again
+def cmd_send(args):
+    from lib.keycache import key_cache
+    from transfer import send_files
+    public_key = key_cache.load(_public_key_path(args.to))
+    report = lambda path, sent, offset: print(f"{path} {sent} bytes" + (f" (resumed at {offset})" if offset else ""), file=sys.stderr)
+    send_files(args.host, args.port, public_key, args.files, args.chunk_size, args.compress, args.timeout, on_file=report)
+    return 0
+
+# receive: accept encrypted transfers into a directory until interrupted (or idle timeout)
+def cmd_receive(args):
+    from lib.keystore import Keystore
+    from transfer import serve_files
+    log = lambda event: print(event, file=sys.stderr)
+    try:
+        serve_files(Keystore(args.keys), args.host, args.port, args.dir, idle_timeout=args.idle_timeout, on_event=log)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+# journal-add: every stdin line is encrypted with the active key and appended to the journal
+def cmd_journal_add(args):
+    from lib.journal import Journal
+    from lib.keycache import fingerprint
+    from lib.keystore import Keystore
+    from lib.rsa import RSAHandler
+    public_key = Keystore(args.keys).current_public_key()
+    key_id = fingerprint(public_key)
+    with Journal(args.journal) as journal:
+        for line in sys.stdin:
+            line = line.rstrip("\n")
+            if line:
+                print(journal.append(RSAHandler.encrypt(public_key, line), key_id))
+    return 0
+
+# journal-read: decrypt a range of journal records (by id and/or time) as a stream, one line per message
+def cmd_journal_read(args):
+    from lib.journal import Journal
+    from lib.keystore import Keystore
+    with Journal(args.journal) as journal:
+        ranges = {"start_id": args.from_id, "end_id": args.to_id, "since": args.since, "until": args.until}
+        if args.id is not None:
+            ranges.update(start_id=args.id, end_id=args.id + 1)
+        for record, message in journal.decrypt(Keystore(args.keys), workers=args.workers, **ranges):
+            print(f"{record.id}\t{record.timestamp:.6f}\t{message}")
+    return 0
+
+# backend: show which crypto backend is used and the decrypt benchmark behind the automatic choice
+def cmd_backend(args):
+    from lib import backend
+    backends = backend.available_backends()
+    print(f"using {backend.get_backend().name} (RSA_BACKEND={os.environ.get('RSA_BACKEND') or backend.DEFAULT_CHOICE})")
+    for name, candidate in backends.items():
+        print(f"available: {name} {candidate.version}")
+    if args.benchmark:
+        for name, ms in backend.benchmark(backends).items():
+            print(f"{name}: {'incompatible output' if ms is None else f'{ms:.3f} ms per decrypt'}")
+    return 0
+
+# recipient public key: a .keys folder (its active key) or a public key file
+def _public_key_path(path):
+    return os.path.join(path, PUBLIC_KEY_NAME) if os.path.isdir(path) else path
+
+# sign: write a detached rsa-pss signature (<file>.sig) for every file, directories are walked
+def cmd_sign(args):
+    from lib.keystore import Keystore
+    from lib.rsa import RSAHandler
+    private_key = Keystore(args.keys).current_private_key()
+    for filename in _expand_paths(args.paths):
+        print(RSAHandler.sign_file(private_key, filename))
+    return 0
+
+# verify: check files against their .sig across a process pool, exit status 1 if any fails
+def cmd_verify(args):
+    from lib.keystore import Keystore
+    from lib.rsa import RSAHandler
+    filenames = _expand_paths(args.paths)
+    results = RSAHandler.verify_many(Keystore(args.keys), [(filename, None) for filename in filenames], args.workers)
+    failed = 0
+    for filename, error in zip(filenames, results):
+        if error:
+            failed += 1
+            print(f"FAIL {filename}: {error}", file=sys.stderr)
+        elif args.verbose:
+            print(f"ok {filename}")
+    print(f"verified {len(filenames) - failed}/{len(filenames)} files", file=sys.stderr)
+    return 1 if failed else 0
+
+# files named on the command line plus every file under named directories, signatures themselves skipped
+def _expand_paths(paths):
+    from lib.signing import SIGNATURE_SUFFIX
+    filenames = []
+    for path in paths:
+        if not os.path.isdir(path):
+            filenames.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            filenames.extend(os.path.join(root, name) for name in sorted(files) if not name.endswith(SIGNATURE_SUFFIX))
+    return filenames
+
+# agent: keep private keys in memory and answer requests on a unix socket
+def cmd_agent(args):
+    from lib.agent import run_agent
+    from lib.keystore import Keystore
+    key_files = [os.path.join(folder, PRIVATE_KEY_NAME) for folder in args.keys] # active keys first
+    if args.all_keys: # plus every older key, so old files still decrypt through the agent
+        key_files += [path for folder in args.keys for path in Keystore(folder).archived_private_key_files()]
+    ready = lambda: print(f"{args.socket}", file=sys.stderr)
+    run_agent(args.socket, key_files, workers=args.workers, on_ready=ready)
+    return 0
+
+# serve: run the session server until interrupted (or idle timeout)
+def cmd_serve(args):
+    from async_server import run_server
+    from lib.rsa import RSAHandler
+    log = lambda event: print(event, file=sys.stderr)
+    try:
+        stats = run_server(
+            RSAHandler(), args.host, args.port, args.message,
+            max_handshakes=args.max_handshakes, idle_timeout=args.idle_timeout, on_event=log, compress=args.compress,
+        )
+    except KeyboardInterrupt:
+        return 0
+    log(f"served={stats['served']} failed={stats['failed']} resumed={stats['resumed']}")
+    return 0
+
+# connect: print the server's message, then send each stdin line and print the reply
+def cmd_connect(args):
+    import socket
+    from lib.rsa import RSAHandler
+    from lib.session import CLOSE, DATA
+    from network import open_client_session, recv_data, send_frame
+    rsa_handler = RSAHandler()
+    private_key = rsa_handler.load_key(os.path.join(args.keys, PRIVATE_KEY_NAME))
+    with open(os.path.join(args.keys, PUBLIC_KEY_NAME), "rb") as f:
+        public_key_pem = f.read()
+
+    with socket.create_connection((args.host, args.port), timeout=args.timeout) as sock:
+        channel, _ = open_client_session(sock, private_key, public_key_pem, compress=args.compress)
+        out = sys.stdout.buffer
+        out.write(recv_data(sock, channel) + b"\n")
+        out.flush()
+        for line in sys.stdin.buffer:
+            send_frame(sock, DATA, channel.seal(line.rstrip(b"\n")))
+            out.write(recv_data(sock, channel) + b"\n")
+            out.flush()
+        send_frame(sock, CLOSE)
+    return 0
+
+# key source for decryption: the agent when --agent (or RSA_AGENT_SOCK) is given, else the keystore.
+# both pick the key named in the file header
+def _private_key(rsa_handler, args):
+    if args.agent or (not args.keys and os.environ.get("RSA_AGENT_SOCK")):
+        from lib.agent import AgentClient
+        return AgentClient(args.agent)
+    if not args.keys:
+        raise ValueError("no --keys folder or agent socket given.")
+    from lib.keystore import Keystore
+    return Keystore(args.keys)
+
+# "-" means stdin, reader must support peek() for format detection
+def _open_input(path):
+    if path == "-":
+        return os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    return open(path, "rb")
+
+# "-" means stdout, otherwise written to a temp file and renamed on success
+def _open_output(path):
+    if path == "-":
+        return os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    from file_handlers import _atomic_writer
+    return _atomic_writer(path)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="headless rsa pkcs1 oaep tool")
+    parser.add_argument("--backend", choices=("auto", "pycryptodome", "openssl"),
+                        help="crypto backend for oaep and key generation (default: $RSA_BACKEND or auto)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    keygen = subparsers.add_parser("keygen", help="generate a keypair into <out>/.keys")
+    keygen.add_argument("--out", default=os.getcwd())
+    keygen.add_argument("--bits", type=int, default=2048)
+    keygen.add_argument("--primes", type=int, default=2, help="3 or 4 for faster private-key ops (3072/4096-bit)")
+    keygen.add_argument("--format", choices=("pem", "binary"), default="pem", help="private key file format, binary loads ~100x faster")
+    keygen.set_defaults(func=cmd_keygen)
+
+    convert = subparsers.add_parser("convert-keys", help="convert private keys between pem and the binary format")
+    convert.add_argument("--keys", help="convert every private key in this .keys folder")
+    convert.add_argument("-i", "--input", help="convert a single key file instead")
+    convert.add_argument("-o", "--output", help="output for -i (default: rewrite the input)")
+    convert.add_argument("--to", choices=("pem", "binary"), required=True)
+    convert.set_defaults(func=cmd_convert_keys)
+
+    keys = subparsers.add_parser("keys", help="list keypairs in a keystore")
+    keys.add_argument("--keys", required=True, help="path to .keys folder")
+    keys.set_defaults(func=cmd_keys)
+
+    for name, func, help_text in (
+        ("encrypt", cmd_encrypt, "encrypt input (default stdin) to output (default stdout)"),
+        ("decrypt", cmd_decrypt, "decrypt input (default stdin) to output (default stdout)"),
+    ):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--keys", required=name == "encrypt", help="path to .keys folder")
+        sub.add_argument("-i", "--input", default="-")
+        sub.add_argument("-o", "--output", default="-")
+        if name == "encrypt":
+            sub.add_argument("--chunk-size", type=int, default=64 * 1024)
+            sub.add_argument("--compress", default=None, help="off by default; auto (zlib, skipped for incompressible data), zlib, lzma or zstd")
+        else:
+            sub.add_argument("--agent", help="key agent socket (default: $RSA_AGENT_SOCK when --keys is not given)")
+            sub.add_argument("--offset", type=int, help="first plaintext byte to decrypt")
+            sub.add_argument("--length", type=int, help="number of plaintext bytes (default: to the end)")
+        sub.set_defaults(func=func)
+
+    send = subparsers.add_parser("send", help="send files encrypted to the receiver's public key")
+    send.add_argument("--to", required=True, help="receiver's .keys folder or public key file")
+    send.add_argument("--host", required=True)
+    send.add_argument("--port", type=int, required=True)
+    send.add_argument("--chunk-size", type=int, default=64 * 1024)
+    send.add_argument("--compress", default=None, help="off by default; auto, zlib, lzma or zstd")
+    send.add_argument("--timeout", type=float, default=60)
+    send.add_argument("files", nargs="+")
+    send.set_defaults(func=cmd_send)
+
+    receive = subparsers.add_parser("receive", help="receive encrypted file transfers into a directory")
+    receive.add_argument("--keys", required=True, help="path to .keys folder")
+    receive.add_argument("--host", default="0.0.0.0")
+    receive.add_argument("--port", type=int, required=True)
+    receive.add_argument("--dir", default=".", help="destination directory")
+    receive.add_argument("--idle-timeout", type=float, default=None, help="stop after this many idle seconds")
+    receive.set_defaults(func=cmd_receive)
+
+    sign = subparsers.add_parser("sign", help="write a detached signature (<file>.sig) for files or directories")
+    sign.add_argument("--keys", required=True, help="path to .keys folder (the active key signs)")
+    sign.add_argument("paths", nargs="+")
+    sign.set_defaults(func=cmd_sign)
+
+    verify = subparsers.add_parser("verify", help="verify files or directories against their .sig files")
+    verify.add_argument("--keys", required=True, help="path to .keys folder (older keys are picked by key id)")
+    verify.add_argument("--workers", type=int, default=None, help="verifier processes (default: cpu count)")
+    verify.add_argument("-v", "--verbose", action="store_true", help="also print files that verified")
+    verify.add_argument("paths", nargs="+")
+    verify.set_defaults(func=cmd_verify)
+
+    journal_add = subparsers.add_parser("journal-add", help="encrypt stdin lines and append them to a message journal")
+    journal_add.add_argument("--keys", required=True, help="path to .keys folder (the active key encrypts)")
+    journal_add.add_argument("--journal", required=True, help="journal directory")
+    journal_add.set_defaults(func=cmd_journal_add)
+
+    journal_read = subparsers.add_parser("journal-read", help="decrypt journal messages by id or time range")
+    journal_read.add_argument("--keys", required=True, help="path to .keys folder (older keys are picked by key id)")
+    journal_read.add_argument("--journal", required=True, help="journal directory")
+    journal_read.add_argument("--id", type=int, help="a single record")
+    journal_read.add_argument("--from-id", type=int, help="first record id")
+    journal_read.add_argument("--to-id", type=int, help="stop before this record id")
+    journal_read.add_argument("--since", type=float, help="first unix timestamp")
+    journal_read.add_argument("--until", type=float, help="stop before this unix timestamp")
+    journal_read.add_argument("--workers", type=int, default=None, help="decryption processes (default: cpu count)")
+    journal_read.set_defaults(func=cmd_journal_read)
+
+    backend = subparsers.add_parser("backend", help="show the crypto backend in use and the ones installed")
+    backend.add_argument("--benchmark", action="store_true", help="also time oaep decryption on every backend")
+    backend.set_defaults(func=cmd_backend)
+
+    agent = subparsers.add_parser("agent", help="serve private keys from memory over a unix socket")
+    agent.add_argument("--keys", action="append", required=True, help="path to .keys folder, can be repeated")
+    agent.add_argument("--socket", required=True, help="unix socket path")
+    agent.add_argument("--workers", type=int, default=None)
+    agent.add_argument("--all-keys", action="store_true", help="also load every older key from the keystore")
+    agent.set_defaults(func=cmd_agent)
+
+    serve = subparsers.add_parser("serve", help="run the session server")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, required=True)
+    serve.add_argument("--message", required=True, help="message sent to every client")
+    serve.add_argument("--max-handshakes", type=int, default=64)
+    serve.add_argument("--idle-timeout", type=float, default=None, help="stop after this many idle seconds")
+    serve.add_argument("--compress", default=None, help="compress messages sent to clients (off by default, leaks content through length)")
+    serve.set_defaults(func=cmd_serve)
+
+    connect = subparsers.add_parser("connect", help="connect to a server, stdin lines become messages")
+    connect.add_argument("--keys", required=True, help="path to .keys folder")
+    connect.add_argument("--host", required=True)
+    connect.add_argument("--port", type=int, required=True)
+    connect.add_argument("--timeout", type=float, default=30)
+    connect.add_argument("--compress", default=None, help="compress messages sent to the server (off by default, leaks content through length)")
+    connect.set_defaults(func=cmd_connect)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.backend: # read when the backend is first needed, worker processes inherit it
+        os.environ["RSA_BACKEND"] = args.backend
+    try:
+        return args.func(args)
+    except FileNotFoundError as e:
+        print(f"err: {e.filename} not found.", file=sys.stderr)
+    except ValueError as e: # wrong key, corrupted or truncated data
+        print(f"err: {str(e) or 'invalid data'}", file=sys.stderr)
+    except OSError as e:
+        print(f"err: {str(e)}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,40 @@
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from jobs import ProgressReader
+from lib.hybrid import MAGIC as HYBRID_MAGIC, is_hybrid, resolve_key
+from lib.keystore import Keystore
+from lib.metrics import metrics
 from ui import get_user_input
 
-# handle file encryption
-def _handle_encrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout):
+# handle file encryption, prompts on the ui thread and encrypts in a background job
+def _handle_encrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
     file_prompt = "enter file name to encrypt: "
     filename = get_user_input(stdscr, file_prompt, history, menu_items_for_layout)
 
     if not filename: # check for empty input
         history.append("no filename entered for encryption.")
         return
-        
+
     if not os.path.exists(filename) or not os.path.isfile(filename):
         history.append(f"err: file '{filename}' not found.")
         return
 
     try:
         public_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep.pub"))
-        # read file content (ensure utf-8 for text files)
-        with open(filename, "r", encoding="utf-8") as f: 
-            message = f.read()
-        encrypted_message = rsa_handler.encrypt(public_key, message)
-        
-        output_filename = filename + ".enc" # append .enc extension
-        with open(output_filename, "wb") as f: # write in binary mode
-            f.write(encrypted_message)
-        history.append(f"file encrypted as {output_filename}")
     except FileNotFoundError: # key not found
         history.append(f"err: public key not found in {keys_folder}.")
-    except UnicodeDecodeError: # file might not be utf-8 text
-        history.append(f"err: could not read '{filename}' as text. ensure it's utf-8 encoded.")
-    except Exception as e:
-        history.append(f"err encrypting file: {str(e)}")
+        return
+
+    def work(job):
+        output_filename, total_bytes = _encrypt_file(rsa_handler, public_key, filename, job)
+        return f"file encrypted as {output_filename} ({total_bytes} bytes, {os.path.getsize(output_filename)} on disk)"
 
-# handle file decryption
-def _handle_decrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout):
+    jobs.submit(f"encrypt {os.path.basename(filename)}", work, total=os.path.getsize(filename))
+
+# handle file decryption, prompts on the ui thread and decrypts in a background job
+def _handle_decrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
     file_prompt = "enter file name to decrypt (e.g., file.txt.enc): "
     filename = get_user_input(stdscr, file_prompt, history, menu_items_for_layout)
 
@@ -45,23 +46,174 @@ def _handle_decrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items_f
         history.append(f"err: file '{filename}' not found.")
         return
 
+    def work(job):
+        try:
+            # the file header names its key, the keystore opens that key directly
+            output_filename, _ = _decrypt_file(rsa_handler, Keystore(keys_folder), filename, job)
+            return f"file decrypted as {output_filename}"
+        except FileNotFoundError: # key not found
+            return f"err: private key not found in {keys_folder}."
+        except ValueError: # decryption err (wrong key, corrupted data)
+            return "err: incorrect private key or data, unable to decrypt file."
+
+    jobs.submit(f"decrypt {os.path.basename(filename)}", work, total=os.path.getsize(filename))
+
+# handle bulk encryption of every file under a directory (background job)
+def _handle_encrypt_directory(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
+    directory = get_user_input(stdscr, "enter directory to encrypt: ", history, menu_items_for_layout)
+    if not directory or not os.path.isdir(directory):
+        history.append(f"err: directory '{directory}' not found.")
+        return
+
     try:
-        private_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep"))
-        with open(filename, "rb") as f: # read encrypted file in binary
-            encrypted_message = f.read()
-        decrypted_message = rsa_handler.decrypt(private_key, encrypted_message)
-        
-        output_filename = filename 
-        if filename.endswith(".enc"): # if it has .enc, remove it
-            output_filename = filename[:-4] 
-        output_filename += ".dec" # always add .dec suffix to decrypted file
-
-        with open(output_filename, "w", encoding="utf-8") as f: # write decrypted text
-            f.write(decrypted_message)
-        history.append(f"file decrypted as {output_filename}")
-    except FileNotFoundError: # key not found
+        # load once, every worker shares the same parsed key
+        public_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep.pub"))
+    except FileNotFoundError:
+        history.append(f"err: public key not found in {keys_folder}.")
+        return
+
+    def work(job):
+        summary = process_directory(
+            directory,
+            lambda path: _encrypt_file(rsa_handler, public_key, path, job),
+            _should_encrypt,
+            job=job,
+        )
+        return _report_bulk(history, "encrypt", summary)
+
+    jobs.submit(f"encrypt {directory}", work)
+
+# handle bulk decryption of every .enc file under a directory (background job)
+def _handle_decrypt_directory(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
+    directory = get_user_input(stdscr, "enter directory to decrypt: ", history, menu_items_for_layout)
+    if not directory or not os.path.isdir(directory):
+        history.append(f"err: directory '{directory}' not found.")
+        return
+
+    keystore = Keystore(keys_folder) # files encrypted under older keys still decrypt
+    try:
+        keystore.current_private_key()
+    except FileNotFoundError:
         history.append(f"err: private key not found in {keys_folder}.")
-    except ValueError: # decryption err (wrong key, corrupted data)
-        history.append("err: incorrect private key or data, unable to decrypt file.")
-    except Exception as e:
-        history.append(f"err decrypting file: {str(e)}")
+        return
+
+    def work(job):
+        summary = process_directory(
+            directory,
+            lambda path: _decrypt_file(rsa_handler, keystore, path, job),
+            lambda path: path.endswith(".enc"),
+            job=job,
+        )
+        return _report_bulk(history, "decrypt", summary)
+
+    jobs.submit(f"decrypt {directory}", work)
+
+# walk a directory tree and run transform(path) on matching files with a bounded worker pool.
+# with a job, cancelling it stops queueing new files (running ones stop at their next chunk)
+def process_directory(directory, transform, select, workers=None, max_in_flight=None, job=None):
+    workers = workers or min(32, (os.cpu_count() or 1) + 4) # crypto releases the gil, io overlaps
+    max_in_flight = max_in_flight or workers * 2 # cap queued work so huge trees stay bounded
+    summary = {"files": 0, "bytes": 0, "errors": [], "seconds": 0.0}
+
+    def run(path):
+        size = os.path.getsize(path) # input size for throughput
+        transform(path)
+        return size
+
+    start = time.perf_counter()
+    with metrics.track("file.process_directory"), ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        for path in _walk_files(directory, select):
+            if job:
+                job.check()
+            if len(in_flight) >= max_in_flight: # wait for a slot before queueing more
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                _collect(done, in_flight, summary)
+            in_flight[executor.submit(run, path)] = path
+        while in_flight: # drain remaining work
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            _collect(done, in_flight, summary)
+    if job:
+        job.check() # files cut short by the cancel are not reported as errors
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+# record finished futures into summary (per-file errors, not fatal)
+def _collect(done, in_flight, summary):
+    for future in done:
+        path = in_flight.pop(future)
+        try:
+            summary["bytes"] += future.result()
+            summary["files"] += 1
+        except Exception as e:
+            summary["errors"].append((path, str(e) or type(e).__name__))
+
+# yield regular files under directory that pass select
+def _walk_files(directory, select):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and select(path):
+                yield path
+
+# skip outputs of previous runs
+def _should_encrypt(path):
+    return not path.endswith((".enc", ".dec", ".part"))
+
+# push per-file errors to history, returns the throughput summary line
+def _report_bulk(history, action, summary):
+    for path, error in summary["errors"]:
+        history.append(f"err {action}ing {path}: {error}")
+    seconds = max(summary["seconds"], 1e-9)
+    megabytes = summary["bytes"] / (1024 * 1024)
+    return (
+        f"bulk {action}: {summary['files']} ok, {len(summary['errors'])} failed, "
+        f"{megabytes:.1f} MB in {summary['seconds']:.2f}s "
+        f"({summary['files'] / seconds:.1f} files/s, {megabytes / seconds:.1f} MB/s)"
+    )
+
+# encrypt one file to <file>.enc, returns (output filename, plaintext bytes)
+# a job gets per-chunk progress and can cancel between chunks
+def _encrypt_file(rsa_handler, public_key, filename, job=None):
+    output_filename = filename + ".enc" # append .enc extension
+    # stream file through hybrid encryption chunk by chunk (constant memory)
+    with metrics.track("file.encrypt") as tracker, open(filename, "rb") as reader, _atomic_writer(output_filename) as writer:
+        source = ProgressReader(reader, job) if job else reader
+        total_bytes = tracker.bytes = rsa_handler.encrypt_stream(public_key, source, writer)
+    return output_filename, total_bytes
+
+# decrypt one file to <file>.dec, returns (output filename, plaintext bytes)
+# private_key may be a keystore, hybrid files then pick their key by id
+def _decrypt_file(rsa_handler, private_key, filename, job=None):
+    output_filename = filename
+    if filename.endswith(".enc"): # if it has .enc, remove it
+        output_filename = filename[:-4]
+    output_filename += ".dec" # always add .dec suffix to decrypted file
+
+    with metrics.track("file.decrypt") as tracker, open(filename, "rb") as reader: # read encrypted file in binary
+        if is_hybrid(reader.read(len(HYBRID_MAGIC))): # chunked hybrid format
+            # memory-mapped input, one reused plaintext buffer: peak memory is one chunk.
+            # a job gets per-chunk progress and can cancel between chunks
+            with _atomic_writer(output_filename) as writer:
+                total_bytes = rsa_handler.decrypt_mapped(private_key, reader, writer, job.advance if job else None)
+        else: # legacy single oaep blob
+            reader.seek(0)
+            decrypted_message = rsa_handler.decrypt(resolve_key(private_key, None), reader.read()) # no key id, active key
+            with open(output_filename, "w", encoding="utf-8") as f: # write decrypted text
+                f.write(decrypted_message)
+            total_bytes = len(decrypted_message.encode("utf-8"))
+        tracker.bytes = total_bytes
+    return output_filename, total_bytes
+
+# write to a temp file and move it into place only if the whole stream succeeded
+@contextmanager
+def _atomic_writer(output_filename):
+    temp_filename = output_filename + ".part"
+    try:
+        with open(temp_filename, "wb") as f:
+            yield f
+        os.replace(temp_filename, output_filename)
+    except BaseException:
+        if os.path.exists(temp_filename): # don't leave half-written output behind
+            os.remove(temp_filename)
+        raise
@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from lib.profiling import profiler
+
+# background jobs for the tui: long operations run on a worker pool while the curses
+# loop keeps reading keys, drawing progress and accepting cancel requests.
+# cancellation is cooperative: work calls job.advance()/job.check() between chunks
+
+DEFAULT_WORKERS = 4 # jobs running at once, more are queued
+
+# raised inside a job once it has been cancelled
+class Cancelled(Exception):
+    pass
+
+# one background operation: progress counters, cancel flag and state
+class Job:
+    def __init__(self, job_id, name, total=None):
+        self.id = job_id
+        self.name = name
+        self.total = total # bytes expected, None when unknown
+        self.done = 0
+        self.state = "queued" # queued, running, done, failed, cancelled
+        self.started = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock() # directory jobs advance from several pool threads
+
+    # count processed bytes, raises Cancelled when the user cancelled the job
+    def advance(self, count):
+        with self._lock:
+            self.done += count
+        self.check()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    # one status line: percent, throughput and eta when the total is known
+    def status_line(self):
+        label = f"[{self.id}] {self.name}"
+        if self.cancel_event.is_set():
+            return f"{label} cancelling..."
+        if self.state == "queued" or self.started is None:
+            return f"{label} queued"
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        if not self.done:
+            return f"{label} running {elapsed:.0f}s"
+        rate = self.done / elapsed
+        megabytes = self.done / (1024 * 1024)
+        if not self.total:
+            return f"{label} {megabytes:.1f} MB {rate / (1024 * 1024):.1f} MB/s {elapsed:.0f}s"
+        percent = min(100.0, 100.0 * self.done / self.total)
+        eta = max(0.0, (self.total - self.done) / rate)
+        return f"{label} {percent:.0f}% {megabytes:.1f}/{self.total / (1024 * 1024):.1f} MB {rate / (1024 * 1024):.1f} MB/s eta {eta:.0f}s"
+
+# file-like wrapper that reports bytes read to a job (and stops it when cancelled)
+class ProgressReader:
+    def __init__(self, reader, job):
+        self._reader = reader
+        self._job = job
+
+    def read(self, size=-1):
+        data = self._reader.read(size)
+        self._job.advance(len(data))
+        return data
+
+# runs jobs on a thread pool and reports their outcome to the history.
+# func(job) returns the message for the history; on_done() runs later on the ui thread (dispatch)
+class JobManager:
+    def __init__(self, history, workers=DEFAULT_WORKERS):
+        self._history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._callbacks = deque() # on_done callbacks of finished jobs, waiting for the ui thread
+
+    def submit(self, name, func, total=None, on_done=None):
+        job = Job(next(self._ids), name, total)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._history.append(f"job {job.id} started: {name}")
+        self._executor.submit(self._run, job, func, on_done)
+        return job
+
+    def _run(self, job, func, on_done):
+        job.state = "running"
+        job.started = time.monotonic()
+        try:
+            job.check() # cancelled while still queued
+            with profiler.profile(f"job.{job.name}"): # profiled here on the worker thread, where the work runs
+                result = func(job)
+            job.check() # cancelled during work that could not stop halfway, drop the result
+        except Cancelled:
+            job.state = "cancelled"
+            self._history.append(f"job {job.id} cancelled: {job.name}")
+        except Exception as e:
+            job.state = "failed"
+            self._history.append(f"err {job.name}: {str(e) or type(e).__name__}")
+        else:
+            job.state = "done"
+            if result:
+                self._history.append(result)
+            if on_done:
+                self._callbacks.append(on_done)
+        finally:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+
+    # run completion callbacks on the calling (ui) thread
+    def dispatch(self):
+        while self._callbacks:
+            self._callbacks.popleft()()
+
+    def active(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.id)
+
+    # cancel one job by id, or the newest one when job_id is None
+    def cancel(self, job_id=None):
+        jobs = self.active()
+        if job_id is not None:
+            jobs = [job for job in jobs if job.id == job_id]
+        if not jobs:
+            return None
+        jobs[-1].cancel()
+        return jobs[-1]
+
+    def status_lines(self):
+        return [job.status_line() for job in self.active()]
+
+    # cancel everything and wait for the workers to stop
+    def shutdown(self):
+        for job in self.active():
+            job.cancel()
+        self._executor.shutdown(wait=True)
@@ -1,4 +1,5 @@
 import os
+from lib.keystore import Keystore
 from ui import get_user_input
 
 # ensure keys folder is set, prompt if not
@@ -21,23 +22,20 @@ def _ensure_keys_folder(stdscr, history, current_keys_folder, menu_items_for_lay
     history.append(f"using keys folder: {user_path}")
     return user_path
 
-# handle rsa keypair generation
-def _handle_generate_keys(stdscr, rsa_handler, history, menu_items_for_layout):
+# handle rsa keypair generation in a background job, on_done(keys_folder) runs on the ui thread once saved
+def _handle_generate_keys(stdscr, rsa_handler, history, menu_items_for_layout, jobs, on_done):
     save_path_prompt = "input path to save keypair (default: current directory): "
     save_path = get_user_input(stdscr, save_path_prompt, history, menu_items_for_layout)
     save_path = save_path if save_path else os.getcwd() # default to current working dir
 
     keys_folder = os.path.join(save_path, ".keys") # standard subfolder for keys
-    try:
-        os.makedirs(keys_folder, exist_ok=True) # create if not exists
-        
-        public_key, private_key = rsa_handler.generate_keypair()
-        # save keys to standard filenames
-        rsa_handler.save_key(public_key, os.path.join(keys_folder, "rsa_pkcs1_oaep.pub"))
-        rsa_handler.save_key(private_key, os.path.join(keys_folder, "rsa_pkcs1_oaep"))
-        
-        history.append(f"keys saved in {keys_folder}.")
-        return keys_folder # return new path for main loop to update
-    except Exception as e:
-        history.append(f"err generating keys: {str(e)}")
-        return None # indicate failure
+
+    def work(job):
+        keystore = Keystore(keys_folder)
+        _, private_key = rsa_handler.generate_keypair()
+        job.check() # generation itself can't be interrupted, a cancel discards the new pair here
+        # new pair becomes the active one, older pairs stay in the keystore for decryption
+        key_id = keystore.add(private_key)
+        return f"keys saved in {keys_folder} (key id {key_id.hex()[:16]}, {len(keystore)} in keystore)."
+
+    jobs.submit(f"generate {rsa_handler.key_size}-bit keypair", work, on_done=lambda: on_done(keys_folder))
@@ -0,0 +1,306 @@
+"""
+Agent kunci: proses daemon yang memuat kunci private sekali lalu melayani
+permintaan encrypt/decrypt/sign lewat Unix domain socket (mirip ssh-agent).
+
+Proses client yang berumur pendek tidak perlu membaca dan mem-parse kunci
+private sama sekali, dan file kunci cukup bisa dibaca oleh proses agent saja.
+
+Protokol memakai frame yang sama dengan modul session:
+panjang (4 byte) | tipe (1 byte) | payload.
+Payload permintaan: panjang key id (1 byte) | key id | data.
+Key id adalah fingerprint SHA-256 kunci public; key id kosong berarti kunci pertama.
+Balasan: AGENT_OK dengan hasil, atau AGENT_FAILURE dengan pesan error (UTF-8).
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+from Crypto.Hash import SHA256
+from Crypto.Signature import pss
+
+from .keycache import FINGERPRINT_SIZE, fingerprint, key_cache, oaep_cipher
+from .metrics import metrics
+from .session import FRAME_HEADER, ProtocolError, decode_frame_header, encode_frame
+
+# Tipe frame permintaan
+AGENT_LIST = 0x10
+AGENT_ENCRYPT = 0x11
+AGENT_DECRYPT = 0x12
+AGENT_SIGN = 0x13
+# Tipe frame balasan
+AGENT_OK = 0x20
+AGENT_FAILURE = 0x21
+
+_OPERATION_NAMES = {AGENT_ENCRYPT: "agent.encrypt", AGENT_DECRYPT: "agent.decrypt", AGENT_SIGN: "agent.sign"}
+
+SOCKET_ENV = "RSA_AGENT_SOCK"  # Env default lokasi socket agent, seperti SSH_AUTH_SOCK
+
+
+def _encode_request(key_id, data):
+    return bytes((len(key_id),)) + key_id + data
+
+
+def _decode_request(payload):
+    if not payload:
+        raise ProtocolError("Permintaan agent kosong.")
+    id_length = payload[0]
+    if len(payload) < 1 + id_length:
+        raise ProtocolError("Key id terpotong.")
+    return payload[1 : 1 + id_length], payload[1 + id_length :]
+
+
+class _AgentKeys:
+    """
+    Kumpulan kunci private yang dipegang agent, diindeks dengan fingerprint.
+    """
+
+    def __init__(self, keys):
+        self._keys = {}
+        for key in keys:
+            if not key.has_private():
+                raise ValueError("Agent hanya menerima kunci private.")
+            self._keys.setdefault(fingerprint(key), key)
+        if not self._keys:
+            raise ValueError("Agent membutuhkan minimal satu kunci.")
+        self._default = next(iter(self._keys.values()))
+
+    def get(self, key_id):
+        if not key_id:
+            return self._default
+        key = self._keys.get(key_id)
+        if key is None:
+            raise KeyError("Kunci tidak dikenal oleh agent.")
+        return key
+
+    def listing(self):
+        return b"".join(fp + key.size_in_bits().to_bytes(2, "big") for fp, key in self._keys.items())
+
+    def handle(self, frame_type, payload):
+        """
+        Menjalankan satu permintaan (dipanggil di thread executor).
+        """
+        if frame_type == AGENT_LIST:
+            return self.listing()
+        if frame_type not in _OPERATION_NAMES:
+            raise ProtocolError(f"Tipe permintaan tidak dikenal: {frame_type}.")
+        key_id, data = _decode_request(payload)
+        key = self.get(key_id)
+        with metrics.track(_OPERATION_NAMES[frame_type]) as tracker:
+            tracker.bytes = len(data)
+            if frame_type == AGENT_ENCRYPT:
+                return oaep_cipher(key.publickey()).encrypt(data)
+            if frame_type == AGENT_DECRYPT:
+                return oaep_cipher(key).decrypt(data)
+            return pss.new(key).sign(SHA256.new(data))
+
+
+async def _serve_connection(reader, writer, agent_keys, executor):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(FRAME_HEADER.size)
+            except asyncio.IncompleteReadError:
+                break  # Client menutup koneksi
+            length, frame_type = decode_frame_header(header)
+            payload = await reader.readexactly(length)
+            try:
+                result = await loop.run_in_executor(executor, agent_keys.handle, frame_type, payload)
+                writer.write(encode_frame(AGENT_OK, result))
+            except (ValueError, KeyError, ProtocolError) as e:  # Ciphertext salah, kunci tidak dikenal
+                message = e.args[0] if e.args else "Permintaan gagal."
+                writer.write(encode_frame(AGENT_FAILURE, str(message).encode()))
+            await writer.drain()
+    except (ProtocolError, asyncio.IncompleteReadError, ConnectionError):
+        pass  # Frame rusak atau client putus di tengah frame
+    finally:
+        writer.close()
+
+
+def _prepare_socket_path(path):
+    """
+    Menghapus socket lama yang sudah tidak dipakai, gagal jika agent lain masih hidup.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} sudah ada dan bukan socket.")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)  # Sisa agent yang sudah mati
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"Agent lain sudah berjalan di {path}.")
+
+
+async def serve_agent(path, keys, workers=None, on_ready=None):
+    """
+    Menjalankan agent sampai dibatalkan.
+
+    Parameter:
+    - path: Lokasi Unix domain socket.
+    - keys: Daftar kunci private RSA yang dipegang agent.
+    - workers: Jumlah thread untuk operasi RSA (default: jumlah CPU).
+    - on_ready: Callback opsional yang dipanggil setelah socket siap.
+    """
+    agent_keys = _AgentKeys(keys)
+    _prepare_socket_path(path)
+    executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)  # Operasi GMP melepas GIL
+    old_umask = os.umask(0o177)  # Socket langsung dibuat dengan mode 0600, tanpa jeda
+    try:
+        server = await asyncio.start_unix_server(
+            lambda r, w: _serve_connection(r, w, agent_keys, executor), path=path
+        )
+    finally:
+        os.umask(old_umask)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stopped.set)  # kill biasa tetap membersihkan file socket
+    except (NotImplementedError, RuntimeError):  # Bukan main thread atau platform tanpa dukungan
+        pass
+    try:
+        async with server:
+            if on_ready is not None:
+                on_ready()
+            await stopped.wait()
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        executor.shutdown(wait=False)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def run_agent(path, key_files, workers=None, on_ready=None):
+    """
+    Versi blocking dari serve_agent: memuat kunci dari file lalu melayani sampai Ctrl+C.
+    """
+    keys = [key_cache.load(filename) for filename in key_files]
+    try:
+        asyncio.run(serve_agent(path, keys, workers, on_ready))
+    except KeyboardInterrupt:
+        pass
+
+
+class AgentClient:
+    """
+    Client sinkron untuk agent. Satu koneksi dipakai ulang untuk banyak permintaan.
+    """
+
+    def __init__(self, path=None, timeout=30):
+        """
+        Inisialisasi AgentClient.
+
+        Parameter:
+        - path: Lokasi socket agent (default: env RSA_AGENT_SOCK).
+        - timeout: Batas waktu tiap operasi socket (detik).
+        """
+        path = path or os.environ.get(SOCKET_ENV)
+        if not path:
+            raise FileNotFoundError(f"Socket agent tidak ditentukan (set {SOCKET_ENV}).")
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(path)
+        except OSError:
+            self._sock.close()
+            raise
+
+    def _recv_exact(self, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self._sock.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionError("Koneksi ke agent terputus.")
+            received += count
+        return bytes(buffer)
+
+    def _request(self, frame_type, payload=b""):
+        self._sock.sendall(encode_frame(frame_type, payload))
+        length, reply_type = decode_frame_header(self._recv_exact(FRAME_HEADER.size))
+        reply = self._recv_exact(length)
+        if reply_type == AGENT_FAILURE:
+            raise ValueError(reply.decode(errors="replace"))
+        if reply_type != AGENT_OK:
+            raise ProtocolError(f"Balasan agent tidak terduga: {reply_type}.")
+        return reply
+
+    def list_keys(self):
+        """
+        Return: list tuple (fingerprint, ukuran kunci dalam bit) untuk kunci di agent.
+        """
+        listing = self._request(AGENT_LIST)
+        entry_size = FINGERPRINT_SIZE + 2
+        return [
+            (listing[i : i + FINGERPRINT_SIZE], int.from_bytes(listing[i + FINGERPRINT_SIZE : i + entry_size], "big"))
+            for i in range(0, len(listing), entry_size)
+        ]
+
+    def encrypt(self, data, key_id=b""):
+        return self._request(AGENT_ENCRYPT, _encode_request(key_id, data))
+
+    def decrypt(self, ciphertext, key_id=b""):
+        return self._request(AGENT_DECRYPT, _encode_request(key_id, ciphertext))
+
+    def sign(self, data, key_id=b""):
+        """
+        Tanda tangan RSA-PSS (SHA-256) atas data.
+        """
+        return self._request(AGENT_SIGN, _encode_request(key_id, data))
+
+    def key(self, key_id=b""):
+        """
+        Objek AgentKey yang bisa dipakai di tempat kunci private (RSAHandler.decrypt, decrypt_stream, ...).
+        """
+        return AgentKey(self, key_id)
+
+    def private_key_for(self, key_id):
+        """
+        Sama seperti Keystore.private_key_for: agent memilih kunci dari key id di ciphertext.
+        """
+        return AgentKey(self, key_id or b"")
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class AgentKey:
+    """
+    Pengganti kunci private yang operasinya dijalankan oleh agent.
+
+    Objek ini sudah berperilaku seperti cipher OAEP (punya encrypt/decrypt),
+    jadi oaep_cipher() mengembalikannya apa adanya.
+    """
+
+    def __init__(self, client, key_id=b""):
+        self._client = client
+        self.key_id = key_id
+
+    def encrypt(self, data):
+        return self._client.encrypt(data, self.key_id)
+
+    def decrypt(self, ciphertext):
+        return self._client.decrypt(ciphertext, self.key_id)
+
+    def sign(self, data):
+        return self._client.sign(data, self.key_id)
@@ -0,0 +1,309 @@
+"""
+Backend kriptografi untuk operasi RSA OAEP dan pembuatan kunci.
+
+Dua implementasi dengan hasil yang saling kompatibel:
+- "pycryptodome": Crypto.Cipher.PKCS1_OAEP (selalu tersedia).
+- "openssl": paket `cryptography` (OpenSSL), biasanya beberapa kali lebih cepat
+  untuk operasi kunci private dan pembuatan kunci.
+
+Kunci tetap berupa RsaKey pycryptodome di seluruh program (parse, ekspor PEM,
+fingerprint, format biner), jadi PEM yang dihasilkan identik di kedua backend.
+Backend hanya menentukan siapa yang menjalankan OAEP (SHA-1, MGF1-SHA-1, tanpa
+label, sama dengan default PKCS1_OAEP) dan RSA.generate. Ciphertext dari satu
+backend selalu bisa didekripsi backend lain.
+
+Pilihan backend lewat env RSA_BACKEND ("pycryptodome", "openssl", atau "auto",
+default) atau set_backend(). Dengan "auto", jika lebih dari satu backend
+terpasang, micro-benchmark singkat (~0.2 detik) dijalankan sekali dan hasilnya
+disimpan di cache (RSA_BACKEND_CACHE, default ~/.cache/py-rsa-encrypt/backend.json)
+per versi library, jadi start berikutnya langsung memakai hasilnya. Backend yang
+tidak terpasang dilewati; jika diminta eksplisit, program jatuh ke pycryptodome
+dengan peringatan.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import warnings
+
+import Crypto
+from Crypto.Cipher import PKCS1_OAEP
+from Crypto.PublicKey import RSA
+
+from .keyformat import is_verified, mark_verified
+from .metrics import instrument_key, metrics
+
+DEFAULT_CHOICE = "auto"
+BENCHMARK_KEY_SIZE = 2048
+BENCHMARK_ROUNDS = 20  # Dekripsi per backend saat micro-benchmark
+_SHA1_DIGEST_SIZE = 20
+
+
+class PycryptodomeBackend:
+    """
+    Backend default: PKCS1_OAEP dan RSA.generate dari pycryptodome.
+    """
+
+    name = "pycryptodome"
+    version = Crypto.__version__
+
+    def oaep_cipher(self, key):
+        """
+        Membuat objek cipher OAEP (punya encrypt/decrypt) untuk kunci.
+        """
+        return PKCS1_OAEP.new(instrument_key(key))  # Kunci dibungkus timer jika metrics hidup
+
+    def generate(self, bits, e=65537):
+        return RSA.generate(bits, e=e)
+
+
+class _OpenSSLCipher:
+    """
+    Cipher OAEP lewat OpenSSL dengan antarmuka dan pesan error yang sama dengan PKCS1_OAEP.
+    """
+
+    def __init__(self, backend, key):
+        self._padding = backend._padding
+        numbers = backend._rsa.RSAPublicNumbers(int(key.e), int(key.n))
+        self._public = numbers.public_key()
+        self._private = None
+        self._size = (int(key.n).bit_length() + 7) // 8
+        if key.has_private():
+            p, q, d = int(key.p), int(key.q), int(key.d)
+            private_numbers = backend._rsa.RSAPrivateNumbers(
+                p, q, d, d % (p - 1), d % (q - 1), pow(q, -1, p), numbers  # iqmp OpenSSL: q^-1 mod p
+            )
+            validated = backend._is_validated(key)
+            self._private = backend._load_private(private_numbers, skip_validation=validated)
+            if not validated:
+                backend._remember_validated(key)  # Lolos validasi OpenSSL, tidak diulang untuk kunci ini
+
+    # Nama metric berbeda dari rsa.raw_*_op pycryptodome: OpenSSL mengerjakan padding OAEP
+    # dan operasi RSA sekaligus, jadi yang terukur di sini termasuk padding
+    def encrypt(self, message):
+        if len(message) > self._size - 2 * _SHA1_DIGEST_SIZE - 2:
+            raise ValueError("Plaintext is too long.")
+        with metrics.track("rsa.public_op_padded"):
+            return self._public.encrypt(bytes(message), self._padding)
+
+    def decrypt(self, ciphertext):
+        if self._private is None:
+            raise TypeError("This is not a private key")
+        if len(ciphertext) != self._size:
+            raise ValueError("Ciphertext with incorrect length.")
+        try:
+            with metrics.track("rsa.private_op_padded"):
+                return self._private.decrypt(bytes(ciphertext), self._padding)
+        except ValueError:
+            raise ValueError("Incorrect decryption.") from None
+
+
+class OpenSSLBackend:
+    """
+    Backend OpenSSL lewat paket `cryptography` (raise ImportError jika tidak terpasang).
+    Kunci multi-prime tidak didukung OpenSSL lewat API ini, jadi dikerjakan pycryptodome.
+    """
+
+    name = "openssl"
+
+    def __init__(self):
+        import cryptography
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+        self.version = cryptography.__version__
+        self._rsa = rsa
+        self._padding = padding.OAEP(mgf=padding.MGF1(hashes.SHA1()), algorithm=hashes.SHA1(), label=None)
+        self._fallback = PycryptodomeBackend()
+        self._validated = set()  # Digest (n, d) kunci yang sudah lolos validasi OpenSSL di proses ini
+
+    @staticmethod
+    def _key_digest(key):
+        return hashlib.sha256(f"{int(key.n):x}:{int(key.d):x}".encode()).digest()  # Tanpa menyimpan komponen kunci
+
+    def _is_validated(self, key):
+        """
+        True jika kunci tidak perlu divalidasi ulang: faktornya sudah diuji pycryptodome, atau kunci
+        yang sama (walau objek berbeda, misalnya dimuat ulang dari file) sudah divalidasi OpenSSL.
+        """
+        if is_verified(key):
+            return True
+        if self._key_digest(key) in self._validated:
+            mark_verified(key)
+            return True
+        return False
+
+    def _remember_validated(self, key):
+        mark_verified(key)
+        self._validated.add(self._key_digest(key))
+
+    def _load_private(self, private_numbers, skip_validation=False):
+        """
+        Membuat kunci private OpenSSL. Validasi OpenSSL (uji primalitas, ~70 ms untuk 2048-bit) hanya
+        dijalankan untuk kunci dari jalur muat cepat format biner yang belum pernah divalidasi.
+        """
+        if not skip_validation:
+            return private_numbers.private_key()  # ValueError jika kunci tidak valid
+        try:
+            return private_numbers.private_key(unsafe_skip_rsa_key_validation=True)
+        except TypeError:  # cryptography < 39
+            return private_numbers.private_key()
+
+    def oaep_cipher(self, key):
+        if len(getattr(key, "primes", ())) > 2:
+            return self._fallback.oaep_cipher(key)
+        return _OpenSSLCipher(self, key)
+
+    def generate(self, bits, e=65537):
+        numbers = self._rsa.generate_private_key(public_exponent=e, key_size=bits).private_numbers()
+        p, q = sorted((numbers.p, numbers.q))  # Konvensi pycryptodome: p < q, u = p^-1 mod q
+        n = numbers.public_numbers.n
+        return RSA.construct((n, e, numbers.d, p, q, pow(p, -1, q)), consistency_check=False)
+
+
+BACKENDS = {
+    PycryptodomeBackend.name: PycryptodomeBackend,
+    OpenSSLBackend.name: OpenSSLBackend,
+}
+
+
+def available_backends():
+    """
+    Backend yang bisa dipakai di sistem ini.
+
+    Return:
+    - Dict nama -> objek backend.
+    """
+    result = {}
+    for name, backend_class in BACKENDS.items():
+        try:
+            result[name] = backend_class()
+        except ImportError:
+            pass
+    return result
+
+
+def _cache_path():
+    if os.environ.get("RSA_BACKEND_CACHE"):
+        return os.environ["RSA_BACKEND_CACHE"]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "py-rsa-encrypt", "backend.json")
+
+
+def _cache_key(backends):
+    """
+    Hasil benchmark hanya berlaku untuk kombinasi mesin dan versi library yang sama.
+    """
+    versions = ",".join(f"{name}={backend.version}" for name, backend in sorted(backends.items()))
+    return f"{platform.machine()}|{sys.version_info[0]}.{sys.version_info[1]}|{versions}"
+
+
+def benchmark(backends=None, rounds=BENCHMARK_ROUNDS, key_size=BENCHMARK_KEY_SIZE):
+    """
+    Micro-benchmark dekripsi OAEP per backend, sekaligus cek silang kompatibilitas ciphertext.
+
+    Return:
+    - Dict nama -> milidetik per dekripsi (None jika backend menghasilkan output yang tidak kompatibel).
+    """
+    backends = backends or available_backends()
+    generator = backends.get(OpenSSLBackend.name) or next(iter(backends.values()))
+    key = generator.generate(key_size)
+    ciphers = {name: backend.oaep_cipher(key) for name, backend in backends.items()}
+    message = b"backend benchmark"
+    results = {}
+    for name, cipher in ciphers.items():
+        ciphertext = cipher.encrypt(message)
+        if any(other.decrypt(ciphertext) != message for other in ciphers.values()):
+            results[name] = None  # Tidak interoperabel, jangan dipilih
+            continue
+        start = time.perf_counter()
+        for _ in range(rounds):
+            cipher.decrypt(ciphertext)
+        results[name] = (time.perf_counter() - start) / rounds * 1000
+    return results
+
+
+def _auto_select(backends):
+    """
+    Memilih backend tercepat, hasil benchmark dibaca dari (atau ditulis ke) cache.
+    """
+    if len(backends) == 1:
+        return next(iter(backends.values()))
+    path = _cache_path()
+    key = _cache_key(backends)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == key and cached.get("backend") in backends:
+            return backends[cached["backend"]]
+    except (OSError, ValueError):
+        pass  # Belum ada cache atau cache rusak: benchmark ulang
+
+    results = benchmark(backends)
+    usable = {name: ms for name, ms in results.items() if ms is not None}
+    choice = min(usable, key=usable.get) if usable else PycryptodomeBackend.name
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "backend": choice, "decrypt_ms": results}, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # Cache hanya optimasi, folder read-only tidak masalah
+    return backends[choice]
+
+
+def select(choice=DEFAULT_CHOICE):
+    """
+    Membuat backend sesuai pilihan.
+
+    Parameter:
+    - choice: "pycryptodome", "openssl", atau "auto" (tercepat menurut benchmark yang di-cache).
+
+    Return:
+    - Objek backend.
+    """
+    if choice == "auto":
+        return _auto_select(available_backends())
+    if choice not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {choice} (pilih auto, {', '.join(BACKENDS)}).")
+    try:
+        return BACKENDS[choice]()
+    except ImportError:
+        warnings.warn(f"Backend {choice} tidak terpasang, memakai {PycryptodomeBackend.name}.", RuntimeWarning)
+        return PycryptodomeBackend()
+
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Backend aktif, dipilih saat pertama kali dibutuhkan (dari env RSA_BACKEND).
+    """
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = select(os.environ.get("RSA_BACKEND") or DEFAULT_CHOICE)
+    return _backend
+
+
+def set_backend(choice):
+    """
+    Mengganti backend aktif. Cipher yang sudah di-cache (lib.keycache) perlu dikosongkan
+    oleh pemanggil; RSAHandler.set_backend melakukannya.
+
+    Return:
+    - Nama backend yang benar-benar dipakai.
+    """
+    global _backend
+    backend = select(choice)
+    with _lock:
+        _backend = backend
+    return backend.name
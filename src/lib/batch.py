@@ -0,0 +1,100 @@
+"""
+Enkripsi dan dekripsi banyak pesan sekaligus (batch).
+
+Dekripsi dengan kunci private adalah operasi berat di CPU, jadi batch besar
+dibagi ke beberapa proses worker. Kunci dikirim sekali saja ke tiap worker
+(lewat initializer) dan disimpan di variabel global worker, bukan di-pickle
+ulang untuk setiap pesan.
+"""
+
+import os
+
+from .keycache import oaep_cipher
+from .keyformat import export_key, import_key
+
+DEFAULT_SERIAL_THRESHOLD = 64  # Batch lebih kecil dari ini dikerjakan langsung (tanpa pool)
+
+_worker_key = None  # Kunci milik proses worker, diisi oleh _init_worker
+
+
+def _init_worker(key_data):
+    """
+    Initializer worker: impor kunci satu kali per proses.
+    """
+    global _worker_key
+    _worker_key = import_key(key_data)
+
+
+def _encrypt_one(message):
+    return oaep_cipher(_worker_key).encrypt(message.encode())
+
+
+def _decrypt_one(encrypted_message):
+    return oaep_cipher(_worker_key).decrypt(encrypted_message).decode()
+
+
+class BatchPool:
+    """
+    Pool proses untuk operasi RSA OAEP massal dengan satu kunci.
+    Bisa dipakai ulang untuk beberapa batch (misalnya dengan `with BatchPool(...) as pool`).
+    """
+
+    def __init__(self, key, workers=None, serial_threshold=DEFAULT_SERIAL_THRESHOLD):
+        """
+        Inisialisasi BatchPool.
+
+        Parameter:
+        - key: Kunci RSA (public untuk enkripsi, private untuk dekripsi).
+        - workers: Jumlah proses worker (default: jumlah CPU).
+        - serial_threshold: Batch dengan jumlah pesan di bawah nilai ini dikerjakan serial.
+        """
+        self.key = key
+        self.workers = workers or os.cpu_count() or 1
+        self.serial_threshold = serial_threshold
+        self._executor = None  # Dibuat saat pertama kali dibutuhkan
+
+    def _get_executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor  # Impor saat dibutuhkan, menjaga startup tetap cepat
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(export_key(self.key),),  # Format biner: worker tidak mengulang uji primalitas PEM
+            )
+        return self._executor
+
+    def _run(self, serial_func, worker_func, items):
+        items = list(items)  # Perlu panjang batch dan urutan hasil tetap
+        if len(items) < self.serial_threshold or self.workers == 1:
+            return [serial_func(item) for item in items]
+        chunksize = max(1, len(items) // (self.workers * 4))  # Kurangi overhead IPC per pesan
+        return list(self._get_executor().map(worker_func, items, chunksize=chunksize))
+
+    def encrypt_many(self, messages):
+        """
+        Mengenkripsi banyak pesan teks, hasil berurutan sesuai input.
+        """
+        cipher = oaep_cipher(self.key)
+        return self._run(lambda m: cipher.encrypt(m.encode()), _encrypt_one, messages)
+
+    def decrypt_many(self, encrypted_messages):
+        """
+        Mendekripsi banyak pesan terenkripsi, hasil berurutan sesuai input.
+        """
+        cipher = oaep_cipher(self.key)
+        return self._run(lambda c: cipher.decrypt(c).decode(), _decrypt_one, encrypted_messages)
+
+    def close(self):
+        """
+        Mematikan proses worker.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,143 @@
+"""
+Kompresi sebelum enkripsi.
+
+Ciphertext tidak bisa dikompresi, jadi kompresi harus dilakukan sebelum data
+dienkripsi. Sebelum mengompresi, sampel kecil dicoba dulu dengan zlib level 1
+(murah); jika hasilnya hampir tidak mengecil (misalnya file yang sudah
+terkompresi, gambar, atau data acak), kompresi dilewati otomatis.
+
+Codec dicatat sebagai satu byte (CODEC_*) di header ciphertext.
+zstd hanya tersedia jika paket zstandard terpasang.
+"""
+
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Opsional, zlib dan lzma selalu ada di standard library
+    zstandard = None
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODEC_ZSTD = 3
+
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "lzma": CODEC_LZMA, "zstd": CODEC_ZSTD}
+DEFAULT_CODEC = CODEC_ZLIB  # Untuk "auto": bisa dibuka di mana saja tanpa paket tambahan
+
+SAMPLE_SIZE = 16 * 1024  # Byte yang dicoba untuk mendeteksi data yang tidak bisa dikompresi
+MIN_SIZE = 256  # Data lebih kecil dari ini tidak sebanding dengan overhead kompresi
+MAX_RATIO = 0.9  # Sampel harus mengecil minimal 10% supaya kompresi dipakai
+
+ZLIB_LEVEL = 1  # Level 1: ~2.5x lebih cepat dari 6, rasio untuk log hanya sedikit lebih buruk
+LZMA_PRESET = 6
+ZSTD_LEVEL = 3
+
+
+def available_codecs():
+    """
+    Nama codec yang bisa dipakai di lingkungan ini.
+    """
+    return [name for name, codec in CODECS.items() if codec != CODEC_ZSTD or zstandard is not None]
+
+
+def _require(codec):
+    if codec not in CODECS.values():
+        raise ValueError(f"Codec kompresi tidak dikenal: {codec}")
+    if codec == CODEC_ZSTD and zstandard is None:
+        raise ValueError("Codec zstd membutuhkan paket zstandard.")
+
+
+def is_compressible(sample):
+    """
+    Mengecek dengan murah apakah data layak dikompresi.
+
+    Parameter:
+    - sample: Awal data (hanya SAMPLE_SIZE byte pertama yang dicoba).
+
+    Return:
+    - True jika sampel mengecil minimal (1 - MAX_RATIO).
+    """
+    sample = sample[:SAMPLE_SIZE]
+    if len(sample) < MIN_SIZE:
+        return False
+    return len(zlib.compress(sample, 1)) <= len(sample) * MAX_RATIO
+
+
+def choose_codec(compression, sample):
+    """
+    Memilih codec untuk data berdasarkan pilihan pengguna dan sampel data.
+
+    Parameter:
+    - compression: "auto", "none" / None, atau nama codec ("zlib", "lzma", "zstd").
+    - sample: Awal data untuk deteksi data yang tidak bisa dikompresi.
+
+    Return:
+    - Konstanta CODEC_* (CODEC_NONE jika sampel tidak bisa dikompresi).
+    """
+    if compression is None:
+        return CODEC_NONE
+    if compression == "auto":
+        codec = DEFAULT_CODEC
+    elif compression in CODECS:
+        codec = CODECS[compression]
+    else:
+        raise ValueError(f"Pilihan kompresi tidak dikenal: {compression} (pilih auto, {', '.join(available_codecs())}).")
+    _require(codec)
+    if codec == CODEC_NONE or not is_compressible(sample):
+        return CODEC_NONE
+    return codec
+
+
+def compress(codec, data):
+    """
+    Mengompresi data dengan codec tertentu.
+    """
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == CODEC_LZMA:
+        return lzma.compress(data, preset=LZMA_PRESET)
+    _require(codec)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return bytes(data)
+
+
+def decompress(codec, data, max_size):
+    """
+    Mendekompresi data, raise ValueError jika rusak atau hasilnya lebih dari max_size
+    (mencegah decompression bomb).
+
+    Parameter:
+    - codec: Konstanta CODEC_*.
+    - data: Data terkompresi.
+    - max_size: Ukuran maksimum hasil dekompresi.
+
+    Return:
+    - Data asli (bytes).
+    """
+    try:
+        if codec == CODEC_ZLIB:
+            decompressor = zlib.decompressobj()
+            result = decompressor.decompress(data, max_size)
+            complete = decompressor.eof and not decompressor.unconsumed_tail and not decompressor.unused_data
+        elif codec == CODEC_LZMA:
+            decompressor = lzma.LZMADecompressor()
+            result = decompressor.decompress(data, max_length=max_size)
+            complete = decompressor.eof and not decompressor.unused_data
+        else:
+            _require(codec)
+            if codec == CODEC_NONE:
+                return bytes(data)
+            result = zstandard.ZstdDecompressor().decompress(data, max_output_size=max_size)
+            complete = True
+    except (zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"Data terkompresi rusak: {e}") from None
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise ValueError(f"Data terkompresi rusak: {e}") from None
+        raise
+    if not complete or len(result) > max_size:
+        raise ValueError("Data terkompresi rusak atau melebihi ukuran maksimum.")
+    return result
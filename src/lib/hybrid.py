@@ -0,0 +1,529 @@
+"""
+Enkripsi hybrid untuk data besar (file).
+
+RSA OAEP hanya bisa mengenkripsi data kecil (sekitar 214 byte untuk key 2048-bit),
+jadi data dienkripsi dengan data key AES-GCM yang acak, lalu data key tersebut
+dibungkus (wrap) dengan kunci public RSA OAEP.
+
+Format stream:
+- Header: MAGIC | versi (1 byte) | chunk_size (4 byte) | panjang wrapped key (2 byte)
+  | key id (32 byte, sejak versi 2) | algoritma (1 byte, sejak versi 3)
+  | codec kompresi (1 byte, sejak versi 4) | wrapped key | nonce prefix (8 byte)
+- Record per chunk: flag (1 byte, bit 1 = chunk terakhir, bit 2 = terkompresi)
+  | panjang (4 byte) | ciphertext | tag GCM (16 byte)
+- Index (sejak versi 3), setelah record terakhir: per chunk offset record (8 byte)
+  | panjang plaintext (4 byte) | tag GCM (16 byte), lalu footer: offset index (8 byte)
+  | jumlah chunk (4 byte) | INDEX_MAGIC
+
+Semua chunk kecuali yang terakhir berisi tepat chunk_size byte plaintext, jadi
+chunk yang memuat byte ke-x adalah x // chunk_size. Dengan index di akhir file,
+sebagian plaintext bisa didekripsi dengan membaca footer, index, dan chunk yang
+dibutuhkan saja (lihat RangeReader).
+
+Kompresi (sejak versi 4) dilakukan per chunk sebelum enkripsi, jadi akses acak
+tetap bekerja. Chunk yang tidak mengecil disimpan apa adanya (bit terkompresi 0).
+
+Sejak versi 5, seluruh byte header ikut diautentikasi sebagai AAD di setiap chunk,
+jadi mengubah versi, key id, algoritma, codec, atau chunk_size membuat tag GCM
+chunk gagal diverifikasi. chunk_size dari header dibatasi MAX_CHUNK_SIZE sebelum
+buffer dialokasikan, karena header baru terautentikasi setelah chunk pertama.
+"""
+
+import mmap
+import os
+import stat
+import struct
+from collections import namedtuple
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+from . import compression
+from .keycache import FINGERPRINT_SIZE, fingerprint, oaep_cipher
+
+MAGIC = b"RSAH"  # Penanda file hasil enkripsi hybrid
+INDEX_MAGIC = b"RSAX"  # Penanda footer index chunk
+VERSION = 5
+SUPPORTED_VERSIONS = (1, 2, 3, 4, 5)  # Versi 1: tanpa key id, 2: tanpa algoritma dan index, 3: tanpa kompresi, 4: header tanpa AAD
+ALG_AES_256_GCM = 1
+KEY_ID_SIZE = FINGERPRINT_SIZE  # Fingerprint kunci public penerima
+DEFAULT_CHUNK_SIZE = 64 * 1024  # 64 KiB per chunk
+MAX_CHUNK_SIZE = 16 * 1024 * 1024  # Batas chunk_size, dicek sebelum buffer chunk dialokasikan
+MAX_CHUNKS = 2**32  # Counter chunk di nonce 4 byte: nonce tidak boleh berulang
+DATA_KEY_SIZE = 32  # AES-256
+NONCE_PREFIX_SIZE = 8
+TAG_SIZE = 16
+
+FLAG_MORE = 0
+FLAG_FINAL = 1
+FLAG_COMPRESSED = 2
+
+_HEADER_FIXED = struct.Struct(">4sBIH")  # magic, versi, chunk_size, panjang wrapped key
+_RECORD_HEADER = struct.Struct(">BI")  # flag, panjang ciphertext
+_INDEX_ENTRY = struct.Struct(">QI16s")  # offset record, panjang plaintext, tag GCM
+_FOOTER = struct.Struct(">QI4s")  # offset index, jumlah chunk, INDEX_MAGIC
+
+_Header = namedtuple("_Header", "version chunk_size key_id codec wrapped_key nonce_prefix size aad")
+
+
+def _chunk_cipher(data_key, nonce_prefix, counter, flag, aad=b""):
+    """
+    Membuat cipher AES-GCM untuk satu chunk.
+    Nonce = nonce prefix + counter chunk, flag ikut diautentikasi supaya
+    pemotongan (truncation) stream bisa dideteksi. aad: byte header (versi 5),
+    kosong untuk versi lama.
+    """
+    if counter >= MAX_CHUNKS:
+        raise ValueError(f"Stream terlalu panjang: lebih dari {MAX_CHUNKS} chunk, pakai chunk_size yang lebih besar.")
+    nonce = nonce_prefix + struct.pack(">I", counter)
+    cipher = AES.new(data_key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+    cipher.update(bytes([flag]) + aad)
+    return cipher
+
+
+def _read_exact(reader, size):
+    """
+    Membaca tepat `size` byte dari reader, raise ValueError jika stream terpotong.
+    """
+    data = reader.read(size)
+    if len(data) != size:
+        raise ValueError("Stream terenkripsi terpotong atau rusak.")
+    return data
+
+
+def _read_chunk(reader, chunk_size):
+    """
+    Membaca satu chunk penuh (kurang dari chunk_size hanya di akhir stream).
+    Pipe bisa mengembalikan data lebih sedikit per read, padahal index
+    mengandalkan setiap chunk selain yang terakhir berukuran tepat chunk_size.
+    """
+    chunk = reader.read(chunk_size)
+    while chunk and len(chunk) < chunk_size:
+        more = reader.read(chunk_size - len(chunk))
+        if not more:
+            break
+        chunk += more
+    return chunk
+
+
+def _remaining_size(reader):
+    """
+    Sisa byte reader jika berupa file biasa, None untuk pipe, socket, atau objek tanpa fileno.
+    """
+    try:
+        info = os.fstat(reader.fileno())
+        if not stat.S_ISREG(info.st_mode):
+            return None
+        return max(0, info.st_size - reader.tell())
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _view_reader(view):
+    """
+    Fungsi read(size) untuk memoryview, dipakai _read_header saat membaca dari mmap.
+    """
+    offset = 0
+
+    def read(size):
+        nonlocal offset
+        if offset + size > len(view):
+            raise ValueError("Stream terenkripsi terpotong atau rusak.")
+        data = bytes(view[offset : offset + size])
+        offset += size
+        return data
+
+    return read
+
+
+def _read_header(read):
+    """
+    Membaca dan memvalidasi header lewat fungsi read(size).
+
+    Return:
+    - _Header (key_id None untuk versi 1, size = panjang header dalam byte,
+      aad = byte header untuk diautentikasi di setiap chunk, kosong sebelum versi 5).
+    """
+    parts = []  # Semua byte header, untuk AAD
+
+    def read(size, read_raw=read):
+        data = read_raw(size)
+        parts.append(data)
+        return data
+
+    magic, version, chunk_size, wrapped_len = _HEADER_FIXED.unpack(read(_HEADER_FIXED.size))
+    if magic != MAGIC:
+        raise ValueError("Data bukan format enkripsi hybrid.")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Versi format hybrid tidak didukung: {version}")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:  # Belum terautentikasi: jangan alokasikan buffer sebesar ini
+        raise ValueError(f"chunk_size di header tidak valid: {chunk_size}")
+    size = _HEADER_FIXED.size + wrapped_len + NONCE_PREFIX_SIZE
+    key_id = None
+    if version >= 2:
+        key_id = read(KEY_ID_SIZE)
+        size += KEY_ID_SIZE
+    if version >= 3:
+        algorithm = read(1)[0]
+        if algorithm != ALG_AES_256_GCM:
+            raise ValueError(f"Algoritma chunk tidak didukung: {algorithm}")
+        size += 1
+    codec = compression.CODEC_NONE
+    if version >= 4:
+        codec = read(1)[0]
+        if codec not in compression.CODECS.values():
+            raise ValueError(f"Codec kompresi tidak dikenal: {codec}")
+        size += 1
+    wrapped_key = read(wrapped_len)
+    nonce_prefix = read(NONCE_PREFIX_SIZE)
+    aad = b"".join(parts) if version >= 5 else b""
+    return _Header(version, chunk_size, key_id, codec, wrapped_key, nonce_prefix, size, aad)
+
+
+def _check_record(header, flag, length):
+    """
+    Validasi flag dan panjang record terhadap header.
+    """
+    allowed = FLAG_FINAL | (FLAG_COMPRESSED if header.codec != compression.CODEC_NONE else 0)
+    if flag & ~allowed or length > header.chunk_size:
+        raise ValueError("Record chunk tidak valid.")
+
+
+def _chunk_plaintext(header, flag, data):
+    """
+    Plaintext chunk setelah didekripsi: didekompresi jika bit terkompresi diset.
+    """
+    if flag & FLAG_COMPRESSED:
+        return compression.decompress(header.codec, data, header.chunk_size)
+    return data
+
+
+def _pack_index(entries, index_offset):
+    """
+    Index chunk + footer yang ditulis setelah record terakhir (format versi 3).
+    """
+    index = b"".join(_INDEX_ENTRY.pack(*entry) for entry in entries)
+    return index + _FOOTER.pack(index_offset, len(entries), INDEX_MAGIC)
+
+
+def is_hybrid(prefix):
+    """
+    Mengecek apakah data diawali header stream hybrid.
+
+    Parameter:
+    - prefix: Beberapa byte pertama dari file/data.
+
+    Return:
+    - True jika data berformat hybrid.
+    """
+    return prefix[: len(MAGIC)] == MAGIC
+
+
+def resolve_key(private_key, key_id):
+    """
+    Memilih kunci private untuk ciphertext.
+
+    Parameter:
+    - private_key: Kunci private, atau keystore (objek dengan method private_key_for).
+    - key_id: Key id dari header, None untuk format versi 1.
+
+    Return:
+    - Kunci private (atau pengganti kunci seperti AgentKey).
+    """
+    if hasattr(private_key, "private_key_for"):
+        return private_key.private_key_for(key_id)  # Lookup langsung, tanpa mencoba kunci satu per satu
+    return private_key
+
+
+def encrypt_stream(public_key, reader, writer, chunk_size=DEFAULT_CHUNK_SIZE, compress=None):
+    """
+    Mengenkripsi stream dari reader ke writer per chunk (memori konstan).
+
+    Parameter:
+    - public_key: Kunci public RSA untuk membungkus data key.
+    - reader: Objek file biner yang dibaca (punya method read).
+    - writer: Objek file biner tujuan (punya method write).
+    - chunk_size: Ukuran chunk plaintext dalam byte.
+    - compress: None / "none" (default), "auto", atau nama codec ("zlib", "lzma", "zstd").
+      Kompresi harus diminta eksplisit: panjang ciphertext data terkompresi membocorkan isinya.
+      Codec dipilih dari sampel chunk pertama; data yang tidak bisa dikompresi tidak dikompresi.
+
+    Return:
+    - Jumlah byte plaintext yang dienkripsi.
+    """
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size harus antara 1 dan {MAX_CHUNK_SIZE}.")
+    size = _remaining_size(reader)
+    if size is not None and size > chunk_size * MAX_CHUNKS:  # Dicek sebelum ada yang ditulis
+        raise ValueError(f"Stream terlalu panjang: lebih dari {MAX_CHUNKS} chunk, pakai chunk_size yang lebih besar.")
+
+    data_key = get_random_bytes(DATA_KEY_SIZE)  # Data key acak untuk file ini
+    nonce_prefix = get_random_bytes(NONCE_PREFIX_SIZE)
+    wrapped_key = oaep_cipher(public_key).encrypt(data_key)  # Bungkus data key dengan RSA OAEP
+    chunk = _read_chunk(reader, chunk_size)
+    codec = compression.choose_codec(compress, chunk)
+
+    header = b"".join((
+        _HEADER_FIXED.pack(MAGIC, VERSION, chunk_size, len(wrapped_key)),
+        fingerprint(public_key),
+        bytes([ALG_AES_256_GCM, codec]),
+        wrapped_key,
+        nonce_prefix,
+    ))
+    writer.write(header)
+
+    offset = len(header)  # Posisi record berikutnya, untuk index
+    entries = []
+    total = 0
+    counter = 0
+    while True:
+        next_chunk = _read_chunk(reader, chunk_size)  # Baca satu chunk ke depan untuk tahu chunk terakhir
+        flag = FLAG_FINAL if not next_chunk else FLAG_MORE
+        payload = chunk
+        if codec != compression.CODEC_NONE:
+            compressed = compression.compress(codec, chunk)
+            if len(compressed) < len(chunk):  # Chunk yang tidak mengecil disimpan apa adanya
+                payload = compressed
+                flag |= FLAG_COMPRESSED
+        cipher = _chunk_cipher(data_key, nonce_prefix, counter, flag, header)  # Header diautentikasi di setiap chunk
+        ciphertext, tag = cipher.encrypt_and_digest(payload)
+        writer.write(_RECORD_HEADER.pack(flag, len(ciphertext)))
+        writer.write(ciphertext)
+        writer.write(tag)
+        entries.append((offset, len(chunk), tag))
+        offset += _RECORD_HEADER.size + len(ciphertext) + TAG_SIZE
+        total += len(chunk)
+        counter += 1
+        if flag & FLAG_FINAL:
+            writer.write(_pack_index(entries, offset))
+            return total
+        chunk = next_chunk
+
+
+def decrypt_stream(private_key, reader, writer):
+    """
+    Mendekripsi stream hybrid dari reader ke writer per chunk (memori konstan).
+
+    Parameter:
+    - private_key: Kunci private RSA untuk membuka data key, atau keystore (dipilih lewat key id).
+    - reader: Objek file biner berisi data terenkripsi.
+    - writer: Objek file biner tujuan plaintext.
+
+    Return:
+    - Jumlah byte plaintext yang ditulis.
+    """
+    header = _read_header(lambda size: _read_exact(reader, size))
+    nonce_prefix = header.nonce_prefix
+    private_key = resolve_key(private_key, header.key_id)
+    data_key = oaep_cipher(private_key).decrypt(header.wrapped_key)  # Buka data key dengan RSA OAEP
+
+    offset = header.size
+    entries = []
+    total = 0
+    counter = 0
+    while True:
+        record_header = reader.read(_RECORD_HEADER.size)
+        if not record_header:
+            raise ValueError("Stream terenkripsi terpotong: chunk terakhir tidak ditemukan.")
+        if len(record_header) != _RECORD_HEADER.size:
+            raise ValueError("Stream terenkripsi terpotong atau rusak.")
+        flag, length = _RECORD_HEADER.unpack(record_header)
+        _check_record(header, flag, length)
+
+        ciphertext = _read_exact(reader, length)
+        tag = _read_exact(reader, TAG_SIZE)
+        cipher = _chunk_cipher(data_key, nonce_prefix, counter, flag, header.aad)
+        plaintext = _chunk_plaintext(header, flag, cipher.decrypt_and_verify(ciphertext, tag))  # ValueError jika data dimodifikasi
+        writer.write(plaintext)
+        if header.version >= 3:
+            entries.append((offset, len(plaintext), tag))
+        offset += _RECORD_HEADER.size + length + TAG_SIZE
+        total += len(plaintext)
+        counter += 1
+        if flag & FLAG_FINAL:
+            if header.version >= 3:
+                index = _pack_index(entries, offset)
+                if reader.read(len(index)) != index:  # Index harus cocok dengan record yang dibaca
+                    raise ValueError("Index chunk tidak cocok dengan isi stream.")
+            if reader.read(1):
+                raise ValueError("Ada data tambahan setelah chunk terakhir.")
+            return total
+
+
+def decrypt_mapped(private_key, reader, writer, progress=None):
+    """
+    Mendekripsi file hybrid lewat memory-map tanpa salinan data tambahan.
+
+    Ciphertext dibaca langsung dari mmap lewat slice memoryview, plaintext
+    didekripsi ke satu buffer yang dialokasikan sekali, lalu buffer itu
+    ditulis ke writer. Puncak memori = satu chunk, bukan ukuran file.
+
+    Parameter:
+    - private_key: Kunci private RSA untuk membuka data key, atau keystore (dipilih lewat key id).
+    - reader: Objek file biner (harus punya fileno, misalnya hasil open()).
+    - writer: Objek file biner tujuan plaintext.
+    - progress: Callback opsional progress(jumlah byte file yang baru diproses), dipanggil setelah
+      setiap chunk ditulis; exception dari callback (misalnya pembatalan job) menghentikan dekripsi.
+
+    Return:
+    - Jumlah byte plaintext yang ditulis.
+    """
+    size = os.fstat(reader.fileno()).st_size
+    if size < _HEADER_FIXED.size:
+        raise ValueError("Stream terenkripsi terpotong atau rusak.")
+
+    error = None
+    with mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            return _decrypt_view(private_key, view, writer, progress)
+        except Exception as e:
+            # Traceback menyimpan slice memoryview, jadi dilepas dulu supaya mmap bisa ditutup
+            error = e.with_traceback(None)
+        finally:
+            view.release()  # mmap tidak bisa ditutup selama masih ada memoryview aktif
+    raise error
+
+
+def _decrypt_view(private_key, view, writer, progress=None):
+    size = len(view)
+    header = _read_header(_view_reader(view))
+    chunk_size, nonce_prefix = header.chunk_size, header.nonce_prefix
+    offset = header.size
+    data_key = oaep_cipher(resolve_key(private_key, header.key_id)).decrypt(header.wrapped_key)
+
+    output = bytearray(chunk_size)  # Buffer plaintext dipakai ulang untuk semua chunk (chunk_size sudah dibatasi _read_header)
+    output_view = memoryview(output)
+    entries = []
+    total = 0
+    counter = 0
+    reported = 0  # Offset terakhir yang sudah dilaporkan ke progress
+    while True:
+        if offset + _RECORD_HEADER.size > size:
+            raise ValueError("Stream terenkripsi terpotong: chunk terakhir tidak ditemukan.")
+        flag, length = _RECORD_HEADER.unpack_from(view, offset)
+        offset += _RECORD_HEADER.size
+        _check_record(header, flag, length)
+        if offset + length + TAG_SIZE > size:
+            raise ValueError("Stream terenkripsi terpotong atau rusak.")
+
+        cipher = _chunk_cipher(data_key, nonce_prefix, counter, flag, header.aad)
+        record_offset = offset - _RECORD_HEADER.size
+        cipher.decrypt(view[offset : offset + length], output=output_view[:length])  # Tanpa salinan perantara
+        offset += length
+        tag = bytes(view[offset : offset + TAG_SIZE])
+        cipher.verify(tag)  # Verifikasi sebelum plaintext ditulis
+        offset += TAG_SIZE
+        plaintext = _chunk_plaintext(header, flag, output_view[:length])
+        writer.write(plaintext)
+        if header.version >= 3:
+            entries.append((record_offset, len(plaintext), tag))
+        total += len(plaintext)
+        counter += 1
+        if flag & FLAG_FINAL:
+            if header.version >= 3:
+                index = _pack_index(entries, offset)
+                if view[offset : offset + len(index)] != index:
+                    raise ValueError("Index chunk tidak cocok dengan isi stream.")
+                offset += len(index)
+            if offset != size:
+                raise ValueError("Ada data tambahan setelah chunk terakhir.")
+        if progress is not None:
+            progress(offset - reported)
+            reported = offset
+        if flag & FLAG_FINAL:
+            return total
+
+
+class RangeReader:
+    """
+    Akses acak ke plaintext file hybrid versi 3 lewat index chunk.
+
+    Header, footer, dan index dibaca sekali saat dibuka (data key juga dibuka
+    sekali), lalu setiap read(start, length) hanya membaca dan mendekripsi
+    chunk yang mencakup rentang tersebut. Tidak thread-safe (memakai seek).
+    """
+
+    def __init__(self, private_key, reader):
+        """
+        Inisialisasi RangeReader.
+        private_key: Kunci private RSA, atau keystore (dipilih lewat key id).
+        reader: Objek file biner yang bisa di-seek, berisi data terenkripsi versi 3.
+        """
+        self._reader = reader
+        reader.seek(0)
+        header = _read_header(lambda size: _read_exact(reader, size))
+        if header.version < 3:
+            raise ValueError(f"Format hybrid versi {header.version} tidak punya index chunk, enkripsi ulang untuk akses acak.")
+        self.chunk_size = header.chunk_size
+        self._header = header
+
+        file_size = reader.seek(0, os.SEEK_END)
+        if file_size < header.size + _FOOTER.size:
+            raise ValueError("Stream terenkripsi terpotong atau rusak.")
+        reader.seek(file_size - _FOOTER.size)
+        index_offset, count, magic = _FOOTER.unpack(_read_exact(reader, _FOOTER.size))
+        if magic != INDEX_MAGIC or count == 0 or index_offset < header.size or \
+                index_offset + count * _INDEX_ENTRY.size + _FOOTER.size != file_size:
+            raise ValueError("Index chunk tidak ditemukan atau rusak.")
+        reader.seek(index_offset)
+        self._entries = list(_INDEX_ENTRY.iter_unpack(_read_exact(reader, count * _INDEX_ENTRY.size)))
+        if any(length != self.chunk_size for _, length, _ in self._entries[:-1]) or \
+                self._entries[-1][1] > self.chunk_size:
+            raise ValueError("Index chunk tidak valid.")
+
+        self._data_key = oaep_cipher(resolve_key(private_key, header.key_id)).decrypt(header.wrapped_key)
+        self._decrypt_chunk(count - 1)  # Chunk terakhir harus valid sebagai FINAL, jadi ukuran dari index terautentikasi
+        self.size = (count - 1) * self.chunk_size + self._entries[-1][1]
+
+    def _decrypt_chunk(self, index):
+        offset, plaintext_len, tag = self._entries[index]
+        self._reader.seek(offset)
+        flag, length = _RECORD_HEADER.unpack(_read_exact(self._reader, _RECORD_HEADER.size))
+        _check_record(self._header, flag, length)
+        if bool(flag & FLAG_FINAL) != (index == len(self._entries) - 1):
+            raise ValueError("Index chunk tidak cocok dengan isi stream.")
+        ciphertext = _read_exact(self._reader, length)
+        cipher = _chunk_cipher(self._data_key, self._header.nonce_prefix, index, flag, self._header.aad)
+        plaintext = _chunk_plaintext(self._header, flag, cipher.decrypt_and_verify(ciphertext, tag))  # ValueError jika chunk atau index dimodifikasi
+        if len(plaintext) != plaintext_len:
+            raise ValueError("Index chunk tidak cocok dengan isi stream.")
+        return plaintext
+
+    def read(self, start, length=None):
+        """
+        Mendekripsi sebagian plaintext.
+
+        Parameter:
+        - start: Offset byte pertama dalam plaintext.
+        - length: Jumlah byte (dipotong di akhir plaintext), None berarti sampai akhir.
+
+        Return:
+        - Plaintext untuk rentang tersebut (bytes).
+        """
+        if start < 0 or (length is not None and length < 0):
+            raise ValueError("start dan length tidak boleh negatif.")
+        end = self.size if length is None else min(start + length, self.size)
+        if start >= end:
+            return b""
+        first = start // self.chunk_size
+        last = (end - 1) // self.chunk_size
+        data = b"".join(self._decrypt_chunk(index) for index in range(first, last + 1))
+        base = first * self.chunk_size
+        return data[start - base : end - base]
+
+
+def decrypt_range(private_key, reader, start, length=None):
+    """
+    Mendekripsi sebagian plaintext dari file hybrid versi 3.
+
+    Parameter:
+    - private_key: Kunci private RSA, atau keystore (dipilih lewat key id).
+    - reader: Objek file biner yang bisa di-seek.
+    - start: Offset byte pertama dalam plaintext.
+    - length: Jumlah byte yang dibaca, None berarti sampai akhir.
+
+    Return:
+    - Plaintext untuk rentang tersebut (bytes).
+    """
+    return RangeReader(private_key, reader).read(start, length)
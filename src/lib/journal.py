@@ -0,0 +1,333 @@
+"""
+Jurnal pesan terenkripsi yang append-only, dengan index untuk lookup cepat.
+
+Setiap pesan terenkripsi disimpan sebagai record di journal.dat:
+panjang (4) | id (8) | timestamp mikrodetik (8) | key id (32) | crc32 (4) | ciphertext
+
+File index terpisah (journal.idx) berisi satu entry berukuran tetap per record:
+id (8) | timestamp (8) | offset record (8)
+
+Id berurutan dan timestamp tidak pernah mundur, jadi index sudah terurut untuk
+keduanya: lookup berdasarkan id atau waktu cukup binary search di index (O(log n),
+dibaca per entry dengan pread), tanpa memuat jurnal atau index ke memori. Rentang
+record dibaca berurutan dari journal.dat dan didekripsi per batch, jadi jutaan
+pesan bisa diproses dengan memori konstan.
+
+Record ditulis dulu, baru entry index-nya. Saat dibuka, record di akhir yang
+terpotong (crash saat menulis) dibuang dan entry index yang belum sempat ditulis
+dibangun ulang dari journal.dat.
+"""
+
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from .batch import BatchPool
+from .keycache import FINGERPRINT_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa kunci antar proses
+    fcntl = None
+
+DATA_NAME = "journal.dat"
+INDEX_NAME = "journal.idx"
+DATA_MAGIC = b"RSAJ"
+INDEX_MAGIC = b"RSAI"
+VERSION = 1
+DEFAULT_BATCH_SIZE = 256  # Record per batch saat dekripsi massal
+MAX_RECORD_SIZE = 1024 * 1024  # Batas panjang ciphertext per record
+MAX_OPEN_POOLS = 4  # Pool kunci yang tetap hidup saat dekripsi (kunci yang paling lama tidak dipakai ditutup)
+
+_FILE_HEADER = struct.Struct(">4sB")  # magic, versi
+_RECORD = struct.Struct(f">IQQ{FINGERPRINT_SIZE}sI")  # panjang, id, timestamp, key id, crc32
+_ENTRY = struct.Struct(">QQQ")  # id, timestamp, offset
+
+JournalRecord = namedtuple("JournalRecord", "id timestamp key_id ciphertext")
+
+
+def _now_us():
+    return time.time_ns() // 1000
+
+
+def _crc(header_fields, ciphertext):
+    return zlib.crc32(ciphertext, zlib.crc32(header_fields))
+
+
+def _open_file(path, magic):
+    """
+    Membuka (atau membuat) file jurnal/index untuk baca-tulis dan mengecek header-nya.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    f = os.fdopen(fd, "r+b", buffering=0)
+    header = f.read(_FILE_HEADER.size)
+    if not header:
+        f.write(_FILE_HEADER.pack(magic, VERSION))
+        return f
+    if len(header) != _FILE_HEADER.size or _FILE_HEADER.unpack(header) != (magic, VERSION):
+        f.close()
+        raise ValueError(f"{path} bukan file jurnal versi {VERSION}.")
+    return f
+
+
+class Journal:
+    """
+    Jurnal append-only untuk pesan terenkripsi (satu folder berisi journal.dat dan journal.idx).
+    """
+
+    def __init__(self, directory, sync=False):
+        """
+        Inisialisasi Journal (folder dibuat jika belum ada, ekor yang rusak dipulihkan).
+
+        Parameter:
+        - directory: Folder jurnal.
+        - sync: fsync setelah setiap append (lebih lambat, tahan mati listrik).
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._data = _open_file(os.path.join(directory, DATA_NAME), DATA_MAGIC)
+        try:
+            self._index = _open_file(os.path.join(directory, INDEX_NAME), INDEX_MAGIC)
+        except BaseException:
+            self._data.close()
+            raise
+        with self._file_lock():
+            self._recover()
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Kunci eksklusif antar proses selama append/pemulihan (flock pada journal.dat).
+        """
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._data.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._data.fileno(), fcntl.LOCK_UN)
+
+    # --- index ---
+
+    def _count(self):
+        return (os.fstat(self._index.fileno()).st_size - _FILE_HEADER.size) // _ENTRY.size
+
+    def _entry(self, position):
+        data = os.pread(self._index.fileno(), _ENTRY.size, _FILE_HEADER.size + position * _ENTRY.size)
+        return _ENTRY.unpack(data)
+
+    def _read_record(self, offset, data_size):
+        """
+        Membaca record di offset, return (JournalRecord, offset berikutnya) atau None jika rusak/terpotong.
+        """
+        if offset + _RECORD.size > data_size:
+            return None
+        header = os.pread(self._data.fileno(), _RECORD.size, offset)
+        length, record_id, timestamp, key_id, crc = _RECORD.unpack(header)
+        end = offset + _RECORD.size + length
+        if length > MAX_RECORD_SIZE or end > data_size:
+            return None
+        ciphertext = os.pread(self._data.fileno(), length, offset + _RECORD.size)
+        if _crc(header[: -4], ciphertext) != crc:
+            return None
+        return JournalRecord(record_id, timestamp / 1e6, key_id, ciphertext), end
+
+    def _recover(self):
+        """
+        Menyamakan index dengan journal.dat setelah crash: entry index tanpa record dibuang,
+        record tanpa entry index ditambahkan, ekor record yang terpotong dipotong.
+        """
+        data_size = os.fstat(self._data.fileno()).st_size
+        count = self._count()
+        offset = _FILE_HEADER.size
+        self._last_id, self._last_timestamp = 0, 0
+        while count:
+            last_id, last_timestamp, last_offset = self._entry(count - 1)
+            result = self._read_record(last_offset, data_size)
+            if result is not None and result[0].id == last_id:
+                self._last_id, self._last_timestamp, offset = last_id, last_timestamp, result[1]
+                break
+            count -= 1  # Record di ujung index hilang atau rusak: entry dibuang, data dipotong di bawah
+        self._index.truncate(_FILE_HEADER.size + count * _ENTRY.size)
+
+        entries = []
+        while True:
+            result = self._read_record(offset, data_size)
+            if result is None or result[0].id != self._last_id + 1:
+                break
+            record, end = result
+            self._last_id, self._last_timestamp = record.id, int(record.timestamp * 1e6)
+            entries.append(_ENTRY.pack(record.id, self._last_timestamp, offset))
+            offset = end
+        if entries:
+            self._index.seek(0, os.SEEK_END)
+            self._index.write(b"".join(entries))
+        if offset != data_size:
+            self._data.truncate(offset)  # Record terakhir terpotong atau rusak
+        self._end = offset
+
+    # --- tulis ---
+
+    def append(self, ciphertext, key_id, timestamp=None):
+        """
+        Menambahkan satu pesan terenkripsi ke akhir jurnal.
+
+        Parameter:
+        - ciphertext: Pesan terenkripsi (bytes).
+        - key_id: Fingerprint kunci yang mengenkripsi pesan (32 byte).
+        - timestamp: Waktu dalam detik (default: sekarang); tidak pernah mundur dari record sebelumnya.
+
+        Return:
+        - Id record (berurutan mulai dari 1).
+        """
+        if len(key_id) != FINGERPRINT_SIZE:
+            raise ValueError(f"Key id harus {FINGERPRINT_SIZE} byte.")
+        if len(ciphertext) > MAX_RECORD_SIZE:
+            raise ValueError("Pesan terlalu besar untuk jurnal.")
+        with self._file_lock():
+            if os.fstat(self._data.fileno()).st_size != self._end:
+                self._recover()  # Proses lain menambahkan record
+            record_id = self._last_id + 1
+            timestamp_us = max(_now_us() if timestamp is None else int(timestamp * 1e6), self._last_timestamp)
+            fields = _RECORD.pack(len(ciphertext), record_id, timestamp_us, key_id, 0)[: -4]
+            header = fields + struct.pack(">I", _crc(fields, ciphertext))
+            os.pwrite(self._data.fileno(), header + ciphertext, self._end)
+            if self.sync:
+                os.fsync(self._data.fileno())
+            self._index.seek(0, os.SEEK_END)
+            self._index.write(_ENTRY.pack(record_id, timestamp_us, self._end))
+            self._end += len(header) + len(ciphertext)
+            self._last_id, self._last_timestamp = record_id, timestamp_us
+        return record_id
+
+    # --- baca ---
+
+    def __len__(self):
+        return self._count()
+
+    def _bisect(self, field, value):
+        """
+        Posisi entry pertama dengan field (0: id, 1: timestamp) >= value (binary search di index).
+        """
+        low, high = 0, self._count()
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[field] < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, record_id):
+        """
+        Mengambil satu record berdasarkan id, raise KeyError jika tidak ada.
+        """
+        position = self._bisect(0, record_id)
+        if position < self._count():
+            entry_id, _, offset = self._entry(position)
+            if entry_id == record_id:
+                result = self._read_record(offset, os.fstat(self._data.fileno()).st_size)
+                if result is None:
+                    raise ValueError(f"Record {record_id} rusak.")
+                return result[0]
+        raise KeyError(record_id)
+
+    def records(self, start_id=None, end_id=None, since=None, until=None):
+        """
+        Iterator record dalam rentang id dan/atau waktu (batas awal inklusif, batas akhir eksklusif),
+        dibaca berurutan dari disk tanpa memuat seluruh jurnal.
+
+        Parameter:
+        - start_id, end_id: Rentang id.
+        - since, until: Rentang waktu dalam detik (epoch).
+        """
+        count = self._count()
+        start = 0
+        if start_id is not None:
+            start = max(start, self._bisect(0, start_id))
+        if since is not None:
+            start = max(start, self._bisect(1, int(since * 1e6)))
+        stop = count
+        if end_id is not None:
+            stop = min(stop, self._bisect(0, end_id))
+        if until is not None:
+            stop = min(stop, self._bisect(1, int(until * 1e6)))
+        if start >= stop:
+            return
+        offset = self._entry(start)[2]
+        data_size = os.fstat(self._data.fileno()).st_size
+        for _ in range(stop - start):
+            result = self._read_record(offset, data_size)
+            if result is None:
+                raise ValueError(f"Record di offset {offset} rusak.")
+            record, offset = result
+            yield record
+
+    def decrypt(self, keys, batch_size=DEFAULT_BATCH_SIZE, workers=None, **ranges):
+        """
+        Iterator (record, plaintext) untuk rentang record, didekripsi per batch.
+        Setiap batch dikelompokkan per key id, lalu kelompok yang besar dibagi ke pool proses
+        (BatchPool) milik kuncinya. Pool disimpan per key id dan dipakai ulang antar batch, jadi
+        record dari beberapa kunci yang berselang-seling (rotasi) tidak membuat proses worker
+        dibuat ulang. Paling banyak MAX_OPEN_POOLS pool hidup bersamaan (yang paling lama tidak
+        dipakai ditutup), dan semuanya ditutup saat iterasi selesai.
+
+        Parameter:
+        - keys: Keystore (kunci dipilih dari key id record) atau kunci private RSA.
+        - batch_size: Jumlah record yang dibaca dan didekripsi sekaligus.
+        - workers: Jumlah proses worker (default: jumlah CPU, batch kecil tetap serial).
+        - ranges: start_id, end_id, since, until seperti records().
+        """
+        pools = OrderedDict()  # key id -> BatchPool, urutan terakhir dipakai
+
+        def pool_for(key_id):
+            if key_id in pools:
+                pools.move_to_end(key_id)
+                return pools[key_id]
+            if len(pools) >= MAX_OPEN_POOLS:
+                pools.popitem(last=False)[1].close()
+            key = keys.private_key_for(key_id) if hasattr(keys, "private_key_for") else keys
+            pools[key_id] = BatchPool(key, workers=workers)  # Proses worker dibuat saat kelompok besar pertama
+            return pools[key_id]
+
+        try:
+            batch = []
+            for record in self.records(**ranges):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield from self._decrypt_batch(batch, pool_for)
+                    batch = []
+            if batch:
+                yield from self._decrypt_batch(batch, pool_for)
+        finally:
+            for pool in pools.values():
+                pool.close()
+
+    @staticmethod
+    def _decrypt_batch(batch, pool_for):
+        groups = {}
+        for position, record in enumerate(batch):
+            groups.setdefault(record.key_id, []).append(position)
+        plaintexts = [None] * len(batch)
+        for key_id, positions in groups.items():
+            results = pool_for(key_id).decrypt_many([batch[position].ciphertext for position in positions])
+            for position, plaintext in zip(positions, results):
+                plaintexts[position] = plaintext
+        return zip(batch, plaintexts)
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
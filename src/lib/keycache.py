@@ -0,0 +1,157 @@
+"""
+Cache untuk kunci RSA yang sudah di-parse dan objek cipher OAEP.
+
+Parsing PEM (base64 + ASN.1) dan pembuatan objek cipher OAEP (dari backend aktif,
+lihat lib.backend) dilakukan sekali saja, lalu dipakai ulang. Entry kunci di-key dengan path + identitas file
+(inode, mtime, ukuran), jadi jika file kunci diganti, cache otomatis invalid.
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+
+from .metrics import metrics
+from .keyformat import import_key
+
+DEFAULT_MAX_KEYS = 32
+DEFAULT_MAX_CIPHERS = 64
+FINGERPRINT_SIZE = 32
+
+
+class KeyCache:
+    """
+    Cache LRU untuk kunci RSA yang dimuat dari file.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_KEYS):
+        """
+        Inisialisasi KeyCache.
+        max_entries: Jumlah maksimum kunci yang disimpan sebelum entry terlama dibuang.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # path -> (identitas file, kunci)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _file_identity(st):
+        """
+        Identitas file dari hasil os.stat, berubah jika file ditulis ulang.
+        """
+        return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def load(self, filename):
+        """
+        Memuat kunci RSA dari file, memakai hasil parse sebelumnya jika file tidak berubah.
+
+        Parameter:
+        - filename: Nama file tempat kunci disimpan.
+
+        Return:
+        - Kunci RSA (publik atau privat).
+        """
+        path = os.path.abspath(filename)
+        identity = self._file_identity(os.stat(path))  # FileNotFoundError jika file tidak ada
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == identity:
+                self._entries.move_to_end(path)  # Tandai sebagai paling baru dipakai
+                self.hits += 1
+                return entry[1]
+
+        with metrics.track("key.parse"), open(path, "rb") as f:
+            key = import_key(f.read())  # PEM/DER (termasuk multi-prime) atau format biner
+
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = (identity, key)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # Buang entry yang paling lama tidak dipakai
+        return key
+
+    def invalidate(self, filename=None):
+        """
+        Menghapus entry cache untuk satu file, atau semua entry jika filename None.
+        """
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(filename), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CipherCache:
+    """
+    Cache LRU objek cipher OAEP per objek kunci.
+
+    RsaKey tidak hashable, jadi cache memakai id() kunci ditambah weakref
+    untuk memastikan id tersebut masih milik kunci yang sama.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_CIPHERS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # id(kunci) -> (weakref kunci, cipher)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Mengambil (atau membuat) objek cipher OAEP untuk kunci.
+
+        Parameter:
+        - key: Kunci RSA publik atau privat.
+
+        Return:
+        - Objek cipher OAEP (encrypt/decrypt) yang bisa dipakai berulang kali.
+        """
+        if not isinstance(key, RSA.RsaKey):
+            return key  # Misalnya AgentKey: sudah punya encrypt/decrypt sendiri
+        key_id = id(key)
+        with self._lock:
+            entry = self._entries.get(key_id)
+            if entry is not None and entry[0]() is key:
+                self._entries.move_to_end(key_id)
+                return entry[1]
+
+        from .backend import get_backend  # Backend dipilih (dan diimpor) saat cipher pertama dibuat
+
+        cipher = get_backend().oaep_cipher(key)  # pycryptodome atau OpenSSL, output kompatibel
+        with self._lock:
+            self._entries[key_id] = (weakref.ref(key), cipher)
+            self._entries.move_to_end(key_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cipher
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache default yang dipakai bersama oleh RSAHandler dan modul lain
+key_cache = KeyCache()
+cipher_cache = CipherCache()
+
+
+def fingerprint(key):
+    """
+    Fingerprint kunci (key id): SHA-256 dari kunci public dalam format DER.
+    Kunci private dan public dari keypair yang sama punya fingerprint yang sama.
+    """
+    return SHA256.new(key.publickey().export_key(format="DER")).digest()
+
+
+def oaep_cipher(key):
+    """
+    Shortcut untuk mengambil cipher OAEP dari cache default.
+    """
+    return cipher_cache.get(key)
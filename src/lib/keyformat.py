@@ -0,0 +1,169 @@
+"""
+Format kunci biner yang ringkas dengan jalur muat cepat.
+
+Memuat kunci private PEM mahal bukan karena base64 atau ASN.1, tapi karena
+RSA.import_key menjalankan cek konsistensi penuh, termasuk uji primalitas
+p dan q (~60 ms untuk kunci 2048-bit). Untuk keystore lokal yang dipercaya,
+uji itu tidak perlu dijalankan setiap kali kunci dimuat.
+
+Format biner menyimpan komponen kunci apa adanya, termasuk koefisien CRT u,
+jadi saat dimuat hanya tersisa beberapa operasi modulo yang murah:
+MAGIC "RSAK" | versi (1) | jenis (0 public, 1 private) | jumlah prima (1) | integer...
+
+Setiap integer: panjang (2 byte) | nilai big-endian. Urutan integer:
+- public: n, e
+- private: n, e, d, prima r1..rk, u (invers p mod q)
+
+Konversi ke/dari PEM lossless: kunci dari format biner mengekspor PEM yang
+sama persis dengan kunci aslinya.
+"""
+
+import struct
+
+from Crypto.Math.Numbers import Integer
+from Crypto.Math.Primality import COMPOSITE, test_probable_prime
+from Crypto.PublicKey import RSA
+
+from .multiprime import MultiPrimeRsaKey
+from .multiprime import import_key as import_pem
+
+MAGIC = b"RSAK"
+VERSION = 1
+KIND_PUBLIC = 0
+KIND_PRIVATE = 1
+FORMATS = ("pem", "binary")
+
+_HEADER = struct.Struct(">4sBBB")  # magic, versi, jenis, jumlah prima
+_LENGTH = struct.Struct(">H")
+
+
+def is_binary(data):
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def _pack_ints(values):
+    parts = []
+    for value in values:
+        value = int(value)
+        raw = value.to_bytes((value.bit_length() + 7) // 8 or 1, "big")
+        parts.append(_LENGTH.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def _unpack_ints(data, offset):
+    values = []
+    while offset < len(data):
+        if offset + _LENGTH.size > len(data):
+            raise ValueError("File kunci biner terpotong.")
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("File kunci biner terpotong.")
+        values.append(int.from_bytes(data[offset : offset + length], "big"))
+        offset += length
+    return values
+
+
+def export_key(key):
+    """
+    Mengekspor kunci RSA (public, private dua prima, atau multi-prime) ke format biner.
+
+    Return:
+    - Data kunci biner (bytes).
+    """
+    if not key.has_private():
+        return _HEADER.pack(MAGIC, VERSION, KIND_PUBLIC, 0) + _pack_ints((key.n, key.e))
+    primes = getattr(key, "primes", (key.p, key.q))
+    return _HEADER.pack(MAGIC, VERSION, KIND_PRIVATE, len(primes)) + _pack_ints((key.n, key.e, key.d, *primes, key.u))
+
+
+def import_key(data, verify=False):
+    """
+    Mengimpor kunci dari format biner (jalur cepat) atau PEM/DER (diteruskan ke multiprime.import_key).
+
+    Parameter:
+    - data: Data kunci (bytes).
+    - verify: Jalankan juga uji primalitas faktor (mahal). Default False untuk keystore lokal yang
+      dipercaya; cek murah (hasil kali prima = n, e*d = 1 mod (r - 1), u) tetap selalu dijalankan
+      supaya file yang rusak tidak menghasilkan kunci yang salah.
+
+    Return:
+    - RsaKey atau MultiPrimeRsaKey.
+    """
+    if not is_binary(data):
+        return import_pem(data)
+    if len(data) < _HEADER.size:
+        raise ValueError("File kunci biner terpotong.")
+    _, version, kind, prime_count = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Versi format kunci biner tidak didukung: {version}")
+    values = _unpack_ints(data, _HEADER.size)
+
+    if kind == KIND_PUBLIC:
+        if len(values) != 2:
+            raise ValueError("Kunci public biner tidak valid.")
+        return RSA.construct(values)  # Kunci public: cek konsistensinya murah
+    if kind != KIND_PRIVATE or prime_count < 2 or len(values) != 4 + prime_count:
+        raise ValueError("Kunci private biner tidak valid.")
+
+    n, e, d = values[:3]
+    primes = values[3 : 3 + prime_count]
+    u = values[3 + prime_count]
+    product = 1
+    for r in primes:
+        product *= r
+        if r < 3 or (e * d) % (r - 1) != 1:
+            raise ValueError("Kunci private biner tidak valid.")
+    if product != n or (primes[0] * u) % primes[1] != 1:
+        raise ValueError("Kunci private biner tidak valid.")
+    if verify and any(test_probable_prime(Integer(r)) == COMPOSITE for r in primes):
+        raise ValueError("Faktor kunci private bukan bilangan prima.")
+
+    if prime_count == 2:
+        key = RSA.construct((n, e, d, primes[0], primes[1], u), consistency_check=False)
+    else:
+        key = MultiPrimeRsaKey(n, e, d, primes)
+    key._primes_unverified = not verify  # Dibaca is_verified(), misalnya oleh backend OpenSSL
+    return key
+
+
+def is_verified(key):
+    """
+    True jika faktor prima kunci sudah diuji (PEM, kunci hasil generate, atau biner dengan verify=True).
+    Kunci dari jalur muat cepat tanpa verify hanya lolos cek murah.
+    """
+    return not getattr(key, "_primes_unverified", False)
+
+
+def mark_verified(key):
+    """
+    Menandai kunci sudah divalidasi (misalnya oleh OpenSSL), supaya validasi tidak diulang untuk objek ini.
+    """
+    if not is_verified(key):
+        key._primes_unverified = False
+
+
+def to_pem(data):
+    """
+    Konversi kunci biner ke PEM (PKCS#1 untuk private, SubjectPublicKeyInfo untuk public).
+    """
+    return import_key(data).export_key()
+
+
+def from_pem(pem):
+    """
+    Konversi kunci PEM ke format biner.
+    """
+    return export_key(import_pem(pem))
+
+
+def encode(key, key_format="pem"):
+    """
+    Mengekspor kunci dalam format yang dipilih ("pem" atau "binary").
+    """
+    if key_format == "binary":
+        return export_key(key)
+    if key_format == "pem":
+        return key.export_key()
+    raise ValueError(f"Format kunci tidak dikenal: {key_format} (pilih {', '.join(FORMATS)}).")
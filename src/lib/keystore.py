@@ -0,0 +1,211 @@
+"""
+Keystore: banyak keypair RSA dalam satu folder .keys, diindeks dengan fingerprint.
+
+Setiap keypair disimpan di keys/<2 hex pertama>/<fingerprint hex> (+ .pub),
+jadi lookup kunci dari key id di ciphertext cukup satu path, O(1), berapapun
+jumlah kunci lama yang disimpan. Pembagian subfolder menjaga setiap direktori
+tetap kecil saat ada ribuan kunci hasil rotasi.
+
+Keypair aktif tetap ditulis ke nama lama (rsa_pkcs1_oaep / rsa_pkcs1_oaep.pub),
+jadi kode yang hanya butuh kunci aktif tidak berubah. File index (satu baris per
+kunci) menyimpan metadata untuk ditampilkan tanpa harus mem-parse setiap kunci.
+
+Kunci private bisa disimpan dalam format biner (lib.keyformat) supaya dimuat
+tanpa uji primalitas ulang; kunci public selalu PEM karena dikirim ke peer.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from .keycache import fingerprint, key_cache
+from .keyformat import encode
+
+PUBLIC_KEY_NAME = "rsa_pkcs1_oaep.pub"
+PRIVATE_KEY_NAME = "rsa_pkcs1_oaep"
+ARCHIVE_DIR = "keys"
+INDEX_NAME = "index"
+
+
+def _write_key(path, data, private):
+    """
+    Menulis file kunci secara atomik (file sementara lalu rename), kunci private dengan mode 0600.
+    """
+    # Nama sementara unik per pemanggil: thread atau proses lain bisa menulis kunci yang sama bersamaan
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if not private:
+                os.fchmod(f.fileno(), 0o644)  # mkstemp selalu membuat file 0600
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    key_cache.invalidate(path)  # Isi file berubah, entry cache lama tidak berlaku
+
+
+class Keystore:
+    """
+    Kumpulan keypair dalam satu folder .keys, dicari lewat key id (fingerprint SHA-256).
+    """
+
+    def __init__(self, folder, key_format="pem"):
+        """
+        Inisialisasi Keystore.
+        folder: Path folder .keys (dibuat saat kunci pertama ditambahkan).
+        key_format: Format file kunci private baru, "pem" atau "binary" (muat ~100x lebih cepat).
+        """
+        self.folder = folder
+        self.key_format = key_format
+        self._lock = threading.Lock()  # Cek "sudah diarsipkan" dan penulisan index harus satu langkah
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def archive_path(self, key_id, public=False):
+        """
+        Path file kunci untuk key id tertentu.
+        """
+        key_hex = key_id.hex()
+        return os.path.join(self.folder, ARCHIVE_DIR, key_hex[:2], key_hex + (".pub" if public else ""))
+
+    def _archive(self, private_key, key_id):
+        private_path = self.archive_path(key_id)
+        if os.path.exists(private_path):
+            return False  # Sudah ada di keystore
+        os.makedirs(os.path.dirname(private_path), mode=0o700, exist_ok=True)
+        _write_key(self.archive_path(key_id, public=True), private_key.publickey().export_key(), private=False)
+        _write_key(private_path, encode(private_key, self.key_format), private=True)
+        primes = len(getattr(private_key, "primes", (private_key.p, private_key.q)))
+        with open(self._path(INDEX_NAME), "a", encoding="ascii") as index:
+            index.write(f"{key_id.hex()} {private_key.size_in_bits()} {primes} {int(time.time())}\n")
+        return True
+
+    def _archive_legacy_current(self):
+        """
+        Folder dari versi lama hanya punya kunci aktif; arsipkan dulu sebelum ditimpa.
+        """
+        try:
+            key_id = fingerprint(self.current_public_key())  # Kunci public jauh lebih murah di-parse
+        except FileNotFoundError:
+            return
+        if not os.path.exists(self.archive_path(key_id)):
+            self._archive(self.current_private_key(), key_id)
+
+    def add(self, private_key, make_current=True):
+        """
+        Menambahkan keypair ke keystore.
+
+        Parameter:
+        - private_key: Kunci private RSA (kunci public diturunkan darinya).
+        - make_current: Jadikan kunci aktif (dipakai untuk enkripsi berikutnya).
+
+        Return:
+        - Key id (fingerprint, 32 byte).
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        key_id = fingerprint(private_key)
+        with self._lock:
+            if make_current:
+                self._archive_legacy_current()  # Kunci lama tetap bisa dipakai untuk dekripsi
+            self._archive(private_key, key_id)
+            if make_current:
+                _write_key(self._path(PUBLIC_KEY_NAME), private_key.publickey().export_key(), private=False)
+                _write_key(self._path(PRIVATE_KEY_NAME), encode(private_key, self.key_format), private=True)
+        return key_id
+
+    def current_public_key(self):
+        return key_cache.load(self._path(PUBLIC_KEY_NAME))
+
+    def current_private_key(self):
+        return key_cache.load(self._path(PRIVATE_KEY_NAME))
+
+    def private_key_for(self, key_id):
+        """
+        Mengambil kunci private untuk key id dari header ciphertext.
+
+        Parameter:
+        - key_id: Fingerprint kunci, atau None (ciphertext lama tanpa key id: pakai kunci aktif).
+
+        Return:
+        - Kunci private RSA.
+        """
+        if key_id is None:
+            return self.current_private_key()
+        try:
+            return key_cache.load(self.archive_path(key_id))
+        except FileNotFoundError:
+            pass
+        try:
+            current = self.current_private_key()  # Kunci aktif yang belum diarsipkan (folder lama)
+        except FileNotFoundError:
+            current = None
+        if current is not None and fingerprint(current) == key_id:
+            return current
+        raise ValueError(f"Kunci {key_id.hex()[:16]} tidak ada di keystore {self.folder}.")
+
+    def public_key_for(self, key_id):
+        """
+        Mengambil kunci public untuk key id (misalnya dari file signature), tanpa mem-parse kunci private.
+
+        Return:
+        - Kunci public RSA.
+        """
+        try:
+            return key_cache.load(self.archive_path(key_id, public=True))
+        except FileNotFoundError:
+            pass
+        try:
+            current = self.current_public_key()  # Kunci aktif yang belum diarsipkan (folder lama)
+        except FileNotFoundError:
+            current = None
+        if current is not None and fingerprint(current) == key_id:
+            return current
+        raise ValueError(f"Kunci {key_id.hex()[:16]} tidak ada di keystore {self.folder}.")
+
+    def list_keys(self):
+        """
+        Daftar kunci dari file index (urut dari yang paling lama ditambahkan).
+
+        Return:
+        - List dict berisi key_id (hex), bits, primes, dan created (timestamp).
+        """
+        try:
+            with open(self._path(INDEX_NAME), "r", encoding="ascii") as index:
+                lines = index.read().split()
+        except FileNotFoundError:
+            return []
+        return [
+            {"key_id": key_hex, "bits": int(bits), "primes": int(primes), "created": int(created)}
+            for key_hex, bits, primes, created in zip(lines[0::4], lines[1::4], lines[2::4], lines[3::4])
+        ]
+
+    def archived_private_key_files(self):
+        """
+        Path file kunci private untuk semua kunci di index.
+        """
+        return [self.archive_path(bytes.fromhex(entry["key_id"])) for entry in self.list_keys()]
+
+    def convert(self, key_format):
+        """
+        Menulis ulang semua kunci private (aktif dan arsip) dalam format lain, tanpa kehilangan informasi.
+
+        Parameter:
+        - key_format: "pem" atau "binary".
+
+        Return:
+        - Jumlah file kunci yang ditulis ulang.
+        """
+        paths = self.archived_private_key_files()
+        if os.path.exists(self._path(PRIVATE_KEY_NAME)):
+            paths.append(self._path(PRIVATE_KEY_NAME))
+        for path in paths:
+            _write_key(path, encode(key_cache.load(path), key_format), private=True)
+        self.key_format = key_format
+        return len(paths)
+
+    def __len__(self):
+        return len(self.list_keys())
@@ -0,0 +1,275 @@
+"""
+Instrumentasi operasi RSA: counter, jumlah error, total byte, dan histogram latensi.
+
+Metrics mati secara default (atau hidup dengan env RSA_METRICS=1). Saat mati,
+setiap titik instrumentasi hanya mengecek satu atribut boolean lalu langsung
+menjalankan fungsi aslinya, jadi overhead-nya hampir nol.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+from .profiling import profiler
+
+# Batas atas bucket histogram latensi (detik), gaya Prometheus
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class _OperationStats:
+    """
+    Statistik untuk satu nama operasi.
+    """
+
+    __slots__ = ("count", "errors", "bytes", "total_seconds", "max_seconds", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds, nbytes, error):
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.bytes += nbytes
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+
+    def quantile(self, fraction):
+        """
+        Estimasi kuantil dari histogram (batas atas bucket yang memuat kuantil).
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, bucket in zip(LATENCY_BUCKETS, self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+class _Tracker:
+    """
+    Context manager untuk mengukur satu operasi. Atribut `bytes` bisa diisi di dalam blok.
+    """
+
+    __slots__ = ("_metrics", "_name", "_start", "bytes")
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+        self.bytes = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe(self._name, time.perf_counter() - self._start, self.bytes, exc_type is not None)
+        return False
+
+
+class _NullTracker:
+    """
+    Tracker kosong yang dipakai saat metrics mati.
+    """
+
+    __slots__ = ("bytes",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TRACKER = _NullTracker()
+
+
+class Metrics:
+    """
+    Registry metrics untuk semua operasi.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, nbytes=0, error=False):
+        """
+        Mencatat satu operasi selesai.
+
+        Parameter:
+        - name: Nama operasi (misalnya "rsa.decrypt").
+        - seconds: Durasi operasi.
+        - nbytes: Jumlah byte yang diproses.
+        - error: True jika operasi gagal.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = _OperationStats()
+            stats.observe(seconds, nbytes, error)
+
+    def track(self, name):
+        """
+        Context manager untuk mengukur blok kode: `with metrics.track("file.encrypt") as t: ...`.
+        """
+        if not self.enabled:
+            _NULL_TRACKER.bytes = 0
+            return _NULL_TRACKER
+        return _Tracker(self, name)
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+
+    def snapshot(self):
+        """
+        Salinan semua statistik dalam bentuk dict (aman untuk di-serialize ke JSON).
+        """
+        with self._lock:
+            result = {}
+            for name, stats in sorted(self._operations.items()):
+                result[name] = {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "bytes": stats.bytes,
+                    "total_seconds": stats.total_seconds,
+                    "mean_seconds": stats.total_seconds / stats.count if stats.count else 0.0,
+                    "max_seconds": stats.max_seconds,
+                    "p50_seconds": stats.quantile(0.50),
+                    "p95_seconds": stats.quantile(0.95),
+                    "p99_seconds": stats.quantile(0.99),
+                    "buckets": dict(zip(_bucket_labels(), stats.buckets)),
+                }
+            return result
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="rsa"):
+        """
+        Format teks eksposisi Prometheus.
+        """
+        lines = [
+            f"# TYPE {prefix}_operations_total counter",
+            f"# TYPE {prefix}_errors_total counter",
+            f"# TYPE {prefix}_bytes_total counter",
+            f"# TYPE {prefix}_latency_seconds histogram",
+        ]
+        for name, stats in self.snapshot().items():
+            label = f'op="{name}"'
+            lines.append(f"{prefix}_operations_total{{{label}}} {stats['count']}")
+            lines.append(f"{prefix}_errors_total{{{label}}} {stats['errors']}")
+            lines.append(f"{prefix}_bytes_total{{{label}}} {stats['bytes']}")
+            cumulative = 0
+            for bound, bucket in stats["buckets"].items():
+                cumulative += bucket
+                lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_latency_seconds_sum{{{label}}} {stats['total_seconds']}")
+            lines.append(f"{prefix}_latency_seconds_count{{{label}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        """
+        Menulis snapshot ke file: Prometheus jika berakhiran .prom, selain itu JSON.
+        """
+        content = self.to_prometheus() if filename.endswith(".prom") else self.to_json()
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def summary_lines(self):
+        """
+        Ringkasan satu baris per operasi untuk ditampilkan di UI.
+        """
+        lines = []
+        for name, stats in self.snapshot().items():
+            lines.append(
+                f"{name}: n={stats['count']} err={stats['errors']} "
+                f"avg={stats['mean_seconds'] * 1000:.2f}ms p95<={stats['p95_seconds'] * 1000:.2f}ms "
+                f"bytes={stats['bytes']}"
+            )
+        return lines
+
+
+def _bucket_labels():
+    return ["+Inf" if bound == float("inf") else repr(bound) for bound in LATENCY_BUCKETS]
+
+
+def timed(name, count_bytes=None):
+    """
+    Decorator untuk mengukur fungsi. count_bytes(args, result) opsional untuk menghitung byte.
+    Saat profiling hidup (lib.profiling), setiap panggilan juga diprofil dengan nama yang sama.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if profiler.enabled:  # Profiling hidup: panggilan dibungkus cProfile/tracemalloc
+                with profiler.profile(name):
+                    return measured(*args, **kwargs)
+            return measured(*args, **kwargs)
+
+        def measured(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)  # Jalur cepat saat metrics mati
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                metrics.observe(name, time.perf_counter() - start, 0, True)
+                raise
+            nbytes = count_bytes(args, result) if count_bytes else 0
+            metrics.observe(name, time.perf_counter() - start, nbytes)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class _TimedKey:
+    """
+    Pembungkus kunci RSA yang mengukur operasi matematika RSA mentah
+    (tanpa padding OAEP), supaya waktu padding dan waktu RSA bisa dibedakan.
+    """
+
+    def __init__(self, key):
+        self._key = key
+
+    def __getattr__(self, name):
+        return getattr(self._key, name)
+
+    def _encrypt(self, plaintext):
+        with metrics.track("rsa.raw_public_op"):
+            return self._key._encrypt(plaintext)
+
+    def _decrypt_to_bytes(self, ciphertext):
+        with metrics.track("rsa.raw_private_op"):
+            return self._key._decrypt_to_bytes(ciphertext)
+
+
+def instrument_key(key):
+    """
+    Membungkus kunci dengan _TimedKey jika metrics hidup, selain itu kunci dikembalikan apa adanya.
+    """
+    return _TimedKey(key) if metrics.enabled else key
+
+
+# Registry default yang dipakai bersama
+metrics = Metrics(enabled=os.environ.get("RSA_METRICS") == "1")
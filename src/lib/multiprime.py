@@ -0,0 +1,282 @@
+"""
+Kunci RSA multi-prime (RFC 8017): modulus n adalah hasil kali 3 atau 4 bilangan prima.
+
+Operasi private memakai CRT untuk setiap faktor. Karena tiap prima lebih kecil
+(misalnya 1024 bit untuk kunci 3072-bit dengan 3 prima, dibanding 1536 bit untuk
+2 prima), setiap eksponensiasi modular jauh lebih murah dan dekripsi/tanda tangan
+menjadi lebih cepat. Kunci public tetap (n, e) biasa, jadi ciphertext OAEP
+dan tanda tangan tetap kompatibel dengan kunci RSA dua prima.
+
+Format simpan: PKCS#1 RSAPrivateKey versi 1 dengan otherPrimeInfos
+(juga bisa dibungkus PKCS#8), sama seperti yang dipakai OpenSSL.
+"""
+
+import math
+
+from Crypto import Random
+from Crypto.IO import PEM, PKCS8
+from Crypto.Math.Numbers import Integer
+from Crypto.Math.Primality import COMPOSITE, generate_probable_prime, test_probable_prime
+from Crypto.PublicKey import RSA
+from Crypto.Util.asn1 import DerNull, DerSequence
+from Crypto.Util.py3compat import tobytes
+
+MIN_PRIMES = 2
+MAX_PRIMES = 4
+_MULTI_PRIME_VERSION = 1  # Versi RSAPrivateKey jika ada otherPrimeInfos
+
+
+def max_primes(bits):
+    """
+    Jumlah prima maksimum yang masih aman untuk ukuran kunci (batas yang sama dengan OpenSSL).
+    """
+    if bits < 1024:
+        return 2
+    if bits < 4096:
+        return 3
+    return MAX_PRIMES
+
+
+def _iroot(value, k):
+    """
+    Akar pangkat k (dibulatkan ke bawah) dari bilangan bulat positif.
+    """
+    root = 1 << -(-value.bit_length() // k)  # Tebakan awal >= akar sebenarnya
+    while True:
+        smaller = ((k - 1) * root + value // root ** (k - 1)) // k
+        if smaller >= root:
+            return root
+        root = smaller
+
+
+class MultiPrimeRsaKey(RSA.RsaKey):
+    """
+    Kunci private RSA dengan lebih dari dua faktor prima.
+
+    Kompatibel dengan RsaKey (PKCS1_OAEP, pss, publickey, size_in_bits, ...);
+    p dan q adalah dua prima pertama, prima lainnya ada di atribut primes.
+    """
+
+    def __init__(self, n, e, d, primes):
+        """
+        Inisialisasi MultiPrimeRsaKey.
+
+        Parameter:
+        - n, e, d: Modulus, eksponen public, dan eksponen private.
+        - primes: Daftar semua faktor prima n (urutan sesuai RFC 8017: r1=p, r2=q, r3, ...).
+        """
+        primes = [Integer(r) for r in primes]
+        p, q = primes[0], primes[1]
+        super().__init__(n=Integer(n), e=Integer(e), d=Integer(d), p=p, q=q, u=p.inverse(q))
+        self._primes = primes
+        self._exponents = [self._d % (r - 1) for r in primes]  # d_i = d mod (r_i - 1)
+        self._coefficients = [None]  # t_i = (r_1 * ... * r_(i-1))^-1 mod r_i
+        product = Integer(1)
+        for previous, r in zip(primes, primes[1:]):
+            product *= previous
+            self._coefficients.append(product.inverse(r))
+
+    @property
+    def primes(self):
+        return [int(r) for r in self._primes]
+
+    def _decrypt_to_bytes(self, ciphertext):
+        if not 0 <= ciphertext < self._n:
+            raise ValueError("Ciphertext too large")
+
+        # Blinding seperti RsaKey: c' = c * r^e mod n, hasil dikali r^-1 di akhir
+        r = Integer.random_range(min_inclusive=1, max_exclusive=self._n)
+        cp = Integer(ciphertext) * pow(r, self._e, self._n) % self._n
+
+        # CRT multi-faktor (Garner): gabungkan m_i = c'^d_i mod r_i satu per satu
+        m = pow(cp, self._exponents[0], self._primes[0])
+        modulus = self._primes[0]
+        for prime, exponent, coefficient in zip(self._primes[1:], self._exponents[1:], self._coefficients[1:]):
+            m_i = pow(cp, exponent, prime)
+            h = ((m_i - m) * coefficient) % prime
+            m = m + modulus * h
+            modulus = modulus * prime
+
+        # Cek fault CRT: hasil yang salah di salah satu faktor bisa membocorkan prima tersebut
+        if cp != pow(m, self._e, self._n):
+            raise ValueError("Fault detected in RSA decryption")
+        return Integer._mult_modulo_bytes(r.inverse(self._n), m, self._n)
+
+    def _private_der(self):
+        # Komponen diubah ke int: DerInteger menggeser nilainya in-place saat encode
+        other_prime_infos = DerSequence([
+            DerSequence([int(prime), int(exponent), int(coefficient)]).encode()
+            for prime, exponent, coefficient in zip(self._primes[2:], self._exponents[2:], self._coefficients[2:])
+        ])
+        return DerSequence([
+            _MULTI_PRIME_VERSION,
+            self.n, self.e, self.d, self.p, self.q,
+            self.dp, self.dq, self.invq,
+            other_prime_infos.encode(),
+        ]).encode()
+
+    def export_key(self, format="PEM", passphrase=None, pkcs=1, protection=None, randfunc=None, prot_params=None):
+        """
+        Ekspor kunci dengan aturan yang sama seperti RsaKey.export_key,
+        tapi struktur RSAPrivateKey-nya memuat semua prima.
+        """
+        if format not in ("PEM", "DER"):
+            return super().export_key(format, passphrase, pkcs, protection, randfunc, prot_params)
+        if passphrase is not None:
+            passphrase = tobytes(passphrase)
+
+        binary_key = self._private_der()
+        if pkcs == 1:
+            key_type = "RSA PRIVATE KEY"
+            if format == "DER" and passphrase:
+                raise ValueError("PKCS#1 private key cannot be encrypted")
+        elif format == "PEM" and protection is None:
+            key_type = "PRIVATE KEY"
+            binary_key = PKCS8.wrap(binary_key, RSA.oid, None, key_params=DerNull())
+        else:
+            key_type = "ENCRYPTED PRIVATE KEY"
+            if not protection:
+                if prot_params:
+                    raise ValueError("'protection' parameter must be set")
+                protection = "PBKDF2WithHMAC-SHA1AndDES-EDE3-CBC"
+            binary_key = PKCS8.wrap(binary_key, RSA.oid, passphrase, protection,
+                                    prot_params=prot_params, key_params=DerNull())
+            passphrase = None
+
+        if format == "DER":
+            return binary_key
+        return tobytes(PEM.encode(binary_key, key_type, passphrase, randfunc or Random.get_random_bytes))
+
+
+def generate(bits, primes=3, e=65537, randfunc=None):
+    """
+    Membuat kunci RSA multi-prime.
+
+    Parameter:
+    - bits: Ukuran modulus dalam bit (minimal 1024).
+    - primes: Jumlah faktor prima (2 berarti RSA.generate biasa).
+    - e: Eksponen public.
+    - randfunc: Sumber byte acak (default: Crypto.Random.get_random_bytes).
+
+    Return:
+    - MultiPrimeRsaKey (atau RsaKey biasa jika primes == 2).
+    """
+    if primes == MIN_PRIMES:
+        return RSA.generate(bits, randfunc, e)
+    if not MIN_PRIMES < primes <= max_primes(bits):
+        raise ValueError(f"Kunci {bits}-bit mendukung {MIN_PRIMES}..{max_primes(bits)} prima.")
+    randfunc = randfunc or Random.get_random_bytes
+    e = Integer(e)
+
+    # Ukuran tiap prima, sisa bit dibagi ke prima pertama
+    base = bits // primes
+    sizes = [base + 1] * (bits % primes) + [base] * (primes - bits % primes)
+
+    while True:
+        factors = []
+        for size in sizes:
+            # r_i >= 2^(size - 1/primes), jadi hasil kali semua prima >= 2^(bits - 1)
+            minimum = Integer(_iroot(1 << (primes * size - 1), primes) + 1)
+            min_distance = Integer(1) << (size - 100)
+
+            def prime_filter(candidate):
+                return (candidate >= minimum and
+                        (candidate - 1).gcd(e) == 1 and
+                        all(abs(candidate - r) > min_distance for r in factors))
+
+            factors.append(generate_probable_prime(exact_bits=size, randfunc=randfunc, prime_filter=prime_filter))
+
+        n = Integer(1)
+        lcm = Integer(1)
+        for r in factors:
+            n *= r
+            lcm = lcm.lcm(r - 1)
+        d = e.inverse(lcm)
+        if n.size_in_bits() == bits and d >= (Integer(1) << (bits // 2)):
+            return MultiPrimeRsaKey(n, e, d, factors)
+
+
+def _decode_private_der(der):
+    """
+    Decode RSAPrivateKey versi 1 (multi-prime), return None jika bukan format itu.
+    """
+    try:
+        seq = DerSequence().decode(der, nr_elements=10)
+    except ValueError:
+        return None
+    if seq[0] != _MULTI_PRIME_VERSION:
+        return None
+    n, e, d, p, q = seq[1:6]
+    primes = [p, q]
+    stored = [(seq[6], None), (seq[7], seq[8])]  # (d_i, koefisien) yang tersimpan
+    for info in DerSequence().decode(seq[9]):
+        prime, exponent, coefficient = DerSequence().decode(info, nr_elements=3, only_ints_expected=True)
+        primes.append(prime)
+        stored.append((exponent, coefficient))
+
+    # Cek konsistensi seperti RSA.import_key: hasil kali prima = n, e*d = 1 mod lambda(n),
+    # semua faktor prima dan berbeda
+    if not MIN_PRIMES <= len(primes) <= MAX_PRIMES or len(set(primes)) != len(primes):
+        raise ValueError("Invalid multi-prime RSA key")
+    if e < 3 or e % 2 == 0 or not 1 < d < n:
+        raise ValueError("Invalid multi-prime RSA key")
+    product = 1
+    lam = 1  # lambda(n) = lcm(r_i - 1)
+    for r in primes:
+        if r < 3:
+            raise ValueError("Invalid multi-prime RSA key")
+        product *= r
+        lam = math.lcm(lam, r - 1)
+    if product != n or (e * d) % lam != 1:
+        raise ValueError("Invalid multi-prime RSA key")
+    if any(test_probable_prime(Integer(r)) == COMPOSITE for r in primes):
+        raise ValueError("Invalid multi-prime RSA key")
+
+    key = MultiPrimeRsaKey(n, e, d, primes)
+    # d_i dan koefisien yang tersimpan harus sama dengan yang dihitung ulang
+    if stored[0][0] != key._exponents[0] or stored[1] != (key._exponents[1], key.invq):
+        raise ValueError("Invalid multi-prime RSA key")
+    for (exponent, coefficient), computed_exponent, computed_coefficient in zip(stored[2:], key._exponents[2:], key._coefficients[2:]):
+        if exponent != computed_exponent or coefficient != computed_coefficient:
+            raise ValueError("Invalid multi-prime RSA key")
+    return key
+
+
+def import_key(extern_key, passphrase=None):
+    """
+    Mengimpor kunci RSA, termasuk kunci multi-prime.
+
+    Kunci dua prima dan kunci public langsung diteruskan ke RSA.import_key,
+    jadi jalur umum tidak bertambah lambat.
+
+    Parameter:
+    - extern_key: Data kunci (PEM atau DER, byte atau string).
+    - passphrase: Passphrase opsional untuk kunci terenkripsi.
+
+    Return:
+    - RsaKey atau MultiPrimeRsaKey.
+    """
+    try:
+        return RSA.import_key(extern_key, passphrase)
+    except ValueError as error:
+        original = error
+
+    passphrase = tobytes(passphrase) if passphrase is not None else None
+    key = None
+    try:
+        data = tobytes(extern_key)
+        if data.startswith(b"-----"):
+            der, marker, _ = PEM.decode(data.decode("ascii"), passphrase)
+        else:
+            der, marker = data, None  # DER: bisa PKCS#1 atau PKCS#8
+        if marker in (None, "RSA PRIVATE KEY"):
+            key = _decode_private_der(der)
+        if key is None and marker != "RSA PRIVATE KEY":
+            oid, der, _ = PKCS8.unwrap(der, None if marker == "PRIVATE KEY" else passphrase)  # PEM sudah didekripsi
+            if oid == RSA.oid:
+                key = _decode_private_der(der)
+    except (ValueError, IndexError, TypeError):
+        key = None
+    if key is None:
+        raise original
+    return key
@@ -0,0 +1,188 @@
+"""
+Profiling on-demand: cProfile dan snapshot alokasi tracemalloc per aksi.
+
+Profiling mati secara default. Hidup dengan env RSA_PROFILE=<folder> (atau toggle
+'p' di menu). Setiap aksi menu yang berjalan di thread UI, setiap job background
+(diprofil di thread worker-nya, jadi pekerjaan kriptonya ikut terukur), dan setiap
+operasi yang diukur dengan @timed (semua method RSAHandler, handshake jaringan,
+transfer file) lalu menulis:
+- <folder>/<waktu>-<pid>-<nomor>-<aksi>.prof: statistik cProfile, dibuka dengan
+  pstats, snakeviz, atau tuna.
+- <folder>/<waktu>-<pid>-<nomor>-<aksi>.alloc.txt: selisih alokasi selama aksi
+  (snapshot tracemalloc akhir dibandingkan dengan snapshot awal, compare_to),
+  baris dengan pertambahan memori terbesar dulu.
+- <folder>/<waktu>-<pid>-<nomor>-<aksi>.snapshot: snapshot tracemalloc akhir, dibuka
+  dengan tracemalloc.Snapshot.load.
+
+tracemalloc melacak seluruh proses, jadi selisih alokasi aksi yang berjalan
+bersamaan dengan job lain juga memuat alokasi job tersebut. Aksi di dalam aksi
+lain di thread yang sama (misalnya rsa.decrypt di dalam job "decrypt file")
+tidak ditulis terpisah, sudah tercakup di profil aksi luarnya. Env tambahan:
+- RSA_PROFILE_MEMORY: jumlah frame traceback tracemalloc (default 1, 0 mematikan snapshot).
+- RSA_PROFILE_SAMPLE: fraksi aksi yang diprofil (default 1.0), untuk server yang sibuk.
+
+Saat mati, setiap titik instrumentasi hanya mengecek satu atribut boolean.
+"""
+
+import cProfile
+import itertools
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+DEFAULT_MEMORY_FRAMES = 1
+ALLOCATION_REPORT_LINES = 50  # Baris selisih alokasi terbesar di file .alloc.txt
+
+
+class _NullBlock:
+    """
+    Blok kosong saat profiling mati, aksi bersarang, atau aksi tidak terpilih sampling.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_BLOCK = _NullBlock()
+
+
+class _ProfileBlock:
+    """
+    Context manager yang memprofil satu aksi dan menulis hasilnya saat selesai.
+    """
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+        self._profile = None
+        self._start_snapshot = None
+
+    def __enter__(self):
+        self._profiler._local.active = True
+        self._start_snapshot = self._profiler._snapshot()  # Pembanding untuk selisih alokasi aksi ini
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            self._profile = profile
+        except ValueError:  # Python 3.12+: profiler lain sedang aktif di thread lain
+            pass
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self._profiler._write(self._name, self._profile, self._start_snapshot)
+        finally:
+            self._profiler._local.active = False
+        return False
+
+
+class Profiler:
+    """
+    Menulis profil cProfile dan snapshot tracemalloc untuk setiap aksi saat hidup.
+    """
+
+    def __init__(self, output_dir=None, memory_frames=DEFAULT_MEMORY_FRAMES, sample=1.0):
+        """
+        Inisialisasi Profiler (hidup jika output_dir diberikan).
+
+        Parameter:
+        - output_dir: Folder hasil profil.
+        - memory_frames: Jumlah frame traceback tracemalloc, 0 tanpa snapshot alokasi.
+        - sample: Fraksi aksi yang diprofil (0.0 - 1.0).
+        """
+        self.enabled = False
+        self.output_dir = output_dir
+        self.memory_frames = memory_frames
+        self.sample = sample
+        self.written = 0
+        self._sequence = itertools.count(1)
+        self._local = threading.local()
+        self._started_tracemalloc = False
+        if output_dir:
+            self.enable(output_dir)
+
+    def enable(self, output_dir=None):
+        """
+        Menghidupkan profiling; tracemalloc dimulai di sini supaya snapshot mencakup seluruh aksi.
+        """
+        self.output_dir = output_dir or self.output_dir or os.path.join(os.getcwd(), "profiles")
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.memory_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracemalloc:  # Hanya hentikan tracemalloc yang dimulai di sini
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def toggle(self):
+        """
+        Menyalakan/mematikan profiling (toggle di menu).
+
+        Return:
+        - True jika profiling sekarang hidup.
+        """
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def profile(self, name):
+        """
+        Context manager untuk memprofil satu aksi: `with profiler.profile("menu.encrypt_file"): ...`.
+        """
+        if not self.enabled or getattr(self._local, "active", False):
+            return _NULL_BLOCK
+        if self.sample < 1.0 and random.random() >= self.sample:
+            return _NULL_BLOCK
+        return _ProfileBlock(self, name)
+
+    @staticmethod
+    def _snapshot():
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)  # Alokasi tracemalloc sendiri
+        )
+
+    def _write(self, name, profile, start_snapshot=None):
+        """
+        Menulis file .prof (format pstats), .alloc.txt (selisih alokasi terhadap start_snapshot)
+        dan .snapshot (tracemalloc) untuk satu aksi.
+        """
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        base = os.path.join(
+            self.output_dir,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence):04d}-{safe_name}",
+        )
+        snapshot = self._snapshot()  # Diambil sebelum menulis .prof supaya alokasinya tidak ikut
+        profile.dump_stats(base + ".prof")
+        if snapshot is not None:
+            snapshot.dump(base + ".snapshot")
+            if start_snapshot is not None:
+                differences = snapshot.compare_to(start_snapshot, "lineno")  # Urut dari selisih terbesar
+                with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+                    f.writelines(f"{difference}\n" for difference in differences[:ALLOCATION_REPORT_LINES])
+        self.written += 1
+
+
+def _from_environment():
+    memory_frames = int(os.environ.get("RSA_PROFILE_MEMORY", DEFAULT_MEMORY_FRAMES))
+    sample = float(os.environ.get("RSA_PROFILE_SAMPLE", 1.0))
+    return Profiler(os.environ.get("RSA_PROFILE") or None, memory_frames, sample)
+
+
+# Profiler default yang dipakai bersama
+profiler = _from_environment()
@@ -0,0 +1,140 @@
+"""
+Reservoir keypair RSA yang sudah dibuat sebelumnya.
+
+RSA.generate untuk key 3072/4096-bit bisa memakan waktu beberapa detik.
+Reservoir menyimpan beberapa keypair siap pakai per ukuran kunci di disk
+(folder 0700, file 0600), diisi ulang oleh proses worker di background,
+sehingga pengambilan keypair hanya butuh waktu membaca satu file.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .backend import get_backend
+from .keyformat import export_key, import_key
+
+DEFAULT_TARGET = 4  # Jumlah keypair siap pakai per ukuran kunci
+_KEY_SUFFIX = ".key"  # Format biner, dimuat tanpa uji primalitas ulang
+_KEY_SUFFIXES = (_KEY_SUFFIX, ".pem")  # .pem: stok dari versi lama
+
+
+def _write_private(path, data):
+    """
+    Menulis file dengan permission 0600 secara atomik (tulis ke file sementara lalu rename).
+    """
+    temp_path = path + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _generate_into(directory, key_size):
+    """
+    Dijalankan di proses worker: membuat satu keypair dan menyimpannya di reservoir.
+    """
+    key = get_backend().generate(key_size)  # OpenSSL jauh lebih cepat jika terpasang
+    path = os.path.join(directory, os.urandom(8).hex() + _KEY_SUFFIX)
+    _write_private(path, export_key(key))
+    return path
+
+
+class KeypairReservoir:
+    """
+    Kumpulan keypair RSA siap pakai yang disimpan di disk dan diisi ulang di background.
+    """
+
+    def __init__(self, directory, sizes=(2048,), target=DEFAULT_TARGET, workers=1):
+        """
+        Inisialisasi KeypairReservoir.
+
+        Parameter:
+        - directory: Folder penyimpanan reservoir (dibuat dengan permission 0700).
+        - sizes: Ukuran kunci (bit) yang dijaga stoknya.
+        - target: Jumlah keypair siap pakai per ukuran kunci.
+        - workers: Jumlah proses worker untuk membuat keypair.
+        """
+        self.directory = directory
+        self.sizes = tuple(sizes)
+        self.target = target
+        self.workers = workers
+        self._pending = {size: 0 for size in self.sizes}  # Job pembuatan yang sedang berjalan
+        self._lock = threading.Lock()
+        self._executor = None
+        for size in self.sizes:
+            os.makedirs(self._size_dir(size), mode=0o700, exist_ok=True)
+        os.chmod(self.directory, 0o700)
+
+    def _size_dir(self, key_size):
+        return os.path.join(self.directory, str(key_size))
+
+    def _ready_files(self, key_size):
+        try:
+            names = os.listdir(self._size_dir(key_size))
+        except FileNotFoundError:
+            return []
+        return [name for name in names if name.endswith(_KEY_SUFFIXES)]
+
+    def available(self, key_size):
+        """
+        Jumlah keypair siap pakai untuk ukuran kunci tertentu.
+        """
+        return len(self._ready_files(key_size))
+
+    def pop(self, key_size):
+        """
+        Mengambil satu keypair dari reservoir lalu memicu pengisian ulang.
+
+        Parameter:
+        - key_size: Ukuran kunci (bit).
+
+        Return:
+        - Kunci private RSA, atau None jika stok kosong.
+        """
+        key = None
+        for name in self._ready_files(key_size):
+            path = os.path.join(self._size_dir(key_size), name)
+            claimed = f"{path}.claimed-{os.getpid()}"
+            try:
+                os.rename(path, claimed)  # Klaim atomik, aman jika ada proses lain yang ikut mengambil
+            except FileNotFoundError:
+                continue
+            try:
+                with open(claimed, "rb") as f:
+                    key = import_key(f.read())
+            finally:
+                os.remove(claimed)  # Keypair hanya boleh dipakai sekali
+            break
+        if key_size in self._pending:
+            self.refill()
+        return key
+
+    def refill(self):
+        """
+        Menjadwalkan pembuatan keypair di background sampai stok mencapai target.
+        """
+        with self._lock:
+            for size in self.sizes:
+                missing = self.target - self.available(size) - self._pending[size]
+                for _ in range(max(0, missing)):
+                    future = self._get_executor().submit(_generate_into, self._size_dir(size), size)
+                    self._pending[size] += 1
+                    future.add_done_callback(lambda _, size=size: self._job_done(size))
+
+    def _job_done(self, key_size):
+        with self._lock:
+            self._pending[key_size] -= 1
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def close(self, wait=False):
+        """
+        Menghentikan worker. Job yang belum mulai dibatalkan, keypair yang sudah jadi tetap tersimpan.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
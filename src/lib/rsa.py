@@ -1,27 +1,58 @@
-from Crypto.Cipher import PKCS1_OAEP
-from Crypto.PublicKey import RSA
+"""
+RSAHandler: satu pintu untuk semua operasi RSA program ini.
+
+Modul lib lain (hybrid, signing, batch, multiprime, keyformat, keycache, backend)
+diimpor di dalam method yang memakainya, bukan di atas modul, jadi mengimpor
+RSAHandler murah dan perintah CLI hanya membayar impor yang benar-benar dipakai.
+Backend kriptografi juga baru dipilih saat operasi OAEP pertama.
+"""
+
+import threading
+
+from .metrics import metrics, timed
+
+
+def _returned_bytes(args, result):
+    return result  # Method stream mengembalikan jumlah byte plaintext
 
 
 class RSAHandler:
     """
     Class untuk menangani operasi RSA, seperti:
     - Membuat keypair (public dan private key)
-    - Enkripsi dan dekripsi pesan
-    - Menyimpan dan memuat key ke/dari file
+    - Enkripsi dan dekripsi pesan (satu per satu atau batch)
+    - Enkripsi dan dekripsi stream/file besar (hybrid RSA OAEP + AES-GCM)
+    - Menyimpan dan memuat key ke/dari file (dengan cache kunci dan cipher)
+    - Keypair multi-prime (3-4 prima, RFC 8017) untuk operasi private yang lebih cepat
+    - Tanda tangan RSA-PSS untuk file (signature terpisah) dan verifikasi massal
+    - Backend OAEP yang bisa diganti (pycryptodome atau OpenSSL, lihat lib.backend)
     """
 
-    def __init__(self, key_size=2048):
+    def __init__(self, key_size=2048, reservoir=None, primes=2):
         """
         Inisialisasi RSAHandler.
         key_size: Ukuran key RSA dalam bit (default: 2048, cukup aman untuk banyak keperluan).
+        reservoir: KeypairReservoir opsional berisi keypair yang sudah dibuat sebelumnya.
+        primes: Jumlah faktor prima modulus (default: 2). 3 atau 4 mempercepat dekripsi di 3072/4096-bit.
         """
+        from . import multiprime
+
+        if not multiprime.MIN_PRIMES <= primes <= multiprime.max_primes(key_size):
+            raise ValueError(f"Kunci {key_size}-bit mendukung 2..{multiprime.max_primes(key_size)} prima.")
         self.key_size = key_size
+        self.primes = primes
+        self.reservoir = reservoir  # Jika diisi, generate_keypair mengambil dari reservoir dulu
         self.public_key = None  # Key public yang akan dihasilkan
         self.private_key = None  # Key private yang akan dihasilkan
+        self._pool = None  # BatchPool untuk encrypt_many/decrypt_many, dibuat saat pertama kali dibutuhkan
+        self._pool_params = None  # (key id, workers, serial_threshold) milik _pool
+        self._pool_lock = threading.Lock()
 
+    @timed("rsa.generate_keypair")
     def generate_keypair(self):
         """
         Membuat keypair RSA (public dan private key).
+        Jika reservoir tersedia dan stoknya ada, keypair diambil dari reservoir (instan).
 
         - public_key: Kunci publik untuk enkripsi.
         - private_key: Kunci privat untuk dekripsi.
@@ -29,12 +60,21 @@ class RSAHandler:
         Return:
         Tuple (public_key, private_key).
         """
-        key = RSA.generate(self.key_size)  # Membuat kunci dengan ukuran yang ditentukan
+        from . import backend, multiprime
+
+        key = None
+        if self.reservoir is not None and self.primes == multiprime.MIN_PRIMES:
+            key = self.reservoir.pop(self.key_size)  # None jika stok kosong (reservoir hanya berisi kunci 2 prima)
+        if key is None and self.primes == multiprime.MIN_PRIMES:
+            key = backend.get_backend().generate(self.key_size)  # OpenSSL jauh lebih cepat jika terpasang
+        elif key is None:
+            key = multiprime.generate(self.key_size, self.primes)
         self.public_key = key.publickey()  # Ekstrak kunci public dari key
         self.private_key = key  # Simpan kunci private
         return self.public_key, self.private_key
 
     @staticmethod
+    @timed("rsa.encrypt", count_bytes=lambda args, result: len(args[1]))
     def encrypt(public_key, message):
         """
         Mengenkripsi pesan dengan kunci public.
@@ -46,13 +86,16 @@ class RSAHandler:
         Return:
         - Pesan terenkripsi dalam bentuk byte.
         """
-        cipher = PKCS1_OAEP.new(public_key)  # Gunakan cipher OAEP untuk enkripsi
+        from .keycache import oaep_cipher
+
+        cipher = oaep_cipher(public_key)  # Gunakan cipher OAEP (dari cache) untuk enkripsi
         encrypted_message = cipher.encrypt(
             message.encode()
         )  # Encode pesan ke byte, lalu enkripsi
         return encrypted_message
 
     @staticmethod
+    @timed("rsa.decrypt", count_bytes=lambda args, result: len(args[1]))
     def decrypt(private_key, encrypted_message):
         """
         dekripsi pesan terenkripsi dengan kunci private.
@@ -64,28 +107,252 @@ class RSAHandler:
         Return:
         - Pesan asli yang telah didekripsi (string).
         """
-        cipher = PKCS1_OAEP.new(private_key)  # Gunakan cipher OAEP untuk dekripsi
+        from .keycache import oaep_cipher
+
+        cipher = oaep_cipher(private_key)  # Gunakan cipher OAEP (dari cache) untuk dekripsi
         decrypted_message = cipher.decrypt(
             encrypted_message
         ).decode()  # Dekripsi dan decode kembali ke string
         return decrypted_message
 
+    def _batch_pool(self, key, workers, serial_threshold):
+        """
+        BatchPool milik handler, dipakai ulang selama keypair dan parameternya sama (pool dengan
+        kunci private juga melayani enkripsi). Pool lama ditutup saat keypair atau parameter
+        berganti. Dipanggil dengan _pool_lock dipegang.
+        """
+        from .batch import DEFAULT_SERIAL_THRESHOLD, BatchPool
+        from .keycache import fingerprint
+
+        if serial_threshold is None:
+            serial_threshold = DEFAULT_SERIAL_THRESHOLD
+        params = (fingerprint(key), workers, serial_threshold)
+        if self._pool_params != params or (key.has_private() and not self._pool.key.has_private()):
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = BatchPool(key, workers, serial_threshold)  # Proses worker dibuat saat batch besar pertama
+            self._pool_params = params
+        return self._pool
+
+    @timed("rsa.encrypt_many")
+    def encrypt_many(self, public_key, messages, workers=None, serial_threshold=None, pool=None):
+        """
+        Mengenkripsi banyak pesan sekaligus dengan pool proses.
+        Pool dipakai ulang antar panggilan dan baru dimatikan oleh close().
+
+        Parameter:
+        - public_key: Kunci public untuk enkripsi.
+        - messages: Iterable pesan teks (string).
+        - workers: Jumlah proses worker (default: jumlah CPU).
+        - serial_threshold: Batch lebih kecil dari nilai ini dikerjakan tanpa pool (default: batch.DEFAULT_SERIAL_THRESHOLD).
+        - pool: BatchPool milik pemanggil (opsional), dipakai sebagai ganti pool handler.
+
+        Return:
+        - List pesan terenkripsi (byte), urut sesuai input.
+        """
+        if pool is not None:
+            return pool.encrypt_many(messages)
+        with self._pool_lock:
+            return self._batch_pool(public_key, workers, serial_threshold).encrypt_many(messages)
+
+    @timed("rsa.decrypt_many")
+    def decrypt_many(self, private_key, encrypted_messages, workers=None, serial_threshold=None, pool=None):
+        """
+        Mendekripsi banyak pesan sekaligus dengan pool proses.
+        Kunci private dimuat satu kali per worker, bukan per pesan, dan pool dipakai ulang antar panggilan.
+
+        Parameter:
+        - private_key: Kunci private untuk dekripsi.
+        - encrypted_messages: Iterable pesan terenkripsi (byte).
+        - workers: Jumlah proses worker (default: jumlah CPU).
+        - serial_threshold: Batch lebih kecil dari nilai ini dikerjakan tanpa pool (default: batch.DEFAULT_SERIAL_THRESHOLD).
+        - pool: BatchPool milik pemanggil (opsional), dipakai sebagai ganti pool handler.
+
+        Return:
+        - List pesan asli (string), urut sesuai input.
+        """
+        if pool is not None:
+            return pool.decrypt_many(encrypted_messages)
+        with self._pool_lock:
+            return self._batch_pool(private_key, workers, serial_threshold).decrypt_many(encrypted_messages)
+
+    def close(self):
+        """
+        Mematikan proses worker batch milik handler (aman dipanggil berulang kali).
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = None
+            self._pool_params = None
+
+    @staticmethod
+    @timed("rsa.encrypt_stream", count_bytes=_returned_bytes)
+    def encrypt_stream(public_key, reader, writer, chunk_size=None, compress=None):
+        """
+        Mengenkripsi stream (misalnya file) secara hybrid per chunk.
+
+        Parameter:
+        - public_key: Kunci public untuk membungkus data key AES.
+        - reader: Objek file biner sumber plaintext.
+        - writer: Objek file biner tujuan ciphertext.
+        - chunk_size: Ukuran chunk plaintext dalam byte (default: hybrid.DEFAULT_CHUNK_SIZE).
+        - compress: Kompresi sebelum enkripsi (None default, "auto", "zlib", "lzma", atau "zstd").
+
+        Return:
+        - Jumlah byte plaintext yang dienkripsi.
+        """
+        from . import hybrid
+
+        if chunk_size is None:
+            chunk_size = hybrid.DEFAULT_CHUNK_SIZE
+        return hybrid.encrypt_stream(public_key, reader, writer, chunk_size, compress)
+
+    @staticmethod
+    @timed("rsa.decrypt_stream", count_bytes=_returned_bytes)
+    def decrypt_stream(private_key, reader, writer):
+        """
+        Mendekripsi stream hasil encrypt_stream per chunk.
+
+        Parameter:
+        - private_key: Kunci private untuk membuka data key AES.
+        - reader: Objek file biner sumber ciphertext.
+        - writer: Objek file biner tujuan plaintext.
+
+        Return:
+        - Jumlah byte plaintext yang didekripsi.
+        """
+        from . import hybrid
+
+        return hybrid.decrypt_stream(private_key, reader, writer)
+
+    @staticmethod
+    @timed("rsa.decrypt_mapped", count_bytes=_returned_bytes)
+    def decrypt_mapped(private_key, reader, writer, progress=None):
+        """
+        Mendekripsi file hybrid lewat memory-map (tanpa membaca seluruh file ke memori).
+
+        Parameter:
+        - private_key: Kunci private untuk membuka data key AES.
+        - reader: Objek file biner yang punya fileno (file biasa, bukan pipe).
+        - writer: Objek file biner tujuan plaintext.
+        - progress: Callback opsional progress(jumlah byte file) setelah setiap chunk, boleh raise untuk berhenti.
+
+        Return:
+        - Jumlah byte plaintext yang didekripsi.
+        """
+        from . import hybrid
+
+        return hybrid.decrypt_mapped(private_key, reader, writer, progress)
+
+    @staticmethod
+    @timed("rsa.decrypt_range", count_bytes=lambda args, result: len(result))
+    def decrypt_range(private_key, reader, start, length=None):
+        """
+        Mendekripsi sebagian plaintext file hybrid (hanya chunk yang mencakup rentang yang dibaca).
+
+        Parameter:
+        - private_key: Kunci private untuk membuka data key AES.
+        - reader: Objek file biner yang bisa di-seek.
+        - start: Offset byte pertama dalam plaintext.
+        - length: Jumlah byte yang dibaca, None berarti sampai akhir.
+
+        Return:
+        - Plaintext untuk rentang tersebut (bytes).
+        """
+        from . import hybrid
+
+        return hybrid.decrypt_range(private_key, reader, start, length)
+
+    @staticmethod
+    def open_range(private_key, reader):
+        """
+        Membuka file hybrid untuk banyak pembacaan acak (header dan index dibaca sekali).
+
+        Return:
+        - hybrid.RangeReader dengan atribut size dan method read(start, length).
+        """
+        from . import hybrid
+
+        return hybrid.RangeReader(private_key, reader)
+
+    @staticmethod
+    @timed("rsa.sign_file")
+    def sign_file(private_key, filename, signature_filename=None):
+        """
+        Menandatangani file dengan RSA-PSS (file di-hash secara streaming) dan menulis signature terpisah.
+
+        Parameter:
+        - private_key: Kunci private RSA.
+        - filename: File yang ditandatangani.
+        - signature_filename: File signature (default: filename + ".sig").
+
+        Return:
+        - Path file signature.
+        """
+        from . import signing
+
+        return signing.sign_file(private_key, filename, signature_filename)
+
+    @staticmethod
+    @timed("rsa.verify_file")
+    def verify_file(keys, filename, signature_filename=None):
+        """
+        Memverifikasi file terhadap signature terpisahnya, raise ValueError jika tidak valid.
+
+        Parameter:
+        - keys: Keystore (kunci dipilih dari key id di signature) atau kunci RSA.
+        - filename: File yang diverifikasi.
+        - signature_filename: File signature (default: filename + ".sig").
+        """
+        from . import signing
+
+        signing.verify_file(keys, filename, signature_filename)
+
+    @staticmethod
+    @timed("rsa.verify_many")
+    def verify_many(keys, pairs, workers=None, serial_threshold=None):
+        """
+        Memverifikasi banyak pasangan file/signature secara paralel di beberapa proses.
+
+        Parameter:
+        - keys: Keystore atau kunci RSA.
+        - pairs: Iterable tuple (file, file signature atau None).
+        - workers: Jumlah proses worker (default: jumlah CPU).
+        - serial_threshold: Jumlah pasangan di bawah nilai ini diverifikasi serial (default: signing.DEFAULT_SERIAL_THRESHOLD).
+
+        Return:
+        - List hasil sesuai urutan input: None jika valid, pesan error jika tidak.
+        """
+        from . import signing
+
+        if serial_threshold is None:
+            serial_threshold = signing.DEFAULT_SERIAL_THRESHOLD
+        return signing.verify_many(keys, pairs, workers, serial_threshold)
+
     @staticmethod
-    def save_key(key, filename):
+    def save_key(key, filename, key_format="pem"):
         """
         simpan kunci RSA (publik atau private) ke file.
 
         Parameter:
         - key: Kunci yang ingin disimpan.
         - filename: Nama file tempat kunci akan disimpan.
+        - key_format: "pem" (default) atau "binary" (lib.keyformat, dimuat jauh lebih cepat).
         """
+        from . import keyformat
+        from .keycache import key_cache
+
         with open(filename, "wb") as f:
-            f.write(key.export_key())  # Ekspor kunci ke format byte dan simpan di file
+            f.write(keyformat.encode(key, key_format))  # Ekspor kunci ke format byte dan simpan di file
+        key_cache.invalidate(filename)  # Kunci lama di cache tidak berlaku lagi
 
     @staticmethod
+    @timed("rsa.load_key")
     def load_key(filename):
         """
         Memuat kunci RSA dari file.
+        Hasil parse disimpan di cache dan dipakai ulang selama file tidak berubah.
 
         Parameter:
         - filename: Nama file tempat kunci disimpan.
@@ -93,13 +360,66 @@ class RSAHandler:
         Return:
         - Kunci RSA yang telah dimuat (publik atau privat).
         """
-        with open(filename, "rb") as f:
-            return RSA.import_key(f.read())  # Baca file dan impor kembali ke format RSA
+        from .keycache import key_cache
+
+        return key_cache.load(filename)  # Baca file (atau cache) dan impor ke format RSA
+
+    @staticmethod
+    def clear_key_cache():
+        """
+        Mengosongkan cache kunci dan cipher (misalnya setelah rotasi kunci manual).
+        """
+        from .keycache import cipher_cache, key_cache
+
+        key_cache.invalidate()
+        cipher_cache.clear()
+
+    @staticmethod
+    def set_metrics_enabled(enabled):
+        """
+        Menghidupkan/mematikan instrumentasi (lihat lib.metrics).
+        Cache cipher dikosongkan supaya cipher baru memakai kunci yang terinstrumentasi (atau tidak).
+        """
+        from .keycache import cipher_cache
+
+        metrics.enabled = enabled
+        cipher_cache.clear()
+
+    @staticmethod
+    def set_backend(choice):
+        """
+        Memilih backend kriptografi ("pycryptodome", "openssl", atau "auto").
+        Cache cipher dikosongkan supaya operasi berikutnya memakai backend baru.
+
+        Return:
+        - Nama backend yang dipakai (pycryptodome jika backend yang diminta tidak terpasang).
+        """
+        from . import backend
+        from .keycache import cipher_cache
+
+        name = backend.set_backend(choice)
+        cipher_cache.clear()
+        return name
+
+    @staticmethod
+    def backend_name():
+        from . import backend
+
+        return backend.get_backend().name
+
+    @staticmethod
+    def metrics_snapshot():
+        """
+        Return:
+        - Dict statistik per operasi (count, errors, bytes, latensi).
+        """
+        return metrics.snapshot()
 
     @staticmethod
+    @timed("rsa.import_key")
     def import_key(key_data):
         """
-        Mengimpor kunci RSA dari byte atau string PEM.
+        Mengimpor kunci RSA dari byte atau string PEM (termasuk kunci multi-prime) atau format biner.
 
         Parameter:
         - key_data: Data kunci dalam format byte atau string PEM.
@@ -107,4 +427,6 @@ class RSAHandler:
         Return:
         - Objek kunci RSA.
         """
-        return RSA.import_key(key_data)
+        from . import keyformat
+
+        return keyformat.import_key(key_data)
@@ -0,0 +1,239 @@
+"""
+Protokol sesi untuk komunikasi jaringan.
+
+Semua data dikirim sebagai frame: panjang (4 byte) | tipe (1 byte) | payload.
+Operasi RSA OAEP hanya dipakai sekali di awal untuk mengirim master secret,
+setelah itu semua pesan dua arah dienkripsi dengan AES-GCM memakai kunci sesi.
+
+Alur handshake:
+- Client -> HELLO (kunci public client dalam PEM)
+- Server -> KEY (session id | master secret yang dibungkus RSA OAEP)
+Alur resume (tanpa RSA):
+- Client -> RESUME (session id | nonce client)
+- Server -> RESUME_OK (nonce server), atau REJECT jika sesi tidak dikenal
+
+Plaintext setiap pesan DATA diawali satu byte codec kompresi (lib.compression).
+Kompresi mati secara default: mengompresi teks yang sebagian dikendalikan penyerang
+sebelum AEAD membocorkan isi lewat panjang ciphertext (serangan gaya CRIME), jadi
+hanya dinyalakan eksplisit (compress="auto" atau nama codec) untuk data yang aman.
+"""
+
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Random import get_random_bytes
+
+from . import compression
+from .keycache import oaep_cipher
+
+# Tipe frame
+HELLO = 1
+KEY = 2
+RESUME = 3
+RESUME_OK = 4
+REJECT = 5
+DATA = 6
+CLOSE = 7
+
+FRAME_HEADER = struct.Struct(">IB")  # panjang payload, tipe frame
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # Batas payload supaya peer tidak bisa memaksa alokasi besar
+
+SESSION_ID_SIZE = 16
+MASTER_SECRET_SIZE = 32
+NONCE_SIZE = 16
+TAG_SIZE = 16
+
+DEFAULT_SESSION_TTL = 3600  # Detik, umur maksimum sesi yang bisa di-resume
+DEFAULT_MAX_SESSIONS = 1024
+
+
+class ProtocolError(Exception):
+    """
+    Kesalahan protokol: frame tidak valid, tipe tidak terduga, atau autentikasi gagal.
+    """
+
+
+def encode_frame(frame_type, payload=b""):
+    """
+    Membuat frame dari tipe dan payload.
+
+    Parameter:
+    - frame_type: Tipe frame (HELLO, KEY, DATA, ...).
+    - payload: Isi frame (byte).
+
+    Return:
+    - Frame lengkap dalam bentuk byte.
+    """
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError("Payload frame terlalu besar.")
+    return FRAME_HEADER.pack(len(payload), frame_type) + bytes(payload)
+
+
+def decode_frame_header(header):
+    """
+    Membaca header frame, return tuple (panjang payload, tipe frame).
+    """
+    length, frame_type = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError("Payload frame terlalu besar.")
+    return length, frame_type
+
+
+def expect(frame, *frame_types):
+    """
+    Memastikan tipe frame sesuai harapan, return payload frame.
+    """
+    frame_type, payload = frame
+    if frame_type not in frame_types:
+        raise ProtocolError(f"Frame tidak terduga: tipe {frame_type}")
+    return payload
+
+
+class SessionCipher:
+    """
+    Enkripsi AES-GCM untuk satu koneksi, dengan kunci terpisah untuk arah kirim dan terima.
+    Nonce berasal dari counter pesan, jadi pesan yang diulang, dibuang,
+    atau ditukar urutannya akan gagal diverifikasi.
+    """
+
+    def __init__(self, send_key, recv_key, compress=None):
+        """
+        Inisialisasi SessionCipher.
+        compress: Kompresi pesan keluar (None default, "auto", atau nama codec). Pesan masuk selalu bisa dibaca.
+        """
+        self._send_key = send_key
+        self._recv_key = recv_key
+        self._compress = compress
+        self._send_counter = 0
+        self._recv_counter = 0
+
+    @staticmethod
+    def _nonce(counter):
+        return struct.pack(">IQ", 0, counter)  # 12 byte nonce GCM
+
+    def seal(self, plaintext):
+        """
+        Mengenkripsi satu pesan keluar, return ciphertext + tag.
+        Pesan dikompresi dulu jika layak (pesan kecil dan data acak dikirim apa adanya).
+        """
+        codec = compression.choose_codec(self._compress, plaintext)
+        body = plaintext
+        if codec != compression.CODEC_NONE:
+            body = compression.compress(codec, plaintext)
+            if len(body) >= len(plaintext):
+                codec, body = compression.CODEC_NONE, plaintext
+        cipher = AES.new(self._send_key, AES.MODE_GCM, nonce=self._nonce(self._send_counter), mac_len=TAG_SIZE)
+        self._send_counter += 1
+        ciphertext, tag = cipher.encrypt_and_digest(bytes([codec]) + body)
+        return ciphertext + tag
+
+    def open(self, sealed):
+        """
+        Mendekripsi satu pesan masuk, raise ProtocolError jika autentikasi gagal.
+        """
+        if len(sealed) < TAG_SIZE:
+            raise ProtocolError("Pesan terenkripsi terlalu pendek.")
+        cipher = AES.new(self._recv_key, AES.MODE_GCM, nonce=self._nonce(self._recv_counter), mac_len=TAG_SIZE)
+        self._recv_counter += 1
+        try:
+            plaintext = cipher.decrypt_and_verify(sealed[:-TAG_SIZE], sealed[-TAG_SIZE:])
+        except ValueError:
+            raise ProtocolError("Autentikasi pesan gagal.") from None
+        if not plaintext:
+            raise ProtocolError("Pesan tanpa byte codec.")
+        try:
+            return compression.decompress(plaintext[0], plaintext[1:], MAX_FRAME_SIZE)
+        except ValueError as e:
+            raise ProtocolError(str(e)) from None
+
+
+def derive_cipher(master_secret, salt, is_server, compress=None):
+    """
+    Menurunkan kunci sesi dari master secret (HKDF-SHA256).
+
+    Parameter:
+    - master_secret: Secret bersama hasil handshake RSA.
+    - salt: Session id (handshake penuh) atau gabungan nonce (resume).
+    - is_server: True untuk sisi server (kunci kirim/terima ditukar).
+    - compress: Kompresi pesan keluar (default None, lihat SessionCipher).
+
+    Return:
+    - SessionCipher untuk sisi yang bersangkutan.
+    """
+    client_key, server_key = HKDF(master_secret, 32, salt, SHA256, num_keys=2, context=b"rsa-session")
+    if is_server:
+        return SessionCipher(server_key, client_key, compress)
+    return SessionCipher(client_key, server_key, compress)
+
+
+def server_handshake(client_public_key):
+    """
+    Sisi server: membuat master secret dan membungkusnya untuk client.
+
+    Parameter:
+    - client_public_key: Kunci public client (objek RSA).
+
+    Return:
+    - Tuple (session_id, master_secret, payload frame KEY).
+    """
+    session_id = get_random_bytes(SESSION_ID_SIZE)
+    master_secret = get_random_bytes(MASTER_SECRET_SIZE)
+    wrapped = oaep_cipher(client_public_key).encrypt(master_secret)
+    return session_id, master_secret, session_id + wrapped
+
+
+def client_handshake(private_key, key_payload):
+    """
+    Sisi client: membuka master secret dari payload frame KEY.
+
+    Return:
+    - Tuple (session_id, master_secret).
+    """
+    if len(key_payload) <= SESSION_ID_SIZE:
+        raise ProtocolError("Frame KEY tidak valid.")
+    session_id = key_payload[:SESSION_ID_SIZE]
+    master_secret = oaep_cipher(private_key).decrypt(key_payload[SESSION_ID_SIZE:])
+    return session_id, master_secret
+
+
+def resume_salt(client_nonce, server_nonce):
+    return client_nonce + server_nonce  # Nonce baru tiap resume -> kunci sesi baru
+
+
+class SessionCache:
+    """
+    Cache LRU sesi di sisi server (session id -> master secret) untuk resume.
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL, max_entries=DEFAULT_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def store(self, session_id, master_secret):
+        with self._lock:
+            self._entries[session_id] = (time.monotonic(), master_secret)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, session_id):
+        """
+        Mengambil master secret untuk session id, None jika tidak ada atau kedaluwarsa.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            created, master_secret = entry
+            if time.monotonic() - created > self.ttl:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return master_secret
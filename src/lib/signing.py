@@ -0,0 +1,271 @@
+"""
+Tanda tangan RSA-PSS (SHA-256) untuk file, disimpan sebagai file signature terpisah (.sig).
+
+File di-hash secara streaming dengan buffer yang dipakai ulang, jadi file sebesar
+apapun tidak pernah dimuat utuh ke memori. Hash dihitung dengan hashlib (beberapa
+kali lebih cepat dari Crypto.Hash untuk data besar), lalu digest-nya diberikan ke
+PSS lewat objek pembungkus; hasilnya tetap signature PSS SHA-256 standar.
+
+Format file signature:
+MAGIC "RSAS" | versi (1) | algoritma hash (1) | key id (32) | panjang signature (2) | signature
+
+Key id (fingerprint kunci public) membuat verifikasi bisa memilih kunci yang benar
+dari keystore, termasuk kunci lama hasil rotasi. Verifikasi massal (verify_many)
+dibagi ke beberapa proses worker supaya dibatasi throughput disk, bukan satu core.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pss
+
+from .keycache import FINGERPRINT_SIZE, fingerprint
+
+MAGIC = b"RSAS"
+VERSION = 1
+HASH_SHA256 = 1
+SIGNATURE_SUFFIX = ".sig"
+READ_SIZE = 1024 * 1024  # Buffer baca per file, dipakai ulang untuk setiap blok
+DEFAULT_SERIAL_THRESHOLD = 16  # Verifikasi lebih sedikit dari ini dikerjakan langsung (tanpa pool)
+
+_HEADER = struct.Struct(f">4sBB{FINGERPRINT_SIZE}sH")
+
+_worker_keys = None  # Sumber kunci milik proses worker, diisi oleh _init_worker
+_worker_buffer = None  # Buffer baca milik proses worker
+
+
+class _Digest:
+    """
+    Digest SHA-256 yang sudah dihitung, dengan antarmuka objek Crypto.Hash yang dipakai PSS
+    (digest, digest_size, oid, new untuk MGF1).
+    """
+
+    digest_size = SHA256.digest_size
+    oid = SHA256.SHA256Hash.oid
+
+    def __init__(self, value):
+        self._value = value
+
+    def digest(self):
+        return self._value
+
+    @staticmethod
+    def new(data=None):
+        return SHA256.new(data)
+
+
+def hash_stream(reader, buffer=None):
+    """
+    Menghitung SHA-256 dari stream biner tanpa memuat seluruh isinya.
+
+    Parameter:
+    - reader: Objek file biner (sebaiknya dibuka tanpa buffering, readinto dipakai jika ada).
+    - buffer: bytearray opsional untuk dipakai ulang antar file.
+
+    Return:
+    - Objek pembungkus digest yang bisa langsung dipakai pss.
+    """
+    digest = hashlib.sha256()
+    readinto = getattr(reader, "readinto", None)
+    if readinto is None:
+        for block in iter(lambda: reader.read(READ_SIZE), b""):
+            digest.update(block)
+        return _Digest(digest.digest())
+    buffer = buffer if buffer is not None else bytearray(READ_SIZE)
+    view = memoryview(buffer)
+    while True:
+        count = readinto(buffer)
+        if not count:
+            break
+        digest.update(view[:count])  # hashlib melepas GIL untuk blok besar
+    return _Digest(digest.digest())
+
+
+def _hash_file(filename, buffer=None):
+    with open(filename, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)  # Readahead lebih agresif
+        return hash_stream(f, buffer)
+
+
+def encode_signature(key_id, signature):
+    return _HEADER.pack(MAGIC, VERSION, HASH_SHA256, key_id, len(signature)) + signature
+
+
+def decode_signature(data):
+    """
+    Membaca isi file signature.
+
+    Return:
+    - Tuple (key id, signature).
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("File signature terpotong.")
+    magic, version, hash_alg, key_id, length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Bukan file signature RSAS.")
+    if version != VERSION:
+        raise ValueError(f"Versi file signature tidak didukung: {version}")
+    if hash_alg != HASH_SHA256:
+        raise ValueError(f"Algoritma hash tidak didukung: {hash_alg}")
+    if len(data) != _HEADER.size + length:
+        raise ValueError("Panjang file signature tidak sesuai.")
+    return key_id, data[_HEADER.size:]
+
+
+def sign_stream(private_key, reader):
+    """
+    Menandatangani isi stream dengan RSA-PSS.
+
+    Parameter:
+    - private_key: Kunci private RSA.
+    - reader: Objek file biner.
+
+    Return:
+    - Isi file signature (header + signature, bytes).
+    """
+    signature = pss.new(private_key).sign(hash_stream(reader))
+    return encode_signature(fingerprint(private_key), signature)
+
+
+def _public_key(keys, key_id):
+    """
+    Kunci public untuk key id dari file signature.
+    keys: Keystore (dicari lewat key id) atau satu kunci RSA (harus cocok dengan key id).
+    """
+    if hasattr(keys, "public_key_for"):
+        return keys.public_key_for(key_id)
+    if fingerprint(keys) != key_id:
+        raise ValueError(f"Signature dibuat dengan kunci lain ({key_id.hex()[:16]}).")
+    return keys.publickey()
+
+
+def _verify_digest(public_key, digest, signature):
+    try:
+        pss.new(public_key).verify(digest, signature)
+    except (ValueError, TypeError):
+        raise ValueError("Signature tidak valid.") from None
+
+
+def verify_stream(keys, reader, signature_data):
+    """
+    Memverifikasi signature atas isi stream, raise ValueError jika tidak valid.
+
+    Parameter:
+    - keys: Keystore atau kunci RSA (public atau private).
+    - reader: Objek file biner.
+    - signature_data: Isi file signature.
+    """
+    key_id, signature = decode_signature(signature_data)
+    _verify_digest(_public_key(keys, key_id), hash_stream(reader), signature)
+
+
+def signature_path(filename):
+    return filename + SIGNATURE_SUFFIX
+
+
+def sign_file(private_key, filename, signature_filename=None):
+    """
+    Menandatangani file dan menulis file signature terpisah (atomik: file sementara lalu rename).
+
+    Return:
+    - Path file signature.
+    """
+    signature_filename = signature_filename or signature_path(filename)
+    signature = pss.new(private_key).sign(_hash_file(filename))
+    data = encode_signature(fingerprint(private_key), signature)
+    # Nama sementara unik: thread lain bisa menandatangani file yang sama bersamaan
+    directory, name = os.path.split(signature_filename)
+    fd, temp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o644)  # Signature bukan rahasia, mkstemp membuat file 0600
+            f.write(data)
+        os.replace(temp_path, signature_filename)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return signature_filename
+
+
+def verify_file(keys, filename, signature_filename=None, buffer=None):
+    """
+    Memverifikasi file terhadap file signature-nya, raise ValueError jika tidak valid.
+
+    Parameter:
+    - keys: Keystore atau kunci RSA.
+    - filename: File yang diverifikasi.
+    - signature_filename: File signature (default: filename + ".sig").
+    """
+    with open(signature_filename or signature_path(filename), "rb") as f:
+        signature_data = f.read()
+    key_id, signature = decode_signature(signature_data)
+    public_key = _public_key(keys, key_id)  # Kunci dicari dulu, file besar tidak dibaca jika kunci tidak ada
+    _verify_digest(public_key, _hash_file(filename, buffer), signature)
+
+
+def _check_pair(keys, pair, buffer=None):
+    """
+    Hasil verifikasi satu pasangan: None jika valid, pesan error jika tidak.
+    """
+    filename, signature_filename = pair
+    try:
+        verify_file(keys, filename, signature_filename, buffer)
+    except FileNotFoundError as e:
+        return f"{e.filename} tidak ditemukan."
+    except (OSError, ValueError) as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+def _init_worker(keystore_folder, key_pem):
+    """
+    Initializer worker: sumber kunci dibuat sekali per proses, kunci public di-cache per proses.
+    """
+    global _worker_keys, _worker_buffer
+    if keystore_folder is not None:
+        from .keystore import Keystore
+
+        _worker_keys = Keystore(keystore_folder)
+    else:
+        _worker_keys = RSA.import_key(key_pem)
+    _worker_buffer = bytearray(READ_SIZE)
+
+
+def _verify_one(pair):
+    return _check_pair(_worker_keys, pair, _worker_buffer)
+
+
+def verify_many(keys, pairs, workers=None, serial_threshold=DEFAULT_SERIAL_THRESHOLD):
+    """
+    Memverifikasi banyak pasangan file/signature di pool proses.
+
+    Parameter:
+    - keys: Keystore atau kunci RSA.
+    - pairs: Iterable tuple (file, file signature atau None untuk file + ".sig").
+    - workers: Jumlah proses worker (default: jumlah CPU).
+    - serial_threshold: Jumlah pasangan di bawah nilai ini diverifikasi serial.
+
+    Return:
+    - List hasil sesuai urutan input: None jika valid, pesan error jika tidak.
+    """
+    pairs = [(filename, signature_filename or signature_path(filename)) for filename, signature_filename in pairs]
+    workers = workers or os.cpu_count() or 1
+    if len(pairs) < serial_threshold or workers == 1:
+        buffer = bytearray(READ_SIZE)
+        return [_check_pair(keys, pair, buffer) for pair in pairs]
+
+    from concurrent.futures import ProcessPoolExecutor  # Impor saat dibutuhkan, menjaga startup tetap cepat
+
+    if hasattr(keys, "public_key_for"):
+        initargs = (keys.folder, None)  # Worker membuka keystore sendiri, kunci dimuat sesuai key id
+    else:
+        initargs = (None, keys.publickey().export_key())  # PEM dikirim sekali per worker
+    chunksize = max(1, len(pairs) // (workers * 8))  # Kecil supaya file besar tetap terbagi rata
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        return list(executor.map(_verify_one, pairs, chunksize=chunksize))
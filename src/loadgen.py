@@ -0,0 +1,215 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from benchmark import percentile
+from lib.rsa import RSAHandler
+from lib.session import CLOSE, DATA
+from network import open_client_session, recv_data, send_frame
+
+# loopback load generator for the network mode: starts the session server on localhost
+# (in its own process, so clients and server don't share one gil) and runs many simulated
+# clients doing real key exchanges and message round trips against it.
+
+DEFAULT_CONCURRENCY = 16 # clients connected at once
+DEFAULT_CONNECTIONS = 200 # total connections when no --duration is given
+DEFAULT_MESSAGES = 10 # round trips per connection after the handshake
+DEFAULT_PAYLOAD = 64 # bytes per client message
+SERVER_MESSAGE = "load test" # message the server sends to every client
+READY_TIMEOUT = 10 # seconds to wait for the local server to accept connections
+
+# free tcp port on the loopback interface for the local server
+def _free_port(host):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+# server process: run the real async server until stop is set, then report its stats
+def _server_main(host, port, max_handshakes, ready, stop, results):
+    from async_server import run_server
+    on_event = lambda event: event.startswith("server listening") and ready.set()
+    stats = run_server(RSAHandler(), host, port, SERVER_MESSAGE, max_handshakes=max_handshakes, on_event=on_event, stop=stop)
+    results.put(stats)
+
+# block until the server is listening (no probe connection, it would count in the server stats)
+def _wait_ready(ready, process):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while not ready.wait(0.05):
+        if not process.is_alive():
+            raise RuntimeError("server process exited during startup.")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"server not ready after {READY_TIMEOUT}s.")
+
+# per-run counters shared by the client threads
+class _Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.handshakes = [] # seconds from connect to first decrypted server message
+        self.round_trips = [] # seconds per message round trip
+        self.connections = 0
+        self.messages = 0
+        self.resumed = 0
+        self.errors = Counter()
+
+    def connection(self, handshake, round_trips, resumed):
+        with self._lock:
+            self.connections += 1
+            self.messages += len(round_trips)
+            self.resumed += resumed
+            self.handshakes.append(handshake)
+            self.round_trips.extend(round_trips)
+
+    def error(self, e):
+        with self._lock:
+            self.errors[type(e).__name__] += 1
+
+# one simulated client connection: handshake, server message, then message round trips
+def _run_connection(host, port, private_key, public_key_pem, payload, messages, sessions, timeout):
+    start = time.perf_counter()
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        peer = (host, port) if sessions is not None else None
+        channel, resumed = open_client_session(sock, private_key, public_key_pem, peer, sessions if sessions is not None else {})
+        recv_data(sock, channel)
+        handshake = time.perf_counter() - start
+        round_trips = []
+        for _ in range(messages):
+            sent = time.perf_counter()
+            send_frame(sock, DATA, channel.seal(payload))
+            recv_data(sock, channel)
+            round_trips.append(time.perf_counter() - sent)
+        send_frame(sock, CLOSE)
+    return handshake, round_trips, resumed
+
+# client worker: keep opening connections until the shared budget or deadline runs out
+def _client_loop(args, private_key, public_key_pem, budget, deadline, recorder):
+    sessions = {} if args.resume else None # per-client ticket cache, like one app instance
+    payload = os.urandom(args.payload)
+    while time.monotonic() < deadline and next(budget, None) is not None:
+        try:
+            recorder.connection(*_run_connection(
+                args.host, args.port, private_key, public_key_pem, payload, args.messages, sessions, args.timeout
+            ))
+        except Exception as e: # counted, the run goes on
+            recorder.error(e)
+
+# latency summary in milliseconds
+def _latency(samples):
+    samples = sorted(samples)
+    if not samples:
+        return None
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+# client keypair: loaded from --keys, or a fresh one for this run
+def _client_keys(args):
+    rsa_handler = RSAHandler(args.key_size)
+    if args.keys:
+        private_key = rsa_handler.load_key(os.path.join(args.keys, "rsa_pkcs1_oaep"))
+    else:
+        _, private_key = rsa_handler.generate_keypair()
+    return private_key, private_key.publickey().export_key()
+
+def run(args):
+    private_key, public_key_pem = _client_keys(args)
+    server = None
+    if args.port is None: # no target given: start a local server
+        args.port = _free_port(args.host)
+        context = multiprocessing.get_context("spawn")
+        ready, stop, server_results = context.Event(), context.Event(), context.Queue()
+        server = context.Process(target=_server_main, args=(args.host, args.port, args.max_handshakes, ready, stop, server_results))
+        server.start()
+        _wait_ready(ready, server)
+
+    recorder = _Recorder()
+    connections = args.connections if args.duration is None else None
+    budget = iter(range(connections)) if connections is not None else iter(int, 1) # shared, next() is atomic enough under the gil
+    deadline = time.monotonic() + args.duration if args.duration is not None else float("inf")
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="client") as executor:
+            for _ in range(args.concurrency):
+                executor.submit(_client_loop, args, private_key, public_key_pem, budget, deadline, recorder)
+    finally:
+        elapsed = time.perf_counter() - start
+        server_stats = None
+        if server is not None:
+            stop.set()
+            server_stats = server_results.get(timeout=READY_TIMEOUT)
+            server.join()
+
+    attempts = recorder.connections + sum(recorder.errors.values())
+    return {
+        "params": {
+            "concurrency": args.concurrency, "messages": args.messages, "payload": args.payload,
+            "resume": args.resume, "key_size": private_key.size_in_bits(),
+        },
+        "elapsed_s": elapsed,
+        "connections": recorder.connections,
+        "messages": recorder.messages,
+        "resumed": recorder.resumed,
+        "connections_per_s": recorder.connections / elapsed if elapsed else 0.0,
+        "messages_per_s": recorder.messages / elapsed if elapsed else 0.0,
+        "error_rate": sum(recorder.errors.values()) / attempts if attempts else 0.0,
+        "errors": dict(recorder.errors),
+        "handshake": _latency(recorder.handshakes),
+        "round_trip": _latency(recorder.round_trips),
+        "server": server_stats,
+    }
+
+# short human-readable report for stderr
+def _summary_lines(report):
+    lines = [
+        f"{report['connections']} connections ({report['resumed']} resumed), {report['messages']} messages in {report['elapsed_s']:.2f}s",
+        f"{report['connections_per_s']:.1f} conn/s, {report['messages_per_s']:.1f} msg/s, error rate {report['error_rate']:.2%} {report['errors'] or ''}",
+    ]
+    for name in ("handshake", "round_trip"):
+        latency = report[name]
+        if latency:
+            lines.append(f"{name}: p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms, max {latency['max_ms']:.2f} ms")
+    return lines
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="loopback load generator for the network mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="target an already running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="total connections (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of a fixed connection count")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="round trips per connection")
+    parser.add_argument("--payload", type=int, default=DEFAULT_PAYLOAD, help="bytes per client message")
+    parser.add_argument("--resume", action="store_true", help="reuse session tickets, reconnects skip the rsa handshake")
+    parser.add_argument("--keys", help="client .keys folder (default: a fresh keypair per run)")
+    parser.add_argument("--key-size", type=int, default=2048, help="size of the fresh client keypair")
+    parser.add_argument("--max-handshakes", type=int, default=64, help="local server handshake concurrency")
+    parser.add_argument("--timeout", type=float, default=30, help="per socket operation")
+    parser.add_argument("--output", help="write json report here instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    for line in _summary_lines(report):
+        print(line, file=sys.stderr)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,24 @@
 import curses
 import os
+from contextlib import nullcontext
 from lib.rsa import RSAHandler
-from ui import display_ascii_art, menu_navigation
+from lib.metrics import metrics
+from lib.profiling import profiler
+from lib.reservoir import DEFAULT_TARGET, KeypairReservoir
+from ui import History, display_ascii_art, menu_navigation
 from key_management import _ensure_keys_folder, _handle_generate_keys
 from message_handlers import _handle_encrypt_message, _handle_decrypt_message
-from file_handlers import _handle_encrypt_file, _handle_decrypt_file
-from network import act_as_client, act_as_server
+from jobs import JobManager
+from file_handlers import _handle_encrypt_file, _handle_decrypt_file, _handle_encrypt_directory, _handle_decrypt_directory
+from network import act_as_client, act_as_server, receive_files, send_file_to_peer
+
+# optional pre-generated keypair reservoir, enabled by RSA_KEY_RESERVOIR=<dir>
+def _create_reservoir(key_size=2048):
+    reservoir_dir = os.environ.get("RSA_KEY_RESERVOIR")
+    if not reservoir_dir:
+        return None
+    target = int(os.environ.get("RSA_KEY_RESERVOIR_TARGET", DEFAULT_TARGET))
+    return KeypairReservoir(reservoir_dir, sizes=(key_size,), target=target)
 
 # main app loop
 def main(stdscr):
@@ -15,32 +28,49 @@ def main(stdscr):
     # define color pair 1: black text on white background (for highlighted menu)
     curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_WHITE) 
 
-    rsa_handler = RSAHandler()
-    # init history with ascii art (display_ascii_art doesn't need stdscr if art is static)
-    history = [display_ascii_art(None)] 
+    rsa_handler = RSAHandler(reservoir=_create_reservoir())
+    if rsa_handler.reservoir:
+        rsa_handler.reservoir.refill() # start background keypair generation
+    # bounded history, the ascii art is kept apart (display_ascii_art doesn't need stdscr if art is static)
+    history = History(display_ascii_art(None))
+    jobs = JobManager(history) # long actions run in the background, the menu stays responsive
     last_encrypted_message = None # store last message encrypted in session
     keys_folder = None # track current path to .keys folder
 
+    # finished keygen jobs switch the session to their keys folder
+    def use_keys_folder(folder):
+        nonlocal keys_folder
+        keys_folder = folder
+
+    # actions that finish on the ui thread, the others hand their work to a background job
+    # and are profiled there (see JobManager._run)
+    foreground_actions = [1, 2, 8] # encrypt/decrypt message, act as client
+
     menu_items = [ # define menu items
         "generate rsa keypairs",
         "encrypt message",
         "decrypt message",
         "encrypt file",
         "decrypt file",
+        "encrypt directory",
+        "decrypt directory",
         "act as server",
         "act as client",
+        "send file",
+        "receive files",
         "quit",
     ]
     
     while True: # main program loop
         # display menu and get user's selection
-        selected_index = menu_navigation(stdscr, menu_items, history)
+        selected_index = menu_navigation(stdscr, menu_items, history, jobs)
+        jobs.dispatch() # apply results of finished jobs (e.g. new keys folder)
 
         if selected_index is None:  # quit condition (from menu_navigation for "quit")
             break
 
         # actions requiring keys folder need validation
-        actions_needing_keys = [1, 2, 3, 4, 5] # indices for enc/dec msg/file, server
+        actions_needing_keys = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10] # indices for enc/dec msg/file/directory, server, client, file transfer
         
         if selected_index in actions_needing_keys:
             # if keys_folder not set or path is no longer valid, prompt user
@@ -59,38 +89,58 @@ def main(stdscr):
                     stdscr.refresh() # ensure message is shown
                     continue # skip to next menu iteration
 
-        # dispatch to appropriate action handler based on selection
-        if selected_index == 0: # generate keys
-            new_keys_folder = _handle_generate_keys(stdscr, rsa_handler, history, menu_items)
-            if new_keys_folder: # if key generation was successful
-                keys_folder = new_keys_folder # update main keys_folder path
-        elif selected_index == 1: # encrypt message
-            if keys_folder: # ensure keys_folder is valid
-                 last_encrypted_message = _handle_encrypt_message(stdscr, rsa_handler, history, keys_folder, last_encrypted_message, menu_items)
-        elif selected_index == 2: # decrypt message
-            if keys_folder:
-                # handler returns None on successful decrypt (to clear), or old message on fail/no message
-                updated_message_state = _handle_decrypt_message(stdscr, rsa_handler, history, keys_folder, last_encrypted_message, menu_items)
-                if last_encrypted_message is not None and updated_message_state is None:
-                    history.append("last encrypted message cleared after decryption.")
-                last_encrypted_message = updated_message_state
-        elif selected_index == 3: # encrypt file
-            if keys_folder:
-                _handle_encrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items)
-        elif selected_index == 4: # decrypt file
-            if keys_folder:
-                _handle_decrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items)
-        elif selected_index == 5: # act as server
-            if keys_folder: # server needs keys
-                act_as_server(stdscr, rsa_handler, keys_folder, history)
-            # if keys_folder is None here, the check above should have prompted or skipped
-        elif selected_index == 6: # act as client
-            act_as_client(stdscr, rsa_handler, history, menu_items) # pass menu_items for its get_user_input calls
-        else: # should not happen if menu_navigation is correct
-            history.append(f"warn: unhandled menu index {selected_index}")
+        # dispatch to appropriate action handler based on selection, foreground actions profiled here when profiling is on
+        action_profile = profiler.profile(f"menu.{menu_items[selected_index]}") if selected_index in foreground_actions else nullcontext()
+        with action_profile:
+            if selected_index == 0: # generate keys
+                _handle_generate_keys(stdscr, rsa_handler, history, menu_items, jobs, use_keys_folder)
+            elif selected_index == 1: # encrypt message
+                if keys_folder: # ensure keys_folder is valid
+                     last_encrypted_message = _handle_encrypt_message(stdscr, rsa_handler, history, keys_folder, last_encrypted_message, menu_items)
+            elif selected_index == 2: # decrypt message
+                if keys_folder:
+                    # handler returns None on successful decrypt (to clear), or old message on fail/no message
+                    updated_message_state = _handle_decrypt_message(stdscr, rsa_handler, history, keys_folder, last_encrypted_message, menu_items)
+                    if last_encrypted_message is not None and updated_message_state is None:
+                        history.append("last encrypted message cleared after decryption.")
+                    last_encrypted_message = updated_message_state
+            elif selected_index == 3: # encrypt file
+                if keys_folder:
+                    _handle_encrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+            elif selected_index == 4: # decrypt file
+                if keys_folder:
+                    _handle_decrypt_file(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+            elif selected_index == 5: # encrypt directory
+                if keys_folder:
+                    _handle_encrypt_directory(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+            elif selected_index == 6: # decrypt directory
+                if keys_folder:
+                    _handle_decrypt_directory(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+            elif selected_index == 7: # act as server
+                if keys_folder: # server needs keys
+                    act_as_server(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+                # if keys_folder is None here, the check above should have prompted or skipped
+            elif selected_index == 8: # act as client
+                if keys_folder: # client sends its public key and decrypts the reply
+                    act_as_client(stdscr, rsa_handler, history, keys_folder, menu_items) # pass menu_items for its get_user_input calls
+            elif selected_index == 9: # send file
+                if keys_folder:
+                    send_file_to_peer(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+            elif selected_index == 10: # receive files
+                if keys_folder:
+                    receive_files(stdscr, rsa_handler, history, keys_folder, menu_items, jobs)
+            else: # should not happen if menu_navigation is correct
+                history.append(f"warn: unhandled menu index {selected_index}")
 
         stdscr.refresh() # refresh display after each action to show history updates
 
+    jobs.shutdown() # cancel running jobs, partial outputs are removed by their writers
+    rsa_handler.close() # stop batch workers
+    if rsa_handler.reservoir:
+        rsa_handler.reservoir.close() # stop workers, ready keypairs stay on disk
+    if os.environ.get("RSA_METRICS_DUMP"): # .prom for prometheus text, anything else json
+        metrics.dump(os.environ["RSA_METRICS_DUMP"])
+
 
 if __name__ == "__main__":
     curses.wrapper(main) # initialize curses and run main
@@ -1,4 +1,9 @@
 import os
+import time
+from lib.journal import Journal
+from lib.keycache import fingerprint
+from lib.keystore import Keystore
+from lib.metrics import metrics
 from ui import get_user_input
 
 # truncate long ciphertexts for display
@@ -9,6 +14,16 @@ def truncate_ciphertext(encrypted_message):
         return f"{hex_message[:30]}...{hex_message[-30:]}"
     return hex_message
 
+# journal of saved encrypted messages, under the working directory like before
+def journal_path():
+    return os.path.join(os.getcwd(), "encrypted_messages", "journal")
+
+# record ids typed as "7" or "7-12" (inclusive), returns (first, last)
+def _parse_id_range(text):
+    first, _, last = text.partition("-")
+    first = int(first)
+    return first, int(last) if last else first
+
 # handle message encryption
 def _handle_encrypt_message(stdscr, rsa_handler, history, keys_folder, last_encrypted_message, menu_items_for_layout):
     message_prompt = "enter message to encrypt: "
@@ -19,21 +34,20 @@ def _handle_encrypt_message(stdscr, rsa_handler, history, keys_folder, last_encr
         return last_encrypted_message # return previous state
 
     try:
-        public_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep.pub"))
-        encrypted_message = rsa_handler.encrypt(public_key, message_to_encrypt)
+        with metrics.track("message.encrypt") as tracker:
+            public_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep.pub"))
+            encrypted_message = rsa_handler.encrypt(public_key, message_to_encrypt)
+            tracker.bytes = len(encrypted_message)
         
         history.append(f"encrypted (hex): {encrypted_message.hex()}") # show full hex
         history.append(f"truncated: {truncate_ciphertext(encrypted_message)}") # show truncated
         
         save_option = get_user_input(stdscr, "save encrypted message? (y/n): ", history, menu_items_for_layout)
         if save_option.lower() == 'y':
-            encrypted_dir = os.path.join(os.getcwd(), "encrypted_messages") # dedicated dir
-            os.makedirs(encrypted_dir, exist_ok=True)
-            # generic filename for saved message
-            encrypted_file_path = os.path.join(encrypted_dir, "encrypted_message.txt") 
-            with open(encrypted_file_path, "wb") as f:
-                f.write(encrypted_message)
-            history.append(f"encrypted message saved to {encrypted_file_path}")
+            # appended to the journal, earlier saved messages are kept
+            with Journal(journal_path()) as journal:
+                record_id = journal.append(encrypted_message, fingerprint(public_key))
+            history.append(f"encrypted message saved to {journal_path()} as #{record_id}")
         return encrypted_message # return new encrypted message for potential immediate decryption
     except FileNotFoundError:
         history.append(f"err: public key not found in {keys_folder}.")
@@ -44,12 +58,17 @@ def _handle_encrypt_message(stdscr, rsa_handler, history, keys_folder, last_encr
 # handle message decryption
 def _handle_decrypt_message(stdscr, rsa_handler, history, keys_folder, last_encrypted_message, menu_items_for_layout):
     if last_encrypted_message is None:
-        history.append("err: no encrypted message available. encrypt a message first.")
+        if os.path.isdir(journal_path()):
+            _decrypt_saved_messages(stdscr, history, keys_folder, menu_items_for_layout)
+        else:
+            history.append("err: no encrypted message available. encrypt a message first.")
         return None # no message to decrypt, effectively clearing/keeping it None
 
     try:
-        private_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep"))
-        decrypted_message = rsa_handler.decrypt(private_key, last_encrypted_message)
+        with metrics.track("message.decrypt") as tracker:
+            private_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep"))
+            decrypted_message = rsa_handler.decrypt(private_key, last_encrypted_message)
+            tracker.bytes = len(last_encrypted_message)
         history.append(f"decrypted message: {decrypted_message}")
         return None # clear last_encrypted_message in main loop after successful decryption
     except FileNotFoundError:
@@ -59,3 +78,33 @@ def _handle_decrypt_message(stdscr, rsa_handler, history, keys_folder, last_encr
     except Exception as e:
         history.append(f"err decrypting message: {str(e)}")
     return last_encrypted_message # return original message if decryption failed, allowing retry
+
+# decrypt saved messages from the journal by record id or id range, streamed in batches
+def _decrypt_saved_messages(stdscr, history, keys_folder, menu_items_for_layout):
+    try:
+        with Journal(journal_path()) as journal:
+            count = len(journal)
+            if not count:
+                history.append("err: no encrypted message available. encrypt a message first.")
+                return
+            text = get_user_input(stdscr, f"saved message id or range (1-{count}): ", history, menu_items_for_layout)
+            if not text:
+                history.append("no message selected.")
+                return
+            try:
+                first, last = _parse_id_range(text.strip())
+            except ValueError:
+                history.append("err: enter an id like 7 or a range like 7-12.")
+                return
+            with metrics.track("message.decrypt_saved") as tracker:
+                found = 0
+                for record, message in journal.decrypt(Keystore(keys_folder), start_id=first, end_id=last + 1):
+                    history.append(f"#{record.id} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.timestamp))}: {message}")
+                    tracker.bytes += len(record.ciphertext)
+                    found += 1
+            if not found:
+                history.append(f"err: no saved messages in {first}-{last}.")
+    except ValueError as e: # key missing from the keystore, wrong key, corrupted record or journal file
+        history.append(f"err: unable to decrypt saved messages ({str(e) or 'incorrect key or data'}).")
+    except Exception as e:
+        history.append(f"err decrypting saved messages: {str(e)}")
@@ -1,8 +1,19 @@
 import socket
-import select
 import os
+from Crypto.Random import get_random_bytes
+from lib.metrics import metrics, timed
+from lib.session import (
+    CLOSE, DATA, FRAME_HEADER, HELLO, KEY, NONCE_SIZE, REJECT, RESUME, RESUME_OK,
+    client_handshake, decode_frame_header, derive_cipher, encode_frame, expect, resume_salt,
+)
 
-# act as client
+SERVER_IDLE_TIMEOUT = 15 # seconds without connections before server stops
+CLIENT_TIMEOUT = 30 # seconds to wait on any single socket operation
+
+# (host, port) -> (session_id, master_secret), lets reconnects skip the rsa handshake
+_client_sessions = {}
+
+# act as client: open a session, read the server's message, then chat over the same connection
 def act_as_client(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout):
     from ui import get_user_input # late import to avoid circular dependency
     host = get_user_input(stdscr, "enter server ip: ", history, menu_items_for_layout)
@@ -14,27 +25,26 @@ def act_as_client(stdscr, rsa_handler, history, keys_folder, menu_items_for_layo
         return
 
     try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect((host, port))
-        history.append(f"connected to server at {host}:{port}")
-
-        # send public key to server
-        public_key_path = os.path.join(keys_folder, "rsa_pkcs1_oaep.pub")
-        with open(public_key_path, "rb") as f:
-            public_key_pem = f.read()
-        client_socket.sendall(public_key_pem)
-        history.append("public key sent to server.")
-
-        # receive encrypted message from server
-        encrypted_message = receive_all(client_socket, 4096) # buffer size for key
-        history.append("encrypted message received from server.")
-
-        # decrypt message
-        private_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep"))
-        decrypted_message = rsa_handler.decrypt(private_key, encrypted_message)
-        history.append(f"decrypted message: {decrypted_message}")
-
-        client_socket.close()
+        with socket.create_connection((host, port), timeout=CLIENT_TIMEOUT) as client_socket:
+            history.append(f"connected to server at {host}:{port}")
+
+            private_key = rsa_handler.load_key(os.path.join(keys_folder, "rsa_pkcs1_oaep"))
+            with open(os.path.join(keys_folder, "rsa_pkcs1_oaep.pub"), "rb") as f:
+                public_key_pem = f.read()
+            channel, resumed = open_client_session(client_socket, private_key, public_key_pem, (host, port))
+            history.append("session resumed, rsa handshake skipped." if resumed else "session key received from server.")
+
+            # server speaks first
+            history.append(f"decrypted message: {recv_data(client_socket, channel).decode()}")
+
+            # further messages reuse the same session key, no more rsa work
+            while True:
+                outgoing = get_user_input(stdscr, "message to server (empty to close): ", history, menu_items_for_layout)
+                if not outgoing:
+                    send_frame(client_socket, CLOSE)
+                    break
+                send_frame(client_socket, DATA, channel.seal(outgoing.encode()))
+                history.append(f"server: {recv_data(client_socket, channel).decode()}")
     except ConnectionRefusedError:
         history.append(f"err: connection refused by server at {host}:{port}.")
     except socket.gaierror: # getaddrinfo error
@@ -42,9 +52,10 @@ def act_as_client(stdscr, rsa_handler, history, keys_folder, menu_items_for_layo
     except Exception as e:
         history.append(f"client err: {str(e)}")
 
-# act as server
-def act_as_server(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout):
+# act as server: serve the key exchange to many concurrent clients until idle, in a background job
+def act_as_server(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
     from ui import get_user_input # late import
+    from async_server import run_server
     host = "0.0.0.0" # listen on all available interfaces
     port_str = get_user_input(stdscr, "enter port to listen on: ", history, menu_items_for_layout)
     try:
@@ -53,52 +64,136 @@ def act_as_server(stdscr, rsa_handler, history, keys_folder, menu_items_for_layo
         history.append("invalid port number.")
         return
 
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) # allow reuse of address
+    # every client gets the same message, encrypted with its own session key
+    message_to_encrypt = get_user_input(stdscr, "enter message to send to clients: ", history, menu_items_for_layout)
+    history.append(f"server listening on {host}:{port}. stops after {SERVER_IDLE_TIMEOUT}s without clients...")
+
+    def work(job):
+        try:
+            stats = run_server(
+                rsa_handler, host, port, message_to_encrypt,
+                idle_timeout=SERVER_IDLE_TIMEOUT, on_event=history.append, stop=job.cancel_event,
+            )
+        except OSError as e: # bind failure etc.
+            return f"server socket err: {str(e)}"
+        return (
+            f"server stopped: {stats['served']} served, {stats['failed']} failed, "
+            f"{stats['connections']} connections, {stats['resumed']} resumed."
+        )
+
+    jobs.submit(f"server :{port}", work)
+
+# send a file to a receiving peer, encrypted to the peer's public key, in a background job with progress
+def send_file_to_peer(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
+    from ui import get_user_input # late import
+    from jobs import ProgressReader
+    from transfer import send_files
+    host = get_user_input(stdscr, "enter receiver ip: ", history, menu_items_for_layout)
+    port_str = get_user_input(stdscr, "enter receiver port: ", history, menu_items_for_layout)
     try:
-        server_socket.bind((host, port))
-        server_socket.listen(1) # listen for one connection
-        history.append(f"server listening on {host}:{port}. waiting for connection...")
-        stdscr.refresh() # ensure message is displayed
-
-        # use select for non-blocking accept with timeout
-        readable, _, _ = select.select([server_socket], [], [], 15) # 15 sec timeout
-        if not readable:
-            history.append("server timeout: no connection received.")
-            server_socket.close()
-            return
-
-        conn, addr = server_socket.accept()
-        history.append(f"connection from {addr}")
-
-        # receive public key from client
-        client_public_key_pem = receive_all(conn, 1024) # buffer for key
-        client_public_key = rsa_handler.deserialize_key(client_public_key_pem)
-        history.append("public key received from client.")
-
-        # get message to encrypt and send
-        message_to_encrypt = get_user_input(stdscr, "enter message to send to client: ", history, menu_items_for_layout)
-        encrypted_message = rsa_handler.encrypt(client_public_key, message_to_encrypt)
-        conn.sendall(encrypted_message)
-        history.append("encrypted message sent to client.")
-
-        conn.close()
-    except socket.error as e:
-        history.append(f"server socket err: {str(e)}")
-    except Exception as e:
-        history.append(f"server err: {str(e)}")
-    finally:
-        server_socket.close()
-
-# receive all data from socket
-def receive_all(sock, buffer_size):
-    data = b""
-    while True:
-        part = sock.recv(buffer_size)
-        data += part
-        if len(part) < buffer_size:
-            # either 0 or end of data
-            break
-        elif not part: # explicitly check for empty bytes if connection closed prematurely
+        port = int(port_str)
+    except ValueError:
+        history.append("invalid port number.")
+        return
+    filename = get_user_input(stdscr, "enter file name to send: ", history, menu_items_for_layout)
+    if not os.path.isfile(filename):
+        history.append(f"err: file '{filename}' not found.")
+        return
+    key_prompt = "receiver public key file (default: own public key): "
+    key_path = get_user_input(stdscr, key_prompt, history, menu_items_for_layout) or os.path.join(keys_folder, "rsa_pkcs1_oaep.pub")
+    try:
+        public_key = rsa_handler.load_key(key_path)
+    except (FileNotFoundError, ValueError):
+        history.append(f"err: no valid public key in {key_path}.")
+        return
+
+    def work(job):
+        try:
+            results = []
+            send_files(host, port, public_key, [filename], wrap_reader=lambda reader: ProgressReader(reader, job),
+                       on_file=lambda path, sent, offset: results.append(offset))
+        except ConnectionRefusedError:
+            return f"err: connection refused by {host}:{port}."
+        except socket.gaierror:
+            return f"err: invalid host or ip address: {host}."
+        resumed = f", resumed at byte {results[0]}" if results and results[0] else ""
+        return f"sent {filename} to {host}:{port}{resumed}."
+
+    jobs.submit(f"send {os.path.basename(filename)} to {host}:{port}", work, total=os.path.getsize(filename))
+
+# receive encrypted file transfers into a directory until idle, in a background job
+def receive_files(stdscr, rsa_handler, history, keys_folder, menu_items_for_layout, jobs):
+    from ui import get_user_input # late import
+    from lib.keystore import Keystore
+    from transfer import serve_files
+    port_str = get_user_input(stdscr, "enter port to receive files on: ", history, menu_items_for_layout)
+    try:
+        port = int(port_str)
+    except ValueError:
+        history.append("invalid port number.")
+        return
+    dest_dir = get_user_input(stdscr, "save received files to (default: current directory): ", history, menu_items_for_layout) or os.getcwd()
+
+    def work(job):
+        try:
+            serve_files(Keystore(keys_folder), "0.0.0.0", port, dest_dir,
+                        stop=job.cancel_event, idle_timeout=SERVER_IDLE_TIMEOUT, on_event=history.append)
+        except OSError as e: # bind failure etc.
+            return f"receiver socket err: {str(e)}"
+        return f"stopped receiving files on port {port}."
+
+    jobs.submit(f"receive files :{port}", work)
+
+# client side of the handshake, resumes a cached session when the server still knows it.
+# outgoing messages are compressed only when compress is given ("auto" or a codec name)
+@timed("net.client_session")
+def open_client_session(sock, private_key, public_key_pem, peer=None, sessions=_client_sessions, compress=None):
+    ticket = sessions.get(peer) if peer is not None else None
+    if ticket:
+        session_id, master_secret = ticket
+        client_nonce = get_random_bytes(NONCE_SIZE)
+        send_frame(sock, RESUME, session_id + client_nonce)
+        frame_type, payload = recv_frame(sock)
+        if frame_type == RESUME_OK:
+            return derive_cipher(master_secret, resume_salt(client_nonce, payload), is_server=False, compress=compress), True
+        expect((frame_type, payload), REJECT) # anything else is a protocol error
+        sessions.pop(peer, None) # server forgot the session, fall back to full handshake
+
+    send_frame(sock, HELLO, public_key_pem)
+    session_id, master_secret = client_handshake(private_key, expect(recv_frame(sock), KEY))
+    if peer is not None:
+        sessions[peer] = (session_id, master_secret)
+    return derive_cipher(master_secret, session_id, is_server=False, compress=compress), False
+
+# receive one encrypted DATA frame and return its plaintext
+def recv_data(sock, channel):
+    frame_type, payload = recv_frame(sock)
+    if frame_type == CLOSE:
+        raise ConnectionError("server closed the session.")
+    return channel.open(expect((frame_type, payload), DATA))
+
+# send one length-prefixed frame
+def send_frame(sock, frame_type, payload=b""):
+    with metrics.track("net.send_frame") as tracker:
+        frame = encode_frame(frame_type, payload)
+        sock.sendall(frame)
+        tracker.bytes = len(frame)
+
+# receive one length-prefixed frame, returns (type, payload)
+def recv_frame(sock):
+    length, frame_type = decode_frame_header(recv_exact(sock, FRAME_HEADER.size))
+    with metrics.track("net.recv_frame") as tracker: # payload only, header wait may be idle time
+        tracker.bytes = length
+        return frame_type, recv_exact(sock, length)
+
+# receive exactly size bytes, partial reads are accumulated until complete
+def recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
             raise ConnectionError("socket connection closed before receiving all data.")
-    return data
+        received += count
+    return bytes(buffer)
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# tests import modules the way main.py and cli.py do, with src/ on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# keep the backend self-benchmark cache out of the user's home
+os.environ.setdefault("RSA_BACKEND_CACHE", os.path.join(tempfile.gettempdir(), "py-rsa-encrypt-tests", "backend.json"))
+
+from Crypto.PublicKey import RSA  # noqa: E402
+
+
+# one 1024-bit keypair for the whole run, generating keys dominates test time otherwise
+@pytest.fixture(scope="session")
+def private_key():
+    return RSA.generate(1024)
+
+
+@pytest.fixture(scope="session")
+def public_key(private_key):
+    return private_key.publickey()
+
+
+# a 2048-bit keypair for cases that need room for more than two primes or larger payloads
+@pytest.fixture(scope="session")
+def large_private_key():
+    return RSA.generate(2048)
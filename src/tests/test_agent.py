@@ -0,0 +1,111 @@
+import asyncio
+import io
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+
+import pytest
+from Crypto.Hash import SHA256
+from Crypto.Signature import pss
+
+from lib import hybrid
+from lib.agent import AgentClient, _prepare_socket_path, serve_agent
+from lib.keycache import fingerprint
+
+
+@pytest.fixture
+def socket_path():
+    directory = tempfile.mkdtemp(prefix="agent") # unix socket paths must stay short
+    yield os.path.join(directory, "sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+# runs serve_agent in its own thread and event loop, cancelling the task stops the agent
+class _RunningAgent:
+    def __init__(self, path, keys):
+        self.path = path
+        ready = threading.Event()
+        started = threading.Event()
+
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.ensure_future(serve_agent(path, keys, workers=2, on_ready=ready.set))
+            started.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        self._thread = threading.Thread(target=asyncio.run, args=(main(),))
+        self._thread.start()
+        assert started.wait(5) and ready.wait(5)
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join(5)
+
+
+@pytest.fixture
+def agent(socket_path, private_key, large_private_key):
+    running = _RunningAgent(socket_path, [private_key, large_private_key])
+    yield running
+    running.stop()
+
+
+def test_keys_are_listed_by_fingerprint(agent, private_key, large_private_key):
+    with AgentClient(agent.path) as client:
+        assert client.list_keys() == [(fingerprint(private_key), 1024), (fingerprint(large_private_key), 2048)]
+    assert stat.S_IMODE(os.stat(agent.path).st_mode) == 0o600
+
+
+def test_operations_use_the_requested_key(agent, private_key, large_private_key):
+    with AgentClient(agent.path) as client:
+        large_id = fingerprint(large_private_key)
+        assert len(client.encrypt(b"x", large_id)) == 256
+        assert client.decrypt(client.encrypt(b"default")) == b"default" # first key when no id is given
+        signature = client.sign(b"signed", large_id)
+        pss.new(large_private_key.publickey()).verify(SHA256.new(b"signed"), signature)
+
+
+def test_failures_are_reported_and_the_connection_survives(agent, private_key):
+    with AgentClient(agent.path) as client:
+        with pytest.raises(ValueError):
+            client.decrypt(b"\x01" * 128)
+        with pytest.raises(ValueError, match="tidak dikenal"):
+            client.encrypt(b"x", b"\0" * 32)
+        assert client.decrypt(client.encrypt(b"still works")) == b"still works"
+
+
+def test_agent_opens_hybrid_files_like_a_keystore(agent, large_private_key):
+    encrypted = io.BytesIO()
+    hybrid.encrypt_stream(large_private_key.publickey(), io.BytesIO(b"through the agent"), encrypted)
+    out = io.BytesIO()
+    with AgentClient(agent.path) as client:
+        hybrid.decrypt_stream(client, io.BytesIO(encrypted.getvalue()), out)
+    assert out.getvalue() == b"through the agent"
+
+
+def test_running_agent_is_not_replaced(agent):
+    with pytest.raises(FileExistsError):
+        _prepare_socket_path(agent.path)
+
+
+def test_stale_socket_is_cleaned_up_and_removed_on_stop(socket_path, private_key):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path) # left behind by an agent that died
+    stale.close()
+    running = _RunningAgent(socket_path, [private_key])
+    with AgentClient(socket_path) as client:
+        assert len(client.list_keys()) == 1
+    running.stop()
+    assert not os.path.exists(socket_path)
+
+
+def test_client_needs_a_socket(monkeypatch):
+    monkeypatch.delenv("RSA_AGENT_SOCK", raising=False)
+    with pytest.raises(FileNotFoundError):
+        AgentClient()
@@ -0,0 +1,118 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import network
+from async_server import run_server
+from lib.rsa import RSAHandler
+from lib.session import HELLO, encode_frame
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# the server running in a thread; stop() ends it and returns its stats
+class _RunningServer:
+    def __init__(self, **options):
+        self.port = free_port()
+        self.events = []
+        self._stats = {}
+        self._stop = threading.Event()
+        ready = threading.Event()
+
+        def on_event(message):
+            self.events.append(message)
+            ready.set()
+
+        def run():
+            self._stats.update(run_server(RSAHandler(), "127.0.0.1", self.port, "hello from server",
+                                          stop=self._stop, on_event=on_event, **options))
+
+        self._thread = threading.Thread(target=run)
+        self._thread.start()
+        assert ready.wait(5)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(10)
+        return self._stats
+
+
+@pytest.fixture
+def server():
+    running = []
+
+    def start(**options):
+        running.append(_RunningServer(**options))
+        return running[-1]
+
+    yield start
+    for instance in running:
+        instance.stop()
+
+
+def talk(port, private_key, messages=(), sessions=None):
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        channel, resumed = network.open_client_session(sock, private_key, private_key.publickey().export_key(),
+                                                       ("127.0.0.1", port), sessions if sessions is not None else {})
+        replies = [network.recv_data(sock, channel)]
+        for message in messages:
+            network.send_frame(sock, network.DATA, channel.seal(message))
+            replies.append(network.recv_data(sock, channel))
+        network.send_frame(sock, network.CLOSE)
+    return replies, resumed
+
+
+def test_client_gets_the_message_and_can_reply(server, private_key):
+    running = server()
+    replies, resumed = talk(running.port, private_key, [b"ping", b"pong!"])
+    assert replies == [b"hello from server", b"received 4 bytes", b"received 5 bytes"]
+    assert not resumed
+    stats = running.stop()
+    assert (stats["served"], stats["messages"], stats["failed"], stats["active"]) == (1, 2, 0, 0)
+
+
+def test_many_clients_are_served_concurrently(server, private_key):
+    running = server(max_handshakes=4)
+    with ThreadPoolExecutor(16) as executor:
+        results = list(executor.map(lambda _: talk(running.port, private_key)[0], range(32)))
+    assert all(replies == [b"hello from server"] for replies in results)
+    assert running.stop()["served"] == 32
+
+
+def test_bad_client_key_does_not_affect_other_clients(server, private_key):
+    running = server()
+    with socket.create_connection(("127.0.0.1", running.port), timeout=10) as sock:
+        sock.sendall(encode_frame(HELLO, b"not a key"))
+        assert sock.recv(1) == b"" # server drops the connection
+    assert talk(running.port, private_key)[0] == [b"hello from server"]
+    assert any(message.startswith("err serving") for message in running.events)
+    assert running.stop()["failed"] == 1
+
+
+def test_silent_client_times_out(server):
+    running = server(timeout=0.2)
+    with socket.create_connection(("127.0.0.1", running.port), timeout=10) as sock:
+        assert sock.recv(1) == b"" # never sent HELLO
+    assert any("timeout" in message for message in running.events)
+
+
+def test_reconnect_resumes_the_session_without_rsa(server, private_key, monkeypatch):
+    running = server()
+    sessions = {}
+    assert talk(running.port, private_key, sessions=sessions) == ([b"hello from server"], False)
+    monkeypatch.setattr(network, "client_handshake", lambda *args: pytest.fail("resume fell back to rsa"))
+    assert talk(running.port, private_key, [b"again"], sessions=sessions) == ([b"hello from server", b"received 5 bytes"], True)
+    assert running.stop()["resumed"] == 1
+
+
+def test_unknown_session_falls_back_to_a_full_handshake(server, private_key):
+    running = server()
+    sessions = {("127.0.0.1", running.port): (b"\0" * 16, b"\0" * 32)} # the server never issued this
+    assert talk(running.port, private_key, sessions=sessions) == ([b"hello from server"], False)
+    assert sessions[("127.0.0.1", running.port)][0] != b"\0" * 16
@@ -0,0 +1,97 @@
+import pytest
+
+from lib import backend, keyformat
+from lib.metrics import metrics
+
+pytest.importorskip("cryptography")
+
+
+@pytest.fixture
+def openssl():
+    return backend.OpenSSLBackend()
+
+
+@pytest.fixture
+def enabled_metrics():
+    previous = metrics.enabled
+    metrics.enabled = True
+    metrics.reset()
+    yield metrics
+    metrics.enabled = previous
+    metrics.reset()
+
+
+def test_backends_decrypt_each_others_ciphertexts(openssl, private_key):
+    pycryptodome = backend.PycryptodomeBackend()
+    for encrypting, decrypting in ((openssl, pycryptodome), (pycryptodome, openssl)):
+        ciphertext = encrypting.oaep_cipher(private_key.publickey()).encrypt(b"interop")
+        assert decrypting.oaep_cipher(private_key).decrypt(ciphertext) == b"interop"
+
+
+def test_openssl_errors_match_pycryptodome(openssl, private_key):
+    cipher = openssl.oaep_cipher(private_key)
+    with pytest.raises(ValueError, match="Plaintext is too long"):
+        cipher.encrypt(b"x" * 200)
+    with pytest.raises(ValueError, match="incorrect length"):
+        cipher.decrypt(b"short")
+    with pytest.raises(ValueError, match="Incorrect decryption"):
+        cipher.decrypt(b"\x01" * 128)
+    with pytest.raises(TypeError):
+        openssl.oaep_cipher(private_key.publickey()).decrypt(b"\x01" * 128)
+
+
+def test_fast_loaded_key_is_validated_once(monkeypatch, openssl, private_key):
+    data = keyformat.export_key(private_key)
+    validations = []
+    load_private = openssl._load_private
+
+    def spy(numbers, skip_validation=False):
+        if not skip_validation:
+            validations.append(numbers)
+        return load_private(numbers, skip_validation)
+
+    monkeypatch.setattr(openssl, "_load_private", spy)
+    key = keyformat.import_key(data)
+    assert not keyformat.is_verified(key)
+    openssl.oaep_cipher(key)
+    openssl.oaep_cipher(key)
+    openssl.oaep_cipher(keyformat.import_key(data)) # same key reloaded into a new object
+    assert len(validations) == 1
+    assert keyformat.is_verified(key)
+
+
+def test_pem_keys_skip_openssl_validation(monkeypatch, openssl, private_key):
+    skipped = []
+    load_private = openssl._load_private
+
+    def spy(numbers, skip_validation=False):
+        skipped.append(skip_validation)
+        return load_private(numbers, skip_validation)
+
+    monkeypatch.setattr(openssl, "_load_private", spy)
+    openssl.oaep_cipher(keyformat.import_key(private_key.export_key()))
+    assert skipped == [True]
+
+
+def test_metric_names_tell_padded_and_raw_ops_apart(enabled_metrics, openssl, private_key):
+    for chosen in (openssl, backend.PycryptodomeBackend()):
+        cipher = chosen.oaep_cipher(private_key)
+        cipher.decrypt(cipher.encrypt(b"m"))
+    names = set(enabled_metrics.snapshot())
+    assert {"rsa.public_op_padded", "rsa.private_op_padded"} <= names # openssl: padding and rsa together
+    assert {"rsa.raw_public_op", "rsa.raw_private_op"} <= names # pycryptodome: rsa only
+
+
+def test_select_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        backend.select("nope")
+
+
+def test_auto_select_caches_the_benchmark(monkeypatch, tmp_path):
+    monkeypatch.setenv("RSA_BACKEND_CACHE", str(tmp_path / "backend.json"))
+    runs = []
+    monkeypatch.setattr(backend, "benchmark", lambda backends: runs.append(1) or {name: 1.0 for name in backends})
+    first = backend.select("auto")
+    second = backend.select("auto")
+    assert first.name == second.name
+    assert len(runs) == 1
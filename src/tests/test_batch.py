@@ -0,0 +1,65 @@
+import pytest
+
+from lib import batch
+from lib.batch import BatchPool
+from lib.rsa import RSAHandler
+
+
+@pytest.fixture
+def handler():
+    handler = RSAHandler()
+    yield handler
+    handler.close()
+
+
+def messages(count):
+    return [f"message {number}" for number in range(count)]
+
+
+def test_pool_results_keep_input_order(private_key):
+    with BatchPool(private_key, workers=2, serial_threshold=4) as pool:
+        encrypted = pool.encrypt_many(messages(40))
+        assert pool._executor is not None # the batch went through worker processes
+        assert pool.decrypt_many(encrypted) == messages(40)
+
+
+def test_small_batches_stay_in_process(private_key):
+    small = messages(batch.DEFAULT_SERIAL_THRESHOLD - 1)
+    with BatchPool(private_key, workers=2) as pool:
+        assert pool.decrypt_many(pool.encrypt_many(small)) == small
+        assert pool._executor is None
+
+
+def test_handler_reuses_one_pool_for_a_keypair(handler, private_key, public_key):
+    encrypted = handler.encrypt_many(public_key, messages(10), workers=2, serial_threshold=4)
+    first = handler._pool
+    assert handler.decrypt_many(private_key, encrypted, workers=2, serial_threshold=4) == messages(10)
+    private_pool = handler._pool # a public-key pool cannot decrypt, so it is replaced once
+    assert first is not private_pool
+    handler.encrypt_many(public_key, messages(10), workers=2, serial_threshold=4)
+    handler.decrypt_many(private_key, encrypted, workers=2, serial_threshold=4)
+    assert handler._pool is private_pool
+
+
+def test_handler_closes_the_pool_when_the_key_changes(handler, private_key, large_private_key):
+    handler.encrypt_many(private_key, messages(4), workers=2, serial_threshold=2)
+    old_pool = handler._pool
+    handler.encrypt_many(large_private_key, messages(4), workers=2, serial_threshold=2)
+    assert handler._pool is not old_pool
+    assert old_pool._executor is None
+    handler.close()
+    handler.close() # safe to repeat
+    assert handler._pool is None
+
+
+def test_caller_pool_is_used_as_is(handler, private_key, public_key):
+    with BatchPool(private_key, workers=1) as pool:
+        encrypted = handler.encrypt_many(public_key, messages(3), pool=pool)
+        assert handler.decrypt_many(private_key, encrypted, pool=pool) == messages(3)
+    assert handler._pool is None
+
+
+def test_bad_ciphertext_raises(private_key):
+    with BatchPool(private_key, workers=2, serial_threshold=2) as pool:
+        with pytest.raises(ValueError):
+            pool.decrypt_many([b"\x01" * 128] * 4)
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import benchmark
+from lib import backend
+
+
+# main() switches the process-wide backend, put it back afterwards
+@pytest.fixture(autouse=True)
+def restore_backend(monkeypatch):
+    monkeypatch.setattr(backend, "_backend", backend._backend)
+
+
+def result(name, ops_per_s, **params):
+    return {"name": name, "params": params, "ops_per_s": ops_per_s}
+
+
+def tiny_run(tmp_path, *extra):
+    output = tmp_path / "report.json"
+    code = benchmark.main([
+        "--key-sizes", "1024", "--payload-sizes", "16", "--file-sizes", "4096", "--batch-size", "4",
+        "--workers", "1", "--primes", "--iterations", "2", "--keygen-iterations", "1",
+        "--backend", "pycryptodome", "--output", str(output), *extra,
+    ])
+    return code, json.loads(output.read_text())
+
+
+def test_summary_statistics():
+    summary = benchmark.summarize("encrypt", {"key_size": 1024}, [0.001, 0.002, 0.003, 0.004], ops=2)
+    assert summary["ops_per_s"] == pytest.approx(800)
+    assert summary["p50_ms"] == pytest.approx(2)
+    assert summary["p99_ms"] == pytest.approx(4)
+    assert benchmark.percentile([1], 0.95) == 1
+
+
+def test_case_id_ignores_parameter_order():
+    assert benchmark.case_id(result("decrypt", 1, key_size=2048, payload=16)) == \
+        benchmark.case_id(result("decrypt", 1, payload=16, key_size=2048)) == "decrypt[key_size=2048,payload=16]"
+
+
+def test_compare_flags_only_drops_past_the_tolerance():
+    baseline = {"results": [result("encrypt", 100, key_size=1024), result("decrypt", 100, key_size=1024)]}
+    current = [result("encrypt", 95, key_size=1024), result("decrypt", 80, key_size=1024), result("sign", 1, key_size=1024)]
+    regressions = benchmark.compare(current, baseline, tolerance=0.10)
+    assert [entry["case"] for entry in regressions] == ["decrypt[key_size=1024]"]
+    assert current[0]["baseline_ratio"] == pytest.approx(0.95)
+    assert "baseline_ratio" not in current[2] # new case, nothing to compare
+
+
+def test_quick_profile_keeps_explicit_options():
+    args = benchmark.parse_args(["--quick", "--iterations", "5"])
+    assert args.key_sizes == [1024, 2048]
+    assert args.iterations == 5
+    assert benchmark.parse_args(["--quick", "--primes"]).primes == []
+
+
+def test_report_and_baseline_round_trip(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    code, report = tiny_run(tmp_path, "--save-baseline", str(baseline))
+    assert code == 0
+    assert report["backend"] == "pycryptodome"
+    names = {entry["name"] for entry in report["results"]}
+    assert {"generate_keypair", "load_key", "encrypt", "decrypt", "encrypt_many", "file_decrypt"} <= names
+    assert json.loads(baseline.read_text())["backend"] == "pycryptodome"
+
+    code, report = tiny_run(tmp_path, "--baseline", str(baseline), "--tolerance", "1.0") # timing noise never fails
+    assert code == 0
+    assert report["baseline_backend"] == "pycryptodome"
+    assert report["regressions"] == []
+
+
+def test_baseline_from_another_backend_is_refused(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"backend": "openssl", "results": []}))
+    assert benchmark.main(["--backend", "pycryptodome", "--baseline", str(baseline)]) == 2
+    assert "--backend openssl" in capsys.readouterr().err
+    assert benchmark.baseline_backend({"results": []}) == "pycryptodome" # written before backends existed
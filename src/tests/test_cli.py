@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(SRC, "cli.py")
+
+
+def run_cli(*args, input=None, cwd=None):
+    return subprocess.run([sys.executable, CLI, *args], input=input, capture_output=True, cwd=cwd, timeout=120)
+
+
+@pytest.fixture(scope="module")
+def keys(tmp_path_factory):
+    out = tmp_path_factory.mktemp("cli")
+    result = run_cli("keygen", "--out", str(out), "--bits", "1024")
+    assert result.returncode == 0, result.stderr
+    return str(out / ".keys")
+
+
+def test_encrypt_decrypt_through_stdin_and_stdout(keys):
+    plaintext = os.urandom(200 * 1024)
+    encrypted = run_cli("encrypt", "--keys", keys, input=plaintext)
+    assert encrypted.returncode == 0, encrypted.stderr
+    decrypted = run_cli("decrypt", "--keys", keys, input=encrypted.stdout)
+    assert decrypted.returncode == 0, decrypted.stderr
+    assert decrypted.stdout == plaintext
+
+
+def test_decrypt_file_and_range(keys, tmp_path):
+    plaintext = os.urandom(300 * 1024)
+    (tmp_path / "data").write_bytes(plaintext)
+    assert run_cli("encrypt", "--keys", keys, "-i", str(tmp_path / "data"), "-o", str(tmp_path / "data.enc")).returncode == 0
+    whole = run_cli("decrypt", "--keys", keys, "-i", str(tmp_path / "data.enc"))
+    assert whole.stdout == plaintext
+    part = run_cli("decrypt", "--keys", keys, "-i", str(tmp_path / "data.enc"), "--offset", "70000", "--length", "100")
+    assert part.stdout == plaintext[70000:70100]
+
+
+def test_errors_are_reported_with_exit_status(keys):
+    result = run_cli("decrypt", "--keys", keys, input=b"RSAH garbage")
+    assert result.returncode == 1
+    assert result.stderr.startswith(b"err:")
+
+
+def test_importing_rsa_handler_stays_light():
+    # only the modules an operation needs are imported, and the backend is picked on first use
+    code = (
+        "import sys; from lib.rsa import RSAHandler; "
+        "print(' '.join(m for m in ('lib.hybrid', 'lib.signing', 'lib.batch', 'lib.backend', 'lib.journal', 'cryptography') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, cwd=SRC, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
@@ -0,0 +1,73 @@
+import io
+import lzma
+import os
+import zlib
+
+import pytest
+
+from lib import compression, hybrid
+from lib.session import derive_cipher
+
+TEXT = b"2026-10-18 12:00:00 INFO request handled in 12ms\n" * 2000
+
+
+@pytest.mark.parametrize("codec", [name for name in compression.available_codecs() if name != "none"])
+def test_round_trip(codec):
+    number = compression.CODECS[codec]
+    packed = compression.compress(number, TEXT)
+    assert len(packed) < len(TEXT) // 10
+    assert compression.decompress(number, packed, len(TEXT)) == TEXT
+
+
+def test_codec_choice():
+    assert compression.choose_codec(None, TEXT) == compression.CODEC_NONE # off unless asked for
+    assert compression.choose_codec("auto", TEXT) == compression.DEFAULT_CODEC
+    assert compression.choose_codec("lzma", TEXT) == compression.CODEC_LZMA
+    assert compression.choose_codec("auto", os.urandom(64 * 1024)) == compression.CODEC_NONE
+    assert compression.choose_codec("auto", TEXT[:compression.MIN_SIZE - 1]) == compression.CODEC_NONE
+    with pytest.raises(ValueError):
+        compression.choose_codec("brotli", TEXT)
+
+
+@pytest.mark.parametrize("codec, packed", [
+    (compression.CODEC_ZLIB, zlib.compress(bytes(10 * 1024 * 1024))),
+    (compression.CODEC_LZMA, lzma.compress(bytes(10 * 1024 * 1024))),
+])
+def test_decompression_bombs_are_stopped_at_the_limit(codec, packed):
+    limit = 64 * 1024
+    with pytest.raises(ValueError):
+        compression.decompress(codec, packed, limit)
+    assert compression.decompress(codec, compression.compress(codec, bytes(limit)), limit) == bytes(limit)
+
+
+def test_corrupt_or_trailing_data_is_rejected():
+    packed = zlib.compress(TEXT)
+    with pytest.raises(ValueError):
+        compression.decompress(compression.CODEC_ZLIB, packed[:-10], len(TEXT))
+    with pytest.raises(ValueError):
+        compression.decompress(compression.CODEC_ZLIB, packed + b"junk", len(TEXT))
+    with pytest.raises(ValueError):
+        compression.decompress(99, packed, len(TEXT))
+
+
+def test_hybrid_files_compress_only_on_request(private_key, public_key):
+    plain, packed = io.BytesIO(), io.BytesIO()
+    hybrid.encrypt_stream(public_key, io.BytesIO(TEXT), plain)
+    hybrid.encrypt_stream(public_key, io.BytesIO(TEXT), packed, compress="auto")
+    assert len(plain.getvalue()) > len(TEXT)
+    assert len(packed.getvalue()) < len(TEXT) // 5
+    out = io.BytesIO()
+    hybrid.decrypt_stream(private_key, io.BytesIO(packed.getvalue()), out)
+    assert out.getvalue() == TEXT
+
+
+def test_session_messages_compress_only_on_request():
+    sizes = {}
+    for compress in (None, "zlib"):
+        sender = derive_cipher(b"s" * 32, b"salt", is_server=False, compress=compress)
+        receiver = derive_cipher(b"s" * 32, b"salt", is_server=True) # reads either form
+        sealed = sender.seal(TEXT)
+        assert receiver.open(sealed) == TEXT
+        sizes[compress] = len(sealed)
+    assert sizes[None] > len(TEXT)
+    assert sizes["zlib"] < len(TEXT) // 5
@@ -0,0 +1,137 @@
+import io
+import os
+import threading
+
+import pytest
+from Crypto.PublicKey import RSA
+
+from file_handlers import _decrypt_file, _encrypt_file, _report_bulk, _should_encrypt, process_directory
+from jobs import Cancelled, Job
+from lib import hybrid
+from lib.rsa import RSAHandler
+
+
+@pytest.fixture
+def handler():
+    return RSAHandler()
+
+
+# records the largest single read, to show a file is never read whole
+class _CountingReader(io.BytesIO):
+    largest_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+
+def test_file_round_trip(tmp_path, handler, private_key, public_key):
+    path = tmp_path / "report.txt"
+    path.write_bytes(os.urandom(3 * hybrid.DEFAULT_CHUNK_SIZE + 11))
+    encrypted, encrypted_bytes = _encrypt_file(handler, public_key, str(path))
+    assert encrypted == str(path) + ".enc"
+    decrypted, decrypted_bytes = _decrypt_file(handler, private_key, encrypted)
+    assert decrypted == str(path) + ".dec"
+    assert open(decrypted, "rb").read() == path.read_bytes()
+    assert encrypted_bytes == decrypted_bytes == path.stat().st_size
+
+
+def test_encryption_reads_one_chunk_at_a_time(handler, public_key):
+    reader = _CountingReader(os.urandom(10 * hybrid.DEFAULT_CHUNK_SIZE))
+    handler.encrypt_stream(public_key, reader, io.BytesIO())
+    assert reader.largest_read == hybrid.DEFAULT_CHUNK_SIZE
+
+
+def test_legacy_single_blob_files_still_decrypt(tmp_path, handler, private_key, public_key):
+    path = tmp_path / "old.enc"
+    path.write_bytes(handler.encrypt(public_key, "written before chunked files"))
+    decrypted, _ = _decrypt_file(handler, private_key, str(path))
+    assert open(decrypted, encoding="utf-8").read() == "written before chunked files"
+
+
+def test_failed_decryption_leaves_no_output(tmp_path, handler, public_key):
+    path = tmp_path / "secret.bin"
+    path.write_bytes(os.urandom(100 * 1024))
+    encrypted, _ = _encrypt_file(handler, public_key, str(path))
+    with pytest.raises(ValueError):
+        _decrypt_file(handler, RSA.generate(1024), encrypted) # wrong key
+    assert sorted(os.listdir(tmp_path)) == ["secret.bin", "secret.bin.enc"]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    (root / "sub" / "deeper").mkdir(parents=True)
+    files = {}
+    for relative in ("a.txt", "b.bin", "sub/c.txt", "sub/deeper/d.txt"):
+        files[relative] = os.urandom(5000)
+        (root / relative).write_bytes(files[relative])
+    (root / "old.enc").write_bytes(b"output of an earlier run")
+    return root, files
+
+
+def test_directory_round_trip(tree, handler, private_key, public_key):
+    root, files = tree
+    summary = process_directory(str(root), lambda path: _encrypt_file(handler, public_key, path), _should_encrypt, workers=3)
+    assert (summary["files"], summary["bytes"], summary["errors"]) == (4, 20000, [])
+    (root / "old.enc").unlink()
+    summary = process_directory(str(root), lambda path: _decrypt_file(handler, private_key, path),
+                                lambda path: path.endswith(".enc"))
+    assert summary["files"] == 4
+    for relative, data in files.items():
+        assert (root / (relative + ".dec")).read_bytes() == data
+
+
+def test_one_bad_file_does_not_stop_the_rest(tree, handler, private_key):
+    root, _ = tree
+    summary = process_directory(str(root), lambda path: _decrypt_file(handler, private_key, path),
+                                lambda path: path.endswith(".enc"))
+    assert summary["files"] == 0
+    assert [os.path.basename(path) for path, _ in summary["errors"]] == ["old.enc"]
+    history = []
+    line = _report_bulk(history, "decrypt", summary)
+    assert line.startswith("bulk decrypt: 0 ok, 1 failed")
+    assert history[0].startswith("err decrypting")
+
+
+def test_queued_work_is_bounded(tmp_path):
+    for number in range(40):
+        (tmp_path / f"f{number:02}").write_bytes(b"x")
+    selected = 0
+    completed = 0
+    most_queued = 0
+    lock = threading.Lock()
+
+    # the walk is lazy: a file is selected only once there is room to queue it
+    def select(path):
+        nonlocal selected, most_queued
+        with lock:
+            most_queued = max(most_queued, selected - completed)
+            selected += 1
+        return True
+
+    def transform(path):
+        nonlocal completed
+        threading.Event().wait(0.002)
+        with lock:
+            completed += 1
+
+    summary = process_directory(str(tmp_path), transform, select, workers=2, max_in_flight=3)
+    assert summary["files"] == 40
+    assert most_queued <= 3
+
+
+def test_cancel_stops_queueing_files(tmp_path):
+    for number in range(50):
+        (tmp_path / f"f{number:02}").write_bytes(b"x")
+    job = Job(1, "encrypt tree")
+    seen = []
+
+    def transform(path):
+        seen.append(path)
+        job.cancel()
+
+    with pytest.raises(Cancelled):
+        process_directory(str(tmp_path), transform, lambda path: True, workers=1, max_in_flight=1, job=job)
+    assert len(seen) < 50
@@ -0,0 +1,120 @@
+import io
+import os
+
+import pytest
+
+from lib import hybrid
+
+
+def encrypt(public_key, plaintext, **options):
+    out = io.BytesIO()
+    hybrid.encrypt_stream(public_key, io.BytesIO(plaintext), out, **options)
+    return out.getvalue()
+
+
+def decrypt(private_key, data):
+    out = io.BytesIO()
+    hybrid.decrypt_stream(private_key, io.BytesIO(data), out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("size", [0, 1, 1024, 5 * 1024 + 7])
+def test_round_trip(private_key, public_key, size):
+    plaintext = os.urandom(size)
+    data = encrypt(public_key, plaintext, chunk_size=1024)
+    assert data[4] == hybrid.VERSION
+    assert decrypt(private_key, data) == plaintext
+
+
+def test_mapped_decrypt_matches_stream(tmp_path, private_key, public_key):
+    plaintext = os.urandom(10 * 1024 + 3)
+    path = tmp_path / "data.enc"
+    path.write_bytes(encrypt(public_key, plaintext, chunk_size=1024))
+    out = io.BytesIO()
+    with open(path, "rb") as reader:
+        hybrid.decrypt_mapped(private_key, reader, out)
+    assert out.getvalue() == plaintext
+
+
+def test_truncated_stream_is_rejected(private_key, public_key):
+    data = encrypt(public_key, os.urandom(4096), chunk_size=1024)
+    header_size = hybrid._HEADER_FIXED.size + hybrid.KEY_ID_SIZE + 2 + public_key.size_in_bytes() + hybrid.NONCE_PREFIX_SIZE
+    one_record = header_size + hybrid._RECORD_HEADER.size + 1024 + hybrid.TAG_SIZE
+    # cut right after a complete non-final chunk: every record is valid but the final flag is missing
+    with pytest.raises(ValueError):
+        decrypt(private_key, data[:one_record])
+
+
+@pytest.mark.parametrize("offset, value", [
+    (7, 0x08), # chunk_size 1024 -> 2048
+    (hybrid._HEADER_FIXED.size + hybrid.KEY_ID_SIZE + 1, 1), # codec: none -> zlib
+])
+def test_tampered_header_fails_authentication(private_key, public_key, offset, value):
+    data = bytearray(encrypt(public_key, os.urandom(2048), chunk_size=1024))
+    assert data[offset] != value
+    data[offset] = value
+    with pytest.raises(ValueError):
+        decrypt(private_key, bytes(data))
+
+
+def test_oversized_chunk_size_is_rejected_before_allocating(private_key, public_key):
+    with pytest.raises(ValueError):
+        encrypt(public_key, b"x", chunk_size=hybrid.MAX_CHUNK_SIZE + 1)
+    data = bytearray(encrypt(public_key, b"x"))
+    data[5:9] = (0xFFFFFFFF).to_bytes(4, "big")
+    with pytest.raises(ValueError, match="chunk_size"):
+        decrypt(private_key, bytes(data))
+
+
+def test_range_reads(private_key, public_key):
+    plaintext = os.urandom(20 * 1000)
+    data = io.BytesIO(encrypt(public_key, plaintext, chunk_size=1000))
+    assert hybrid.decrypt_range(private_key, data, 0, 10) == plaintext[:10]
+    assert hybrid.decrypt_range(private_key, data, 999, 1002) == plaintext[999:2001]
+    assert hybrid.decrypt_range(private_key, data, 19990) == plaintext[19990:]
+
+
+def test_too_many_chunks_fails_before_writing(monkeypatch, tmp_path, public_key):
+    monkeypatch.setattr(hybrid, "MAX_CHUNKS", 4)
+    path = tmp_path / "data"
+    path.write_bytes(b"x" * 5)
+    out = io.BytesIO()
+    with open(path, "rb") as reader, pytest.raises(ValueError, match="chunk"):
+        hybrid.encrypt_stream(public_key, reader, out, chunk_size=1)
+    assert out.getvalue() == b""
+
+
+def test_too_many_chunks_from_a_stream_fails_cleanly(monkeypatch, private_key, public_key):
+    monkeypatch.setattr(hybrid, "MAX_CHUNKS", 4)
+    # size unknown up front: the counter check stops the stream before the nonce would repeat
+    with pytest.raises(ValueError, match="chunk"):
+        encrypt(public_key, b"x" * 5, chunk_size=1)
+    assert decrypt(private_key, encrypt(public_key, b"x" * 4, chunk_size=1)) == b"x" * 4
+
+
+def decrypt_mapped_file(tmp_path, private_key, data):
+    path = tmp_path / "mapped.enc"
+    path.write_bytes(data)
+    out = io.BytesIO()
+    with open(path, "rb") as reader:
+        hybrid.decrypt_mapped(private_key, reader, out)
+    return out.getvalue()
+
+
+def test_mapped_decrypt_of_empty_and_compressed_files(tmp_path, private_key, public_key):
+    assert decrypt_mapped_file(tmp_path, private_key, encrypt(public_key, b"")) == b""
+    text = b"the same line over and over\n" * 5000
+    assert decrypt_mapped_file(tmp_path, private_key, encrypt(public_key, text, chunk_size=4096, compress="zlib")) == text
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:hybrid._HEADER_FIXED.size - 1], # shorter than a header
+    lambda data: data[:-1], # index cut short
+    lambda data: data + b"extra", # bytes after the index
+    lambda data: data[:600] + bytes([data[600] ^ 1]) + data[601:], # flipped ciphertext bit
+])
+def test_mapped_decrypt_rejects_damaged_files(tmp_path, private_key, public_key, damage):
+    data = encrypt(public_key, os.urandom(3000), chunk_size=1024)
+    # a view left alive by the traceback would turn this into BufferError when the mapping closes
+    with pytest.raises(ValueError):
+        decrypt_mapped_file(tmp_path, private_key, damage(data))
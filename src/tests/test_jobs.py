@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+
+import pytest
+
+from file_handlers import _decrypt_file, _encrypt_file
+from jobs import Cancelled, Job, JobManager
+from lib import hybrid
+from lib.rsa import RSAHandler
+from ui import History
+
+
+@pytest.fixture
+def encrypted_file(tmp_path, public_key):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(5 * 4096 + 123))
+    output, _ = _encrypt_file(RSAHandler(), public_key, str(path))
+    return path, output
+
+
+def test_tui_decrypt_uses_mapped_path_and_reports_progress(monkeypatch, encrypted_file, private_key):
+    path, encrypted = encrypted_file
+    calls = []
+    original = hybrid.decrypt_mapped
+    monkeypatch.setattr(hybrid, "decrypt_mapped", lambda *args: calls.append(args) or original(*args))
+    monkeypatch.setattr(hybrid, "decrypt_stream", lambda *args: pytest.fail("job decrypt left the mmap path"))
+
+    job = Job(1, "decrypt", total=os.path.getsize(encrypted))
+    output, total = _decrypt_file(RSAHandler(), private_key, encrypted, job)
+
+    assert len(calls) == 1
+    assert open(output, "rb").read() == path.read_bytes()
+    assert total == path.stat().st_size
+    assert job.done == os.path.getsize(encrypted) # every byte of the file, header and index included
+
+
+def test_cancelled_decrypt_stops_between_chunks_and_leaves_no_output(tmp_path, private_key, public_key):
+    path = tmp_path / "big.bin"
+    path.write_bytes(os.urandom(8 * 1024))
+    encrypted = str(path) + ".enc"
+    with open(path, "rb") as reader, open(encrypted, "wb") as writer:
+        hybrid.encrypt_stream(public_key, reader, writer, chunk_size=1024)
+
+    job = Job(1, "decrypt")
+    advance = job.advance
+
+    def cancel_after_first_chunk(count):
+        job.cancel()
+        advance(count)
+
+    job.advance = cancel_after_first_chunk
+    with pytest.raises(Cancelled):
+        _decrypt_file(RSAHandler(), private_key, encrypted, job)
+    assert not os.path.exists(str(path) + ".dec")
+    assert not os.path.exists(str(path) + ".dec.part")
+
+
+def test_job_manager_reports_results_and_cancellation():
+    history = History("")
+    manager = JobManager(history, workers=1)
+    started = threading.Event()
+
+    def slow(job):
+        started.set()
+        while True:
+            job.advance(1)
+            time.sleep(0.001)
+
+    manager.submit("ok", lambda job: "finished")
+    job = manager.submit("slow", slow)
+    started.wait(5)
+    manager.cancel(job.id)
+    manager.shutdown()
+    messages = list(history)
+    assert "finished" in messages
+    assert f"job {job.id} cancelled: slow" in messages
+
+
+def test_history_is_safe_to_append_while_reading():
+    history = History("", capacity=50)
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            history.append("line")
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(2000): # iterating a deque that changes size raises RuntimeError without the lock
+            list(history)
+            history.recent(10)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert len(history) == 50
@@ -0,0 +1,144 @@
+import os
+
+import pytest
+from Crypto.PublicKey import RSA
+
+from lib import journal as journal_module
+from lib.journal import DATA_NAME, INDEX_NAME, Journal
+from lib.keycache import fingerprint, oaep_cipher
+from lib.keystore import Keystore
+
+
+@pytest.fixture(scope="module")
+def second_key():
+    return RSA.generate(1024)
+
+
+@pytest.fixture
+def keystore(tmp_path, private_key, second_key):
+    keys = Keystore(str(tmp_path / ".keys"))
+    keys.add(private_key)
+    keys.add(second_key)
+    return keys
+
+
+def encrypt(key, text):
+    return oaep_cipher(key.publickey()).encrypt(text.encode())
+
+
+def fill(journal, keys, count, start_time=1000.0):
+    # records alternate between the keys, like messages from before and after a rotation interleaved
+    for number in range(1, count + 1):
+        key = keys[number % len(keys)]
+        journal.append(encrypt(key, f"m{number}"), fingerprint(key), timestamp=start_time + number)
+
+
+# stands in for a keystore holding many rotated keys
+class _KeyMap:
+    def __init__(self, keys):
+        self._keys = {fingerprint(key): key for key in keys}
+
+    def private_key_for(self, key_id):
+        return self._keys[key_id]
+
+
+def test_ids_and_range_lookups(tmp_path, private_key):
+    with Journal(str(tmp_path / "j")) as journal:
+        fill(journal, [private_key], 100)
+        assert len(journal) == 100
+        assert journal.get(42).timestamp == 1042.0
+        with pytest.raises(KeyError):
+            journal.get(101)
+        assert [r.id for r in journal.records(start_id=10, end_id=13)] == [10, 11, 12]
+        assert [r.id for r in journal.records(since=1095, until=1098)] == [95, 96, 97]
+        assert [r.id for r in journal.records(start_id=50, until=1052)] == [50, 51]
+        assert list(journal.records(start_id=200)) == []
+
+
+def test_timestamps_never_go_backwards(tmp_path, private_key):
+    with Journal(str(tmp_path / "j")) as journal:
+        journal.append(encrypt(private_key, "a"), fingerprint(private_key), timestamp=2000)
+        journal.append(encrypt(private_key, "b"), fingerprint(private_key), timestamp=1000)
+        assert [r.timestamp for r in journal.records()] == [2000.0, 2000.0]
+
+
+def test_decrypt_interleaved_keys_reuses_one_pool_per_key(monkeypatch, tmp_path, keystore, private_key, second_key):
+    created = []
+    real_pool = journal_module.BatchPool
+
+    def counting_pool(key, workers=None):
+        created.append(fingerprint(key))
+        return real_pool(key, workers=1)
+
+    monkeypatch.setattr(journal_module, "BatchPool", counting_pool)
+    with Journal(str(tmp_path / "j")) as journal:
+        fill(journal, [private_key, second_key], 60)
+        results = list(journal.decrypt(keystore, batch_size=8, start_id=5, end_id=55))
+    assert [message for _, message in results] == [f"m{number}" for number in range(5, 55)]
+    assert sorted(created) == sorted([fingerprint(private_key), fingerprint(second_key)])
+
+
+def test_open_pools_are_bounded_and_closed(monkeypatch, tmp_path, private_key):
+    keys = [private_key] + [RSA.generate(1024) for _ in range(journal_module.MAX_OPEN_POOLS)]
+    open_pools = set()
+    real_pool = journal_module.BatchPool
+
+    class TrackedPool(real_pool):
+        def __init__(self, key, workers=None):
+            super().__init__(key, workers=1)
+            open_pools.add(self)
+            assert len(open_pools) <= journal_module.MAX_OPEN_POOLS
+
+        def close(self):
+            open_pools.discard(self)
+            super().close()
+
+    monkeypatch.setattr(journal_module, "BatchPool", TrackedPool)
+    with Journal(str(tmp_path / "j")) as journal:
+        fill(journal, keys, 20)
+        assert len(list(journal.decrypt(_KeyMap(keys), batch_size=4))) == 20
+    assert not open_pools
+
+
+def test_truncated_tail_is_dropped_on_open(tmp_path, private_key):
+    directory = str(tmp_path / "j")
+    with Journal(directory) as journal:
+        fill(journal, [private_key], 5)
+    data_path = os.path.join(directory, DATA_NAME)
+    with open(data_path, "r+b") as f:
+        f.truncate(os.path.getsize(data_path) - 10) # crash while writing the last record
+    with Journal(directory) as journal:
+        assert len(journal) == 4
+        assert journal.append(encrypt(private_key, "next"), fingerprint(private_key)) == 5
+
+
+def test_corrupt_last_indexed_record_is_dropped(tmp_path, private_key):
+    directory = str(tmp_path / "j")
+    with Journal(directory) as journal:
+        fill(journal, [private_key], 5)
+    data_path = os.path.join(directory, DATA_NAME)
+    with open(data_path, "r+b") as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b"xyz") # crc no longer matches
+    with Journal(directory) as journal:
+        assert [r.id for r in journal.records()] == [1, 2, 3, 4]
+
+
+def test_missing_index_entries_are_rebuilt(tmp_path, private_key):
+    directory = str(tmp_path / "j")
+    with Journal(directory) as journal:
+        fill(journal, [private_key], 5)
+    index_path = os.path.join(directory, INDEX_NAME)
+    with open(index_path, "r+b") as f:
+        f.truncate(os.path.getsize(index_path) - 2 * 24) # crash between record and index writes
+    with Journal(directory) as journal:
+        assert len(journal) == 5
+        assert journal.get(5).id == 5
+
+
+def test_other_files_are_rejected(tmp_path):
+    directory = tmp_path / "j"
+    directory.mkdir()
+    (directory / DATA_NAME).write_bytes(b"not a journal")
+    with pytest.raises(ValueError):
+        Journal(str(directory))
@@ -0,0 +1,67 @@
+import gc
+import os
+
+from Crypto.PublicKey import RSA
+
+from lib.keycache import CipherCache, KeyCache, fingerprint
+
+
+def write_key(path, key):
+    path.write_bytes(key.export_key())
+    return str(path)
+
+
+def test_unchanged_file_is_parsed_once(tmp_path, private_key):
+    cache = KeyCache()
+    path = write_key(tmp_path / "key", private_key)
+    first = cache.load(path)
+    assert cache.load(path) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_rewritten_file_is_parsed_again(tmp_path, private_key, large_private_key):
+    cache = KeyCache()
+    path = write_key(tmp_path / "key", private_key)
+    cache.load(path)
+    os.replace(write_key(tmp_path / "other", large_private_key), path) # new inode
+    assert cache.load(path).n == large_private_key.n
+    cache.invalidate(path)
+    assert cache.load(path).n == large_private_key.n
+    assert cache.misses == 3
+
+
+def test_least_recently_used_key_is_dropped(tmp_path, private_key):
+    cache = KeyCache(max_entries=2)
+    paths = [write_key(tmp_path / f"key{number}", private_key) for number in range(3)]
+    cache.load(paths[0])
+    cache.load(paths[1])
+    cache.load(paths[0]) # paths[1] is now the oldest
+    cache.load(paths[2])
+    assert len(cache) == 2
+    cache.load(paths[0])
+    assert cache.hits == 2
+    cache.load(paths[1])
+    assert cache.misses == 4
+
+
+def test_cipher_is_reused_per_key_object(private_key):
+    cache = CipherCache()
+    cipher = cache.get(private_key)
+    assert cache.get(private_key) is cipher
+    assert cipher.decrypt(cache.get(private_key.publickey()).encrypt(b"cached")) == b"cached"
+
+
+def test_cipher_of_a_collected_key_is_not_reused():
+    cache = CipherCache()
+    key = RSA.generate(1024)
+    cache.get(key)
+    del key
+    gc.collect()
+    other = RSA.generate(1024) # may reuse the id() of the collected key
+    assert cache.get(other).decrypt(cache.get(other.publickey()).encrypt(b"x")) == b"x"
+
+
+def test_fingerprint_is_shared_by_both_halves_of_a_keypair(private_key, large_private_key):
+    assert fingerprint(private_key) == fingerprint(private_key.publickey())
+    assert fingerprint(private_key) != fingerprint(large_private_key)
+    assert len(fingerprint(private_key)) == 32
@@ -0,0 +1,73 @@
+import math
+
+import pytest
+from Crypto.Util.number import getPrime
+
+from lib import keyformat, multiprime
+from lib.rsa import RSAHandler
+
+
+@pytest.fixture(scope="module")
+def multiprime_key():
+    return multiprime.generate(1024, primes=3)
+
+
+# every kind of key comes back from the binary form with the same pem export
+@pytest.mark.parametrize("name", ["private_key", "public_key", "multiprime_key"])
+def test_binary_round_trip_keeps_the_pem(request, name):
+    key = request.getfixturevalue(name)
+    data = keyformat.export_key(key)
+    assert keyformat.is_binary(data)
+    loaded = keyformat.import_key(data)
+    assert loaded.export_key() == key.export_key()
+    assert keyformat.to_pem(data) == key.export_key()
+    assert keyformat.from_pem(key.export_key()) == data
+
+
+def test_loaded_keys_still_work(private_key, multiprime_key):
+    handler = RSAHandler()
+    for key in (private_key, multiprime_key):
+        loaded = handler.import_key(keyformat.export_key(key))
+        assert handler.decrypt(loaded, handler.encrypt(key.publickey(), "binary")) == "binary"
+
+
+def test_fast_path_skips_primality_until_asked(private_key):
+    data = keyformat.export_key(private_key)
+    key = keyformat.import_key(data)
+    assert not keyformat.is_verified(key)
+    keyformat.mark_verified(key)
+    assert keyformat.is_verified(key)
+    assert keyformat.is_verified(keyformat.import_key(data, verify=True))
+    assert keyformat.is_verified(keyformat.import_key(private_key.export_key())) # pem is always fully checked
+
+
+def test_truncated_or_damaged_data_is_rejected(private_key):
+    data = keyformat.export_key(private_key)
+    for broken in (data[:6], data[:-1], data[:4] + b"\x02" + data[5:], data[:100] + b"\xff" + data[101:]):
+        with pytest.raises(ValueError):
+            keyformat.import_key(broken)
+
+
+# cheap checks pass for a factor that is a product of two primes, only verify=True notices
+def test_verify_rejects_a_composite_factor():
+    e = 65537
+    while True:
+        a, b = getPrime(256) * getPrime(256), getPrime(512)
+        if math.gcd(e, math.lcm(a - 1, b - 1)) == 1:
+            break
+    d = pow(e, -1, math.lcm(a - 1, b - 1))
+    data = keyformat._HEADER.pack(keyformat.MAGIC, keyformat.VERSION, keyformat.KIND_PRIVATE, 2)
+    data += keyformat._pack_ints((a * b, e, d, a, b, pow(a, -1, b)))
+    keyformat.import_key(data)
+    with pytest.raises(ValueError, match="bukan bilangan prima"):
+        keyformat.import_key(data, verify=True)
+
+
+def test_encode_picks_the_format(tmp_path, private_key):
+    assert keyformat.encode(private_key) == private_key.export_key()
+    assert keyformat.is_binary(keyformat.encode(private_key, "binary"))
+    with pytest.raises(ValueError, match="tidak dikenal"):
+        keyformat.encode(private_key, "der")
+    path = str(tmp_path / "key")
+    RSAHandler.save_key(private_key, path, key_format="binary")
+    assert RSAHandler.load_key(path).export_key() == private_key.export_key()
@@ -0,0 +1,84 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from lib import keystore as keystore_module
+from lib.keycache import fingerprint
+from lib.keystore import PRIVATE_KEY_NAME, PUBLIC_KEY_NAME, Keystore
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_keys_are_found_by_id_after_rotation(tmp_path, private_key, large_private_key):
+    keys = Keystore(str(tmp_path / ".keys"))
+    old_id = keys.add(private_key)
+    new_id = keys.add(large_private_key)
+    assert fingerprint(keys.current_public_key()) == new_id
+    assert keys.private_key_for(old_id).n == private_key.n
+    assert keys.public_key_for(old_id).n == private_key.n
+    assert keys.private_key_for(None).n == large_private_key.n
+    assert [entry["key_id"] for entry in keys.list_keys()] == [old_id.hex(), new_id.hex()]
+    with pytest.raises(ValueError):
+        keys.private_key_for(b"\0" * len(old_id))
+
+
+def test_private_files_stay_private(tmp_path, private_key):
+    keys = Keystore(str(tmp_path / ".keys"))
+    key_id = keys.add(private_key)
+    assert mode(keys.archive_path(key_id)) == 0o600
+    assert mode(os.path.join(keys.folder, PRIVATE_KEY_NAME)) == 0o600
+    assert mode(keys.archive_path(key_id, public=True)) == 0o644
+    assert mode(os.path.join(keys.folder, PUBLIC_KEY_NAME)) == 0o644
+
+
+def test_concurrent_saves_of_the_same_key(tmp_path, private_key):
+    keys = Keystore(str(tmp_path / ".keys"), key_format="binary")
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def save():
+        barrier.wait()
+        try:
+            keys.add(private_key)
+            keystore_module._write_key(str(tmp_path / "shared.pub"), private_key.publickey().export_key(), private=False)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(keys) == 1
+    assert (tmp_path / "shared.pub").read_bytes() == private_key.publickey().export_key()
+    leftovers = [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
+    assert leftovers == []
+
+
+def test_failed_write_leaves_no_temporary_file(monkeypatch, tmp_path):
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(keystore_module.os, "replace", fail)
+    with pytest.raises(OSError):
+        keystore_module._write_key(str(tmp_path / "key"), b"data", private=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_relative_path_is_written_in_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    keystore_module._write_key("key.pem", b"data", private=True)
+    assert (tmp_path / "key.pem").read_bytes() == b"data"
+
+
+def test_convert_keeps_every_key_loadable(tmp_path, private_key, large_private_key):
+    keys = Keystore(str(tmp_path / ".keys"))
+    ids = [keys.add(private_key), keys.add(large_private_key)]
+    assert keys.convert("binary") == 3
+    reopened = Keystore(str(tmp_path / ".keys"))
+    assert [reopened.private_key_for(key_id).n for key_id in ids] == [private_key.n, large_private_key.n]
@@ -0,0 +1,37 @@
+import json
+
+import loadgen
+
+
+def test_latency_summary():
+    assert loadgen._latency([]) is None
+    summary = loadgen._latency([0.004, 0.001, 0.002, 0.003])
+    assert summary["count"] == 4
+    assert summary["max_ms"] == 4.0
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+
+
+def test_unreachable_server_is_counted_as_errors():
+    port = loadgen._free_port("127.0.0.1") # nothing listens here
+    args = loadgen.parse_args(["--port", str(port), "--connections", "5", "--concurrency", "2", "--key-size", "1024", "--timeout", "2"])
+    report = loadgen.run(args)
+    assert report["connections"] == 0
+    assert report["error_rate"] == 1.0
+    assert report["errors"] == {"ConnectionRefusedError": 5}
+    assert report["server"] is None
+
+
+def test_local_server_run_with_resumed_sessions(tmp_path, capsys):
+    output = tmp_path / "report.json"
+    status = loadgen.main([
+        "--connections", "6", "--concurrency", "2", "--messages", "3", "--resume",
+        "--key-size", "1024", "--output", str(output),
+    ])
+    assert status == 0
+    report = json.loads(output.read_text())
+    assert (report["connections"], report["messages"], report["errors"]) == (6, 18, {})
+    assert report["resumed"] >= 4 # a client does one full handshake, its later connections reuse the ticket
+    assert report["handshake"]["count"] == 6 and report["round_trip"]["count"] == 18
+    server = report["server"] # stats from the spawned server process
+    assert (server["connections"], server["resumed"], server["failed"]) == (6, report["resumed"], 0)
+    assert "6 connections" in capsys.readouterr().err
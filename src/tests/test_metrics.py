@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from lib.metrics import Metrics, metrics, timed
+from lib.rsa import RSAHandler
+
+
+@pytest.fixture
+def enabled_metrics():
+    previous = metrics.enabled
+    metrics.enabled = True
+    metrics.reset()
+    yield metrics
+    metrics.enabled = previous
+    metrics.reset()
+
+
+def test_observations_are_counted_and_bucketed():
+    registry = Metrics(enabled=True)
+    registry.observe("op", 0.0002, 10)
+    registry.observe("op", 0.003, 20)
+    registry.observe("op", 2.0, 0, error=True)
+    stats = registry.snapshot()["op"]
+    assert (stats["count"], stats["errors"], stats["bytes"]) == (3, 1, 30)
+    assert stats["buckets"]["0.0005"] == 1
+    assert stats["buckets"]["0.005"] == 1
+    assert stats["buckets"]["5.0"] == 1
+    assert stats["p50_seconds"] == 0.005 # upper bound of the bucket holding the median
+    assert stats["max_seconds"] == stats["p99_seconds"] == 2.0
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics()
+    registry.observe("op", 1.0)
+    with registry.track("block") as tracker:
+        tracker.bytes = 5
+    assert registry.snapshot() == {}
+
+
+def test_tracker_records_bytes_and_errors():
+    registry = Metrics(enabled=True)
+    with registry.track("file.encrypt") as tracker:
+        tracker.bytes = 1234
+    with pytest.raises(RuntimeError):
+        with registry.track("file.encrypt"):
+            raise RuntimeError("boom")
+    stats = registry.snapshot()["file.encrypt"]
+    assert (stats["count"], stats["errors"], stats["bytes"]) == (2, 1, 1234)
+
+
+def test_prometheus_buckets_are_cumulative(tmp_path):
+    registry = Metrics(enabled=True)
+    for seconds in (0.00005, 0.02, 0.02):
+        registry.observe("rsa.decrypt", seconds, 256)
+    text = registry.to_prometheus()
+    assert 'rsa_latency_seconds_bucket{op="rsa.decrypt",le="0.0001"} 1' in text
+    assert 'rsa_latency_seconds_bucket{op="rsa.decrypt",le="+Inf"} 3' in text
+    assert 'rsa_bytes_total{op="rsa.decrypt"} 768' in text
+    registry.dump(str(tmp_path / "m.prom"))
+    registry.dump(str(tmp_path / "m.json"))
+    assert (tmp_path / "m.prom").read_text() == text
+    assert json.loads((tmp_path / "m.json").read_text())["rsa.decrypt"]["count"] == 3
+
+
+def test_timed_functions_report_through_the_shared_registry(enabled_metrics):
+    @timed("test.double", count_bytes=lambda args, result: len(result))
+    def double(data):
+        return data * 2
+
+    assert double(b"abc") == b"abcabc"
+    assert enabled_metrics.snapshot()["test.double"]["bytes"] == 6
+
+
+def test_handler_operations_are_instrumented(enabled_metrics, private_key, public_key):
+    handler = RSAHandler()
+    handler.decrypt(private_key, handler.encrypt(public_key, "hello"))
+    with pytest.raises(ValueError):
+        handler.decrypt(private_key, b"\x01" * 128)
+    snapshot = handler.metrics_snapshot()
+    assert snapshot["rsa.encrypt"]["bytes"] == 5
+    assert (snapshot["rsa.decrypt"]["count"], snapshot["rsa.decrypt"]["errors"]) == (2, 1)
+    assert any(line.startswith("rsa.decrypt: n=2 err=1") for line in enabled_metrics.summary_lines())
@@ -0,0 +1,83 @@
+import math
+
+import pytest
+from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Hash import SHA256
+from Crypto.Math.Primality import generate_probable_prime
+from Crypto.Signature import pss
+
+from lib import multiprime
+
+
+@pytest.fixture(scope="module")
+def three_prime_key():
+    return multiprime.generate(1024, primes=3)
+
+
+def test_generated_key_has_the_requested_primes(three_prime_key):
+    assert len(three_prime_key.primes) == 3
+    assert math.prod(three_prime_key.primes) == three_prime_key.n
+    assert three_prime_key.size_in_bits() == 1024
+    with pytest.raises(ValueError):
+        multiprime.generate(1024, primes=4)
+
+
+def test_decrypt_and_sign_interoperate_with_the_public_key(three_prime_key):
+    public = three_prime_key.publickey()
+    ciphertext = PKCS1_OAEP.new(public).encrypt(b"multi-prime")
+    assert PKCS1_OAEP.new(three_prime_key).decrypt(ciphertext) == b"multi-prime"
+    digest = SHA256.new(b"signed")
+    pss.new(public).verify(digest, pss.new(three_prime_key).sign(digest))
+
+
+@pytest.mark.parametrize("options", [{}, {"pkcs": 8}, {"pkcs": 8, "passphrase": "secret"}])
+def test_export_import_round_trip(three_prime_key, options):
+    data = three_prime_key.export_key(**options)
+    key = multiprime.import_key(data, options.get("passphrase"))
+    assert key.primes == three_prime_key.primes
+    assert key.export_key() == three_prime_key.export_key()
+
+
+def test_crt_fault_is_detected(three_prime_key):
+    key = multiprime.import_key(three_prime_key.export_key())
+    ciphertext = PKCS1_OAEP.new(key.publickey()).encrypt(b"x")
+    key._exponents[2] += 1 # a faulty exponentiation modulo one prime
+    with pytest.raises(ValueError, match="Fault"):
+        PKCS1_OAEP.new(key).decrypt(ciphertext)
+
+
+def rebuilt(key, **changes):
+    # a key whose stored components are changed but still encode as a valid structure
+    values = {"n": key.n, "e": key.e, "d": key.d, "primes": key.primes, **changes}
+    return multiprime.MultiPrimeRsaKey(values["n"], values["e"], values["d"], values["primes"]).export_key()
+
+
+def test_inconsistent_private_exponent_is_rejected(three_prime_key):
+    with pytest.raises(ValueError):
+        multiprime.import_key(rebuilt(three_prime_key, d=three_prime_key.d + 2))
+
+
+def test_wrong_modulus_is_rejected(three_prime_key):
+    with pytest.raises(ValueError):
+        multiprime.import_key(rebuilt(three_prime_key, n=three_prime_key.n + 2))
+
+
+def test_composite_factor_is_rejected(three_prime_key):
+    p, q = three_prime_key.primes[:2]
+    e = 65537
+    while True:
+        # every check except primality passes: n = p * q * c and e * d = 1 mod lcm(r_i - 1)
+        c = int(generate_probable_prime(exact_bits=170)) * int(generate_probable_prime(exact_bits=170))
+        lam = math.lcm(p - 1, q - 1, c - 1)
+        if math.gcd(e, lam) == 1:
+            break
+    data = multiprime.MultiPrimeRsaKey(p * q * c, e, pow(e, -1, lam), [p, q, c]).export_key()
+    with pytest.raises(ValueError):
+        multiprime.import_key(data)
+
+
+def test_tampered_crt_components_are_rejected(three_prime_key):
+    key = multiprime.import_key(three_prime_key.export_key())
+    key._coefficients[2] += 1
+    with pytest.raises(ValueError):
+        multiprime.import_key(key.export_key())
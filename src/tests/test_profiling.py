@@ -0,0 +1,64 @@
+import os
+import pstats
+
+import pytest
+
+from jobs import JobManager
+from lib.profiling import Profiler, profiler
+from ui import History
+
+
+def profile_files(directory, suffix):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffix))
+
+
+def allocate_marker():
+    return [bytearray(1024) for _ in range(2000)] # about 2 MB from this line
+
+
+def test_action_writes_profile_and_allocation_diff(tmp_path):
+    local = Profiler(str(tmp_path))
+    try:
+        with local.profile("menu.encrypt message"):
+            kept = allocate_marker()
+    finally:
+        local.disable()
+    assert kept
+    (prof,) = profile_files(tmp_path, ".prof")
+    assert "menu.encrypt_message" in prof
+    assert any("allocate_marker" in name for _, _, name in pstats.Stats(prof).stats)
+    (alloc,) = profile_files(tmp_path, ".alloc.txt")
+    first_line = open(alloc, encoding="utf-8").readline()
+    assert "test_profiling.py" in first_line # the biggest growth during the action is the marker line
+    assert len(profile_files(tmp_path, ".snapshot")) == 1
+
+
+def test_nested_and_disabled_actions_write_nothing_extra(tmp_path):
+    local = Profiler(str(tmp_path), memory_frames=0)
+    with local.profile("outer"):
+        with local.profile("inner"):
+            pass
+    local.disable()
+    with local.profile("off"):
+        pass
+    assert [os.path.basename(path).endswith("-outer.prof") for path in profile_files(tmp_path, ".prof")] == [True]
+
+
+@pytest.fixture
+def global_profiler(tmp_path):
+    profiler.enable(str(tmp_path))
+    yield tmp_path
+    profiler.disable()
+
+
+def test_background_job_is_profiled_on_its_worker_thread(global_profiler):
+    def work(job):
+        allocate_marker()
+        return "done"
+
+    manager = JobManager(History(""), workers=1)
+    manager.submit("encrypt big.bin", work)
+    manager.shutdown()
+    (prof,) = profile_files(global_profiler, ".prof")
+    assert "job.encrypt_big.bin" in prof
+    assert any(name == "allocate_marker" for _, _, name in pstats.Stats(prof).stats)
@@ -0,0 +1,72 @@
+import os
+import stat
+import time
+
+import pytest
+
+from lib.keyformat import import_key
+from lib.reservoir import KeypairReservoir
+from lib.rsa import RSAHandler
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+# close() cancels refills that have not started, so wait for the stock itself
+def wait_for_stock(reservoir, key_size, count):
+    deadline = time.monotonic() + 60
+    while reservoir.available(key_size) < count or reservoir._pending[key_size]:
+        assert time.monotonic() < deadline, "reservoir was not refilled"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def reservoir(tmp_path):
+    reservoir = KeypairReservoir(str(tmp_path / "reservoir"), sizes=(1024,), target=2)
+    yield reservoir
+    reservoir.close(wait=True)
+
+
+def test_refill_fills_to_target_with_private_files(reservoir):
+    reservoir.refill()
+    wait_for_stock(reservoir, 1024, 2)
+    assert reservoir.available(1024) == 2
+    assert mode(reservoir.directory) == 0o700
+    size_dir = os.path.join(reservoir.directory, "1024")
+    assert all(mode(os.path.join(size_dir, name)) == 0o600 for name in os.listdir(size_dir))
+
+
+def test_pop_uses_each_keypair_once_and_refills(reservoir):
+    reservoir.refill()
+    wait_for_stock(reservoir, 1024, 2)
+    first = reservoir.pop(1024)
+    second = reservoir.pop(1024)
+    assert first.size_in_bits() == second.size_in_bits() == 1024
+    assert first.n != second.n
+    wait_for_stock(reservoir, 1024, 2) # both pops scheduled a refill
+    assert reservoir.available(1024) == 2
+
+
+def test_empty_or_untracked_size_returns_none(reservoir):
+    assert reservoir.pop(4096) is None
+    assert reservoir.available(4096) == 0
+
+
+def test_stock_from_older_versions_is_used(reservoir, private_key):
+    path = os.path.join(reservoir.directory, "1024", "legacy.pem")
+    with open(path, "wb") as f:
+        f.write(private_key.export_key())
+    assert reservoir.pop(1024).n == private_key.n
+    assert not os.path.exists(path)
+
+
+def test_handler_takes_keypairs_from_the_reservoir(reservoir):
+    reservoir.refill()
+    wait_for_stock(reservoir, 1024, 2)
+    size_dir = os.path.join(reservoir.directory, "1024")
+    stock = {import_key(open(os.path.join(size_dir, name), "rb").read()).n for name in os.listdir(size_dir)}
+    handler = RSAHandler(key_size=1024, reservoir=reservoir)
+    public_key, private_key = handler.generate_keypair()
+    assert private_key.n in stock
+    assert public_key.n == private_key.n
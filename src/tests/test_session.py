@@ -0,0 +1,77 @@
+import socket
+
+import pytest
+
+import network
+from lib.session import (
+    DATA, FRAME_HEADER, MAX_FRAME_SIZE, ProtocolError, SessionCache, client_handshake, decode_frame_header,
+    derive_cipher, encode_frame, expect, server_handshake,
+)
+
+
+def channel_pair(compress=None):
+    secret = b"s" * 32
+    return derive_cipher(secret, b"salt", is_server=False, compress=compress), derive_cipher(secret, b"salt", is_server=True)
+
+
+def test_frames_round_trip_and_reject_oversized_lengths():
+    frame = encode_frame(DATA, b"payload")
+    assert decode_frame_header(frame[:FRAME_HEADER.size]) == (7, DATA)
+    assert frame[FRAME_HEADER.size:] == b"payload"
+    with pytest.raises(ProtocolError):
+        decode_frame_header(FRAME_HEADER.pack(MAX_FRAME_SIZE + 1, DATA))
+    with pytest.raises(ProtocolError):
+        expect((DATA, b""), 99)
+
+
+def test_recv_exact_reassembles_partial_reads():
+    left, right = socket.socketpair()
+    with left, right:
+        frame = encode_frame(DATA, b"x" * 100000)
+        for start in range(0, len(frame), 7000): # many small writes
+            left.sendall(frame[start:start + 7000])
+        assert network.recv_frame(right) == (DATA, b"x" * 100000)
+        left.close()
+        with pytest.raises(ConnectionError):
+            network.recv_exact(right, 1)
+
+
+def test_both_directions_use_their_own_keys():
+    client, server = channel_pair()
+    assert server.open(client.seal(b"to server")) == b"to server"
+    assert client.open(server.seal(b"to client")) == b"to client"
+    with pytest.raises(ProtocolError):
+        client.open(client.seal(b"reflected")) # a client message bounced back
+
+
+def test_replayed_or_reordered_messages_fail():
+    client, server = channel_pair()
+    client.seal(b"1") # lost in transit
+    second = client.seal(b"2")
+    with pytest.raises(ProtocolError):
+        server.open(second)
+    client, server = channel_pair()
+    sealed = client.seal(b"once")
+    server.open(sealed)
+    with pytest.raises(ProtocolError):
+        server.open(sealed)
+
+
+def test_handshake_shares_the_master_secret(private_key, public_key):
+    session_id, master_secret, payload = server_handshake(public_key)
+    assert client_handshake(private_key, payload) == (session_id, master_secret)
+    with pytest.raises(ProtocolError):
+        client_handshake(private_key, payload[:8])
+
+
+def test_session_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("lib.session.time.monotonic", lambda: now[0])
+    cache = SessionCache(ttl=10, max_entries=2)
+    cache.store(b"a", b"secret a")
+    cache.store(b"b", b"secret b")
+    assert cache.get(b"a") == b"secret a" # a is now the most recent
+    cache.store(b"c", b"secret c")
+    assert cache.get(b"b") is None
+    now[0] += 11
+    assert cache.get(b"a") is None
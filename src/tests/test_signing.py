@@ -0,0 +1,88 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+from lib import signing
+from lib.keystore import Keystore
+from lib.rsa import RSAHandler
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(3 * signing.READ_SIZE + 17))
+    return str(path)
+
+
+def test_streamed_hash_matches_hashlib(data_file):
+    expected = hashlib.sha256(open(data_file, "rb").read()).digest()
+    assert signing._hash_file(data_file).digest() == expected
+    assert signing.hash_stream(io.BytesIO(open(data_file, "rb").read())).digest() == expected # no readinto path too
+
+
+def test_sign_and_verify_file(data_file, private_key, public_key):
+    signature_file = RSAHandler.sign_file(private_key, data_file)
+    assert signature_file == data_file + ".sig"
+    RSAHandler.verify_file(public_key, data_file)
+    RSAHandler.verify_file(private_key, data_file) # either half of the keypair verifies
+
+
+def test_changed_file_or_signature_fails(data_file, private_key):
+    signature_file = signing.sign_file(private_key, data_file)
+    with open(data_file, "r+b") as f:
+        f.seek(signing.READ_SIZE + 5)
+        f.write(b"\0\0\0")
+    with pytest.raises(ValueError, match="tidak valid"):
+        signing.verify_file(private_key, data_file)
+    with open(signature_file, "r+b") as f:
+        f.write(b"XXXX")
+    with pytest.raises(ValueError):
+        signing.verify_file(private_key, data_file)
+
+
+def test_keystore_picks_the_signing_key_after_rotation(tmp_path, data_file, private_key, large_private_key):
+    keys = Keystore(str(tmp_path / ".keys"))
+    keys.add(private_key)
+    signing.sign_file(private_key, data_file)
+    keys.add(large_private_key) # rotated, the old key still verifies old signatures
+    signing.verify_file(keys, data_file)
+    with pytest.raises(ValueError, match="kunci lain"):
+        signing.verify_file(large_private_key, data_file)
+
+
+def test_verify_many_reports_each_pair_in_order(tmp_path, private_key):
+    pairs = []
+    for number in range(6):
+        path = tmp_path / f"f{number}"
+        path.write_bytes(os.urandom(1000))
+        signing.sign_file(private_key, str(path))
+        pairs.append((str(path), None))
+    (tmp_path / "f2").write_bytes(b"changed")
+    os.remove(tmp_path / "f4.sig")
+    for workers, threshold in ((1, 100), (2, 2)): # serial and through worker processes
+        results = RSAHandler.verify_many(private_key, pairs, workers=workers, serial_threshold=threshold)
+        assert [result is None for result in results] == [True, True, False, True, False, True]
+        assert "f4.sig" in results[4]
+
+
+def test_concurrent_signing_of_one_file(data_file, private_key):
+    errors = []
+
+    def sign():
+        try:
+            for _ in range(10):
+                signing.sign_file(private_key, data_file)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=sign) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    signing.verify_file(private_key, data_file)
+    assert sorted(os.listdir(os.path.dirname(data_file))) == ["data.bin", "data.bin.sig"]
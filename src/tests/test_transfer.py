@@ -0,0 +1,91 @@
+import os
+import socket
+import threading
+
+import pytest
+
+import transfer
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def receiver(tmp_path, private_key):
+    dest = tmp_path / "received"
+    port = free_port()
+    events = []
+    ready = threading.Event()
+    stop = threading.Event()
+
+    def on_event(message):
+        events.append(message)
+        ready.set()
+
+    thread = threading.Thread(target=transfer.serve_files, args=(private_key, "127.0.0.1", port, str(dest)),
+                              kwargs={"stop": stop, "on_event": on_event, "workers": 2})
+    thread.start()
+    assert ready.wait(5)
+    yield port, dest, events
+    stop.set()
+    thread.join(10)
+
+
+def source_file(tmp_path, size, name="data.bin"):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def test_files_arrive_intact_and_never_replace_existing_ones(receiver, tmp_path, public_key):
+    port, dest, _ = receiver
+    path = source_file(tmp_path, 300 * 1024)
+    sent = []
+    transfer.send_files("127.0.0.1", port, public_key, [str(path), str(path)], chunk_size=4096,
+                        on_file=lambda *args: sent.append(args))
+    assert [(count, offset) for _, count, offset in sent] == [(300 * 1024, 0)] * 2
+    assert (dest / "data.bin").read_bytes() == path.read_bytes()
+    assert (dest / "data (1).bin").read_bytes() == path.read_bytes()
+
+
+def test_partial_file_is_resumed(receiver, tmp_path, public_key):
+    port, dest, _ = receiver
+    path = source_file(tmp_path, 100 * 1024)
+    part = dest / f".data.bin.{transfer.transfer_id(str(path)).hex()[:16]}{transfer.PART_SUFFIX}"
+    part.write_bytes(path.read_bytes()[:40000]) # left behind by an interrupted transfer
+    sent = []
+    transfer.send_files("127.0.0.1", port, public_key, [str(path)], on_file=lambda *args: sent.append(args))
+    assert sent[0][1:] == (100 * 1024 - 40000, 40000)
+    assert (dest / "data.bin").read_bytes() == path.read_bytes()
+    assert not part.exists()
+
+
+def test_corrupt_partial_file_is_discarded(receiver, tmp_path, public_key):
+    port, dest, _ = receiver
+    path = source_file(tmp_path, 10 * 1024)
+    part = dest / f".data.bin.{transfer.transfer_id(str(path)).hex()[:16]}{transfer.PART_SUFFIX}"
+    part.write_bytes(b"\0" * 1000)
+    with pytest.raises(ValueError, match="checksum"):
+        transfer.send_files("127.0.0.1", port, public_key, [str(path)])
+    assert not part.exists()
+    transfer.send_files("127.0.0.1", port, public_key, [str(path)]) # the next offer starts from zero
+    assert (dest / "data.bin").read_bytes() == path.read_bytes()
+
+
+def test_data_past_the_offered_size_is_rejected(monkeypatch, receiver, tmp_path, public_key):
+    port, dest, events = receiver
+    path = source_file(tmp_path, 64 * 1024)
+    offered = 16 * 1024
+    monkeypatch.setattr(transfer.os.path, "getsize", lambda _path: offered) # a sender lying about the size
+    with pytest.raises((ValueError, OSError)):
+        transfer.send_files("127.0.0.1", port, public_key, [str(path)], chunk_size=4096)
+    for _ in range(50):
+        if any("more data than the offered" in message for message in events):
+            break
+        threading.Event().wait(0.1)
+    assert any("more data than the offered" in message for message in events)
+    assert not (dest / "data.bin").exists()
+    assert all(os.path.getsize(dest / name) <= offered for name in os.listdir(dest))
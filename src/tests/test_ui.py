@@ -0,0 +1,101 @@
+import pytest
+
+import ui
+from ui import History
+
+
+# stands in for a curses window, records what was drawn
+class FakeWindow:
+    def __init__(self, height, width):
+        self.size = (height, width)
+        self.rows = {}
+        self.erases = 0
+        self.writes = []
+
+    def getmaxyx(self):
+        return self.size
+
+    def addstr(self, y, x, text, attr=0):
+        self.rows[y] = text
+        self.writes.append(y)
+
+    def erase(self):
+        self.erases += 1
+        self.rows = {}
+
+    def clear(self):
+        self.erase()
+
+    def move(self, y, x):
+        pass
+
+    def clrtoeol(self):
+        pass
+
+    def noutrefresh(self):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    monkeypatch.setattr(ui.curses, "newwin", lambda height, width, y, x: FakeWindow(height, width))
+    monkeypatch.setattr(ui.curses, "color_pair", lambda number: 1)
+    monkeypatch.setattr(ui, "_layout", None)
+    return FakeWindow(40, 120)
+
+
+MENU = ["encrypt", "decrypt", "exit"]
+
+
+def test_history_keeps_the_newest_messages():
+    history = History("art", capacity=3)
+    for number in range(5):
+        history.append(f"m{number}")
+    assert list(history) == ["m2", "m3", "m4"]
+    assert history.recent(2) == ["m3", "m4"]
+    assert history.recent(10) == ["m2", "m3", "m4"]
+    assert history.version == 5
+    assert history.art == "art" # never scrolls out with the messages
+
+
+def test_messages_pane_is_redrawn_only_when_history_changes(screen):
+    history = History("art")
+    layout = ui._get_layout(screen, history, MENU)
+    history.append("first")
+    layout.draw_messages(history)
+    layout.draw_messages(history)
+    assert layout.messages_win.erases == 1
+    history.append("second")
+    layout.draw_messages(history)
+    assert layout.messages_win.erases == 2
+    assert [layout.messages_win.rows[row] for row in (1, 2)] == ["first", "second"]
+
+
+def test_moving_the_highlight_redraws_two_rows(screen):
+    layout = ui._get_layout(screen, History("art"), MENU)
+    layout.set_highlight(0)
+    layout.menu_win.writes.clear()
+    layout.set_highlight(2)
+    assert sorted(layout.menu_win.writes) == [1, 3] # old and new row, menu rows start below the border
+    layout.menu_win.writes.clear()
+    layout.set_highlight(2)
+    assert layout.menu_win.writes == []
+
+
+def test_layout_is_rebuilt_only_for_a_new_screen(screen):
+    history = History("art")
+    layout = ui._get_layout(screen, history, MENU)
+    assert ui._get_layout(screen, history, MENU) is layout
+    screen.size = (30, 100)
+    assert ui._get_layout(screen, history, MENU) is not layout
+
+
+def test_regions_that_do_not_fit_are_skipped(screen):
+    screen.size = (3, 20)
+    layout = ui._get_layout(screen, History("line\n" * 10), MENU)
+    assert layout.menu_win is None
+    layout.draw_messages(History("art")) # nothing to draw into, no error
+    layout.draw_jobs(["job"])
@@ -0,0 +1,325 @@
+import hashlib
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from lib.hybrid import DEFAULT_CHUNK_SIZE, encrypt_stream, decrypt_stream
+from lib.metrics import timed
+from lib.session import FRAME_HEADER, MAX_FRAME_SIZE, ProtocolError, decode_frame_header, encode_frame, expect
+
+# encrypted file transfer: the sender streams a file through chunked hybrid encryption
+# (to the receiver's public key) straight onto the socket, the receiver decrypts on the fly.
+# memory stays constant on both ends: one chunk in flight per side, tcp backpressure
+# blocks the sender when the receiver falls behind.
+#
+# sender                                receiver
+#   OFFER (size, transfer id, name) -->
+#                                   <-- ACCEPT (offset already received)
+#   DATA ... DATA, END              -->   hybrid stream of file[offset:]
+#   DONE (sha256 of the whole file) -->
+#                                   <-- OK, or ERROR (reason)
+#
+# the receiver keeps authenticated plaintext in a .part file named after the transfer id,
+# so a dropped transfer resumes at that offset when the same file is offered again.
+
+OFFER = 16
+ACCEPT = 17
+FILE_DATA = 18
+FILE_END = 19
+DONE = 20
+OK = 21
+ERROR = 22
+CLOSE = 23
+
+TRANSFER_ID_SIZE = 32
+_OFFER = struct.Struct(f">Q{TRANSFER_ID_SIZE}s") # file size, transfer id, then the utf-8 name
+_OFFSET = struct.Struct(">Q")
+
+SEND_BUFFER_SIZE = 1024 * 1024 # ciphertext gathered per DATA frame
+RECV_BUFFER_SIZE = 1024 * 1024
+HASH_READ_SIZE = 1024 * 1024
+TRANSFER_TIMEOUT = 60 # seconds for any single socket operation
+STOP_POLL_INTERVAL = 0.25 # seconds between checks of the stop event
+PART_SUFFIX = ".part"
+
+# transfer id: same name, size and mtime means the same file, so a partial copy can be resumed
+def transfer_id(path):
+    st = os.stat(path)
+    return hashlib.sha256(f"{os.path.basename(path)}\0{st.st_size}\0{st.st_mtime_ns}".encode()).digest()
+
+def _send_frame(sock, frame_type, payload=b""):
+    sock.sendall(encode_frame(frame_type, payload))
+
+def _recv_exact(rfile, size):
+    data = rfile.read(size)
+    if len(data) != size:
+        raise ConnectionError("connection closed before receiving all data.")
+    return data
+
+def _recv_frame(rfile):
+    length, frame_type = decode_frame_header(_recv_exact(rfile, FRAME_HEADER.size))
+    return frame_type, _recv_exact(rfile, length)
+
+# send every buffer with as few syscalls as possible (scatter-gather, no joining copies)
+def _sendmsg_all(sock, buffers):
+    views = [memoryview(buffer).cast("B") for buffer in buffers]
+    while views:
+        sent = sock.sendmsg(views)
+        while sent: # drop what was sent, keep the tail of a partially sent buffer
+            if sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
+
+# writer for encrypt_stream: collects record pieces and sends them as DATA frames of up to SEND_BUFFER_SIZE
+class _FrameWriter:
+    def __init__(self, sock):
+        self._sock = sock
+        self._pending = []
+        self._size = 0
+
+    def write(self, data):
+        view = memoryview(data)
+        while len(view) > MAX_FRAME_SIZE: # a piece never exceeds one frame
+            self.write(view[:MAX_FRAME_SIZE])
+            view = view[MAX_FRAME_SIZE:]
+        if self._size + len(view) > MAX_FRAME_SIZE:
+            self.flush()
+        self._pending.append(view)
+        self._size += len(view)
+        if self._size >= SEND_BUFFER_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._pending:
+            _sendmsg_all(self._sock, [FRAME_HEADER.pack(self._size, FILE_DATA), *self._pending])
+            self._pending, self._size = [], 0
+
+    # end of the hybrid stream
+    def close(self):
+        self.flush()
+        _send_frame(self._sock, FILE_END)
+
+# reader for decrypt_stream: payload bytes of DATA frames, b"" once the END frame arrives
+class _FrameReader:
+    def __init__(self, rfile):
+        self._rfile = rfile
+        self._remaining = 0 # payload bytes left in the current DATA frame
+        self._ended = False
+
+    def read(self, size):
+        parts = []
+        while size > 0 and not self._ended:
+            if not self._remaining:
+                length, frame_type = decode_frame_header(_recv_exact(self._rfile, FRAME_HEADER.size))
+                if frame_type == FILE_END:
+                    self._ended = True
+                elif frame_type == FILE_DATA:
+                    self._remaining = length
+                else:
+                    raise ProtocolError(f"Frame tidak terduga: tipe {frame_type}")
+                continue
+            data = self._rfile.read(min(size, self._remaining))
+            if not data:
+                raise ConnectionError("connection closed in the middle of a transfer.")
+            parts.append(data)
+            self._remaining -= len(data)
+            size -= len(data)
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+# file-like wrapper that hashes everything read (sender) or written (receiver).
+# limit: most bytes that may be written, checked before anything reaches the stream
+class _Hashing:
+    def __init__(self, stream, digest, limit=None):
+        self._stream = stream
+        self.digest = digest
+        self.count = 0
+        self._limit = limit
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self.digest.update(data)
+        self.count += len(data)
+        return data
+
+    def write(self, data):
+        if self._limit is not None and self.count + len(data) > self._limit:
+            raise ValueError("sender sent more data than the offered file size.")
+        self.digest.update(data)
+        self.count += len(data)
+        return self._stream.write(data)
+
+# sha256 of the first size bytes of an open file
+def _hash_prefix(f, size):
+    digest = hashlib.sha256()
+    while size > 0:
+        block = f.read(min(HASH_READ_SIZE, size))
+        if not block:
+            raise ValueError("partial file is shorter than expected.")
+        digest.update(block)
+        size -= len(block)
+    return digest
+
+# send one file over an open connection, returns (bytes sent, resumed offset).
+# wrap_reader lets the caller observe the plaintext read (e.g. a job's ProgressReader)
+@timed("net.send_file", count_bytes=lambda args, result: result[0])
+def send_file(sock, rfile, public_key, path, chunk_size=DEFAULT_CHUNK_SIZE, compress=None, wrap_reader=None):
+    size = os.path.getsize(path)
+    name = os.path.basename(path).encode("utf-8")
+    _send_frame(sock, OFFER, _OFFER.pack(size, transfer_id(path)) + name)
+    offset, = _OFFSET.unpack(expect(_recv_frame(rfile), ACCEPT))
+    if offset > size:
+        raise ProtocolError("receiver reported an offset past the end of the file.")
+
+    with open(path, "rb") as f:
+        digest = _hash_prefix(f, offset) # the receiver already has these bytes
+        reader = _Hashing(f, digest)
+        writer = _FrameWriter(sock)
+        encrypt_stream(public_key, wrap_reader(reader) if wrap_reader else reader, writer, chunk_size, compress)
+        writer.close()
+    if offset + reader.count != size:
+        raise ValueError(f"{path} changed size during the transfer.")
+    _send_frame(sock, DONE, digest.digest())
+
+    frame_type, payload = _recv_frame(rfile)
+    if frame_type == ERROR:
+        raise ValueError(f"receiver rejected {os.path.basename(path)}: {payload.decode(errors='replace')}")
+    expect((frame_type, payload), OK)
+    return reader.count, offset
+
+# connect once and send every file in order, on_file(path, sent, offset) after each one
+def send_files(host, port, public_key, paths, chunk_size=DEFAULT_CHUNK_SIZE, compress=None,
+               timeout=TRANSFER_TIMEOUT, wrap_reader=None, on_file=None):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with sock.makefile("rb", buffering=RECV_BUFFER_SIZE) as rfile:
+            for path in paths:
+                sent, offset = send_file(sock, rfile, public_key, path, chunk_size, compress, wrap_reader)
+                if on_file:
+                    on_file(path, sent, offset)
+            _send_frame(sock, CLOSE)
+
+# receiver side of one offered file, returns (final path, bytes received, resumed offset)
+@timed("net.receive_file", count_bytes=lambda args, result: result[1])
+def _receive_file(sock, rfile, keys, dest_dir, payload):
+    if len(payload) <= _OFFER.size:
+        raise ProtocolError("invalid file offer.")
+    size, offer_id = _OFFER.unpack_from(payload)
+    name = os.path.basename(payload[_OFFER.size:].decode("utf-8", errors="replace"))
+    if name in ("", ".", ".."):
+        raise ProtocolError("invalid file name in offer.")
+    final_path = os.path.join(dest_dir, name)
+    part_path = os.path.join(dest_dir, f".{name}.{offer_id.hex()[:16]}{PART_SUFFIX}")
+
+    with open(part_path, "a+b") as part:
+        offset = min(part.seek(0, os.SEEK_END), size)
+        part.truncate(offset) # never keep more than the offered size
+        part.seek(0)
+        digest = _hash_prefix(part, offset)
+        _send_frame(sock, ACCEPT, _OFFSET.pack(offset))
+        writer = _Hashing(part, digest, limit=size - offset) # the .part never grows past the offer
+        try:
+            decrypt_stream(keys, _FrameReader(rfile), writer) # only authenticated chunks reach the file
+        finally:
+            part.flush() # keep what arrived, the next offer resumes from here
+        expected = expect(_recv_frame(rfile), DONE)
+        if offset + writer.count != size or digest.digest() != expected:
+            part.close()
+            os.remove(part_path) # corrupt or changed source, the next offer starts from zero
+            raise ValueError("size or checksum mismatch, partial file discarded.")
+        os.fsync(part.fileno())
+    final_path = _move_without_clobbering(part_path, final_path)
+    _send_frame(sock, OK)
+    return final_path, writer.count, offset
+
+# senders are not authenticated, so a received file never replaces an existing one:
+# it lands as "name (1).ext", "name (2).ext", ... instead. os.link fails if the name
+# is taken, which keeps the check atomic when two transfers finish at once
+def _move_without_clobbering(part_path, final_path):
+    stem, ext = os.path.splitext(final_path)
+    candidate, counter = final_path, 0
+    while True:
+        try:
+            os.link(part_path, candidate)
+            break
+        except FileExistsError:
+            counter += 1
+            candidate = f"{stem} ({counter}){ext}"
+    os.remove(part_path)
+    return candidate
+
+# serve one sender connection: files are received until the sender closes
+def _serve_sender(sock, keys, dest_dir, on_event):
+    addr = sock.getpeername()
+    with sock, sock.makefile("rb", buffering=RECV_BUFFER_SIZE) as rfile:
+        while True:
+            try:
+                frame_type, payload = _recv_frame(rfile)
+            except ConnectionError:
+                return
+            if frame_type == CLOSE:
+                return
+            try:
+                path, received, offset = _receive_file(sock, rfile, keys, dest_dir, expect((frame_type, payload), OFFER))
+            except (ValueError, ProtocolError) as e: # bad data, wrong key: tell the sender, the stream is out of sync after this
+                on_event(f"err receiving from {addr}: {str(e)}")
+                try:
+                    _send_frame(sock, ERROR, str(e).encode())
+                except OSError:
+                    pass
+                return
+            except (OSError, ConnectionError) as e:
+                on_event(f"err: transfer from {addr} interrupted ({str(e) or type(e).__name__}), partial file kept for resume")
+                return
+            resumed = f", resumed at {offset}" if offset else ""
+            on_event(f"received {path} ({offset + received} bytes{resumed}) from {addr}")
+
+# accept senders until stop is set or idle_timeout passes with no active transfer.
+# keys: keystore (or private key) opening the data key named in each hybrid header
+def serve_files(keys, host, port, dest_dir, stop=None, idle_timeout=None, on_event=None, workers=8):
+    on_event = on_event or (lambda _msg: None)
+    os.makedirs(dest_dir, exist_ok=True)
+    active = set() # open sender connections
+    lock = threading.Lock()
+
+    def handle(conn):
+        try:
+            _serve_sender(conn, keys, dest_dir, on_event)
+        finally:
+            with lock:
+                active.discard(conn)
+
+    with socket.create_server((host, port)) as server, ThreadPoolExecutor(workers) as executor:
+        server.settimeout(STOP_POLL_INTERVAL)
+        on_event(f"receiving files on {host}:{port} into {dest_dir}")
+        idle_since = time.monotonic()
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    with lock:
+                        busy = bool(active)
+                    if busy:
+                        idle_since = time.monotonic()
+                    elif idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                        break
+                    continue
+                conn.settimeout(TRANSFER_TIMEOUT)
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with lock:
+                    active.add(conn)
+                idle_since = time.monotonic()
+                executor.submit(handle, conn)
+        finally:
+            with lock: # stopping: interrupt running transfers, their .part files stay for resume
+                for conn in active:
+                    try:
+                        conn.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
@@ -1,4 +1,9 @@
 import curses
+import threading
+from collections import deque
+from itertools import islice
+from lib.metrics import metrics
+from lib.profiling import profiler
 
 # display ascii art
 def display_ascii_art(stdscr):
@@ -18,146 +23,253 @@ __________  _________   _____    ___________ _______  ________________________._
 """
     return art
 
-# manage history list size
-def manage_history(history, max_entries=8):
-    # keep first entry (art) and most recent entries
-    if len(history) > max_entries:
-        # keep art and tail of history
-        return [history[0]] + history[-max_entries:]
-    return history
+DEFAULT_HISTORY_SIZE = 200 # messages kept for the session, older ones drop off
 
-# navigate menu and display history
-def menu_navigation(stdscr, menu, history):
-    # manage history before display
-    history = manage_history(history)
+MENU_BORDER_TOP = " ╔═════Menu═════════════════════╗"
+MENU_BORDER_BOTTOM = " ╚══════════════════════════════╝"
+MESSAGES_BORDER_TOP = "══════Messages══(s: stats, p: profile)═"
+STATS_BORDER_TOP = "══════Stats═════════════(s: messages)══"
+MESSAGES_BORDER_BOTTOM = "═════════════════════════════════════════"
+JOBS_BORDER_TOP = "══════Jobs══════════════(c: cancel)═════"
+JOBS_REFRESH_MS = 250 # progress redraw interval while waiting for a key
 
-    current_row = 0
-    max_y, max_x = stdscr.getmaxyx()
+# fixed-capacity message history, the ascii art is kept apart so it never scrolls out.
+# version changes on every append, the renderer uses it to skip redrawing unchanged messages.
+# jobs and network callbacks append from worker threads, so every access holds the lock
+# and readers get a list copy instead of iterating the live deque
+class History:
+    def __init__(self, art, capacity=DEFAULT_HISTORY_SIZE):
+        self.art = art
+        self._messages = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def append(self, message):
+        with self._lock:
+            self._messages.append(message)
+            self.version += 1
+
+    # newest count messages, oldest first
+    def recent(self, count):
+        with self._lock:
+            start = max(0, len(self._messages) - count)
+            return list(islice(self._messages, start, None))
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._messages))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._messages)
+
+# one curses window per screen region (art, menu, messages, jobs, input).
+# regions are drawn into their own window and flushed with doupdate, so a keypress
+# only sends the changed rows to the terminal instead of repainting the whole screen
+class _Layout:
+    def __init__(self, stdscr, art, menu):
+        self.size = stdscr.getmaxyx()
+        self.art = art
+        self.menu = list(menu)
+        max_y, max_x = self.size
+        art_lines = art.split("\n")
+        top = len(art_lines) + 1 # menu and messages start below the art
+        menu_width = max_x // 3 # menu on left third, messages on the right two-thirds
+        box_height = len(self.menu) + 2
+
+        stdscr.clear() # only when the layout is (re)built
+        stdscr.noutrefresh()
+        self.art_win = _window(len(art_lines), max_x, 0, 0, self.size)
+        self.menu_win = _window(box_height, menu_width, top, 0, self.size)
+        self.messages_win = _window(box_height, max_x - menu_width, top, menu_width, self.size)
+        jobs_top = top + box_height
+        self.jobs_win = _window(max_y - 3 - jobs_top, max_x, jobs_top, 0, self.size) # between the boxes and the prompt
+        self.input_win = _window(2, max_x, max_y - 3, 0, self.size)
+        self.highlight = None
+        self.drawn_messages = None # (mode, history version) currently on screen
+        self.drawn_jobs = [] # job status lines currently on screen
+
+        if self.art_win:
+            for i, line in enumerate(art_lines):
+                _put(self.art_win, i, 0, line)
+            self.art_win.noutrefresh()
+        if self.menu_win:
+            _put(self.menu_win, 0, 0, MENU_BORDER_TOP)
+            for idx in range(len(self.menu)):
+                self._draw_menu_row(idx)
+            _put(self.menu_win, len(self.menu) + 1, 0, MENU_BORDER_BOTTOM)
+            self.menu_win.noutrefresh()
+
+    def _draw_menu_row(self, idx):
+        if idx + 1 >= self.menu_win.getmaxyx()[0]:
+            return # row clipped off a small screen
+        attr = curses.color_pair(1) if idx == self.highlight else curses.A_NORMAL
+        self.menu_win.move(idx + 1, 0)
+        self.menu_win.clrtoeol()
+        _put(self.menu_win, idx + 1, 1, f"║ {self.menu[idx]}", attr)
+
+    # move the highlight, redrawing only the old and new rows
+    def set_highlight(self, row):
+        if row == self.highlight or not self.menu_win:
+            self.highlight = row
+            return
+        previous, self.highlight = self.highlight, row
+        for idx in (previous, row):
+            if idx is not None:
+                self._draw_menu_row(idx)
+        self.menu_win.noutrefresh()
+
+    # redraw the messages pane only when its mode or the history changed (stats always refresh)
+    def draw_messages(self, history, show_stats=False):
+        state = ("stats", None) if show_stats else ("messages", history.version)
+        if not self.messages_win or (state == self.drawn_messages and not show_stats):
+            return
+        self.drawn_messages = state
+        rows = len(self.menu)
+        lines = _stats_lines()[:rows] if show_stats else history.recent(rows)
+        win = self.messages_win
+        win.erase()
+        _put(win, 0, 0, STATS_BORDER_TOP if show_stats else MESSAGES_BORDER_TOP)
+        for i, line in enumerate(lines):
+            _put(win, i + 1, 1, line[: win.getmaxyx()[1] - 4]) # truncate long lines
+        _put(win, rows + 1, 0, MESSAGES_BORDER_BOTTOM)
+        win.noutrefresh()
+
+    # redraw the jobs pane only when a status line changed
+    def draw_jobs(self, lines):
+        if not self.jobs_win or lines == self.drawn_jobs:
+            return
+        self.drawn_jobs = lines
+        win = self.jobs_win
+        win.erase()
+        if lines:
+            _put(win, 0, 0, JOBS_BORDER_TOP)
+            for i, line in enumerate(lines[: win.getmaxyx()[0] - 1]):
+                _put(win, i + 1, 1, line)
+        win.noutrefresh()
 
-    # split screen based on history[0] (ascii art)
-    ascii_art_lines = history[0].split("\n") 
-    ascii_art_height = len(ascii_art_lines)
+    # blank the prompt rows left over from the last get_user_input
+    def clear_input(self):
+        if self.input_win:
+            self.input_win.erase()
+            self.input_win.noutrefresh()
 
-    # calc screen layout
-    menu_width = max_x // 3  # menu on left third
-    history_width = max_x - menu_width  # history on right two-thirds
+    # window that reads keys: the menu window, so stdscr (blank) is never refreshed over the regions
+    def key_window(self, stdscr):
+        win = self.menu_win or stdscr
+        win.keypad(True)
+        return win
+
+_layout = None
+
+# cached layout, rebuilt only for a new screen size, menu or art
+def _get_layout(stdscr, history, menu):
+    global _layout
+    if (_layout is None or _layout.size != stdscr.getmaxyx()
+            or _layout.menu != list(menu) or _layout.art != history.art):
+        _layout = _Layout(stdscr, history.art, menu)
+    return _layout
+
+# new window clipped to the screen, None when the region does not fit at all
+def _window(height, width, y, x, size):
+    max_y, max_x = size
+    height, width = min(height, max_y - y), min(width, max_x - x)
+    if height <= 0 or width <= 0 or y < 0:
+        return None
+    return curses.newwin(height, width, y, x)
+
+# addstr that clips to the window and ignores writes past its edge
+def _put(win, y, x, text, attr=curses.A_NORMAL):
+    max_y, max_x = win.getmaxyx()
+    if y >= max_y or x >= max_x:
+        return
+    try:
+        win.addstr(y, x, text[: max_x - x - 1], attr)
+    except curses.error:
+        pass # ignore screen boundary errs if window resized small
+
+# navigate menu and display history.
+# with a JobManager, background job progress is redrawn every JOBS_REFRESH_MS and 'c' cancels a job
+def menu_navigation(stdscr, menu, history, jobs=None):
+    current_row = 0
+    show_stats = False # 's' swaps the messages pane for the metrics panel
+    layout = _get_layout(stdscr, history, menu)
+    layout.clear_input()
 
     while True:
-        stdscr.clear() # clear screen for redraw
-
-        # display art at top, full width
-        for i, line in enumerate(ascii_art_lines):
-            try:
-                stdscr.addstr(i, 0, line[: max_x - 1]) # prevent writing past screen edge
-            except curses.error:
-                pass  # ignore screen boundary errs if window resized small
-
-        # display menu section (left side)
-        menu_start_y = ascii_art_height + 1 # below art
-        menu_border_top = " ╔═════Menu═════════════════════╗"
-        stdscr.addstr(menu_start_y, 0, menu_border_top)
-
-        for idx, row in enumerate(menu):
-            display_string = f"║ {row}" # menu item format
-            if idx == current_row: # highlight selected item
-                stdscr.attron(curses.color_pair(1))
-                stdscr.addstr(menu_start_y + idx + 1, 1, display_string) 
-                stdscr.attroff(curses.color_pair(1))
-            else:
-                stdscr.addstr(menu_start_y + idx + 1, 1, display_string)
-        
-        menu_border_bottom = " ╚══════════════════════════════╝"
-        stdscr.addstr(menu_start_y + len(menu) + 1, 0, menu_border_bottom)
-
-        # display messages section (right side)
-        messages_start_y = menu_start_y # align with menu
-        messages_border_top = "══════Messages══════════════════════════"
-        messages_border_bottom = "═════════════════════════════════════════" # border for messages
-
-        stdscr.addstr(messages_start_y, menu_width, messages_border_top)
-        stdscr.addstr(messages_start_y + len(menu) + 1, menu_width, messages_border_bottom)
-
-        # display history entries in messages section
-        max_history_lines = len(menu) # fit history display within menu height
-        # get relevant history slice (excluding art)
-        display_history = history[1 : max_history_lines + 1] if len(history) > 1 else []
-
-        for i, hist_entry in enumerate(display_history):
-            try:
-                truncated_entry = hist_entry[: history_width - 4] # truncate long lines
-                stdscr.addstr(messages_start_y + i + 1, menu_width + 1, truncated_entry)
-            except curses.error: # stop if run out of screen space
-                break  
-
-        stdscr.refresh() # update physical screen
-
-        key = stdscr.getch() # get user input for navigation
-        if key in [curses.KEY_UP, ord("k")]:
+        layout.set_highlight(current_row)
+        layout.draw_messages(history, show_stats)
+        if jobs:
+            layout.draw_jobs(jobs.status_lines())
+        curses.doupdate() # one write for everything that changed
+
+        key_window = layout.key_window(stdscr)
+        key_window.timeout(JOBS_REFRESH_MS if jobs else -1)
+        key = key_window.getch() # get user input for navigation, -1 when the refresh interval passed
+        if key == -1:
+            continue
+        if key == curses.KEY_RESIZE: # terminal resized, rebuild every region
+            layout = _get_layout(stdscr, history, menu)
+        elif key in [curses.KEY_UP, ord("k")]:
             current_row = (current_row - 1 + len(menu)) % len(menu) # navigate up, wrap
         elif key in [curses.KEY_DOWN, ord("j")]:
             current_row = (current_row + 1) % len(menu) # navigate down, wrap
+        elif key == ord("s"): # toggle stats panel
+            show_stats = not show_stats
+            layout.drawn_messages = None
+        elif key == ord("p"): # toggle profiling, one profile and allocation snapshot per action
+            _toggle_profiling(history)
+        elif key == ord("c") and jobs and jobs.active(): # cancel a background job
+            _cancel_job(stdscr, history, menu, jobs)
         elif key in [10, ord("\n")]:  # enter key selects
             # return index unless it's the "quit" option (last item)
-            return current_row if current_row != len(menu) - 1 else None 
+            return current_row if current_row != len(menu) - 1 else None
+
+# cancel the only running job, or ask which one when several are running
+def _cancel_job(stdscr, history, menu, jobs):
+    job_id = None
+    if len(jobs.active()) > 1:
+        answer = get_user_input(stdscr, "cancel job id (empty: newest): ", history, menu)
+        if answer and not answer.isdigit():
+            history.append(f"invalid job id: {answer}")
+            return
+        job_id = int(answer) if answer else None
+        _get_layout(stdscr, history, menu).clear_input()
+    job = jobs.cancel(job_id)
+    history.append(f"cancelling job {job.id}: {job.name}" if job else f"no running job {job_id}.")
+
+# switch profiling on or off, files go to $RSA_PROFILE or ./profiles
+def _toggle_profiling(history):
+    if profiler.toggle():
+        history.append(f"profiling on: a .prof and .snapshot per action in {profiler.output_dir}")
+    else:
+        history.append(f"profiling off, {profiler.written} profiles written to {profiler.output_dir}")
 
-# get user input with preserved layout
+# lines for the stats panel
+def _stats_lines():
+    if not metrics.enabled:
+        return ["metrics disabled (start with RSA_METRICS=1)"]
+    return metrics.summary_lines() or ["no operations recorded yet"]
+
+# get user input with preserved layout, only the prompt and changed messages are redrawn
 def get_user_input(stdscr, prompt, history, menu_items_for_layout): # added menu_items_for_layout
-    # manage history
-    history = manage_history(history)
-    max_y, max_x = stdscr.getmaxyx() # get current screen dimensions
-
-    ascii_art_lines = history[0].split("\n")
-    ascii_art_height = len(ascii_art_lines)
-
-    menu_width = max_x // 3
-    history_width = max_x - menu_width
-
-    input_prompt_y = max_y - 3 # position for prompt message
-    input_y = max_y - 2        # position for user input field
-
-    # clear previous prompt and input lines
-    stdscr.addstr(input_prompt_y, 0, " " * (max_x -1)) 
-    stdscr.addstr(input_y, 0, " " * (max_x-1))      
-
-    # display new prompt
-    stdscr.addstr(input_prompt_y, 0, prompt)
-
-    # redraw ascii art (to keep consistent view during input)
-    for i, line in enumerate(ascii_art_lines):
-        try:
-            stdscr.addstr(i, 0, line[: max_x - 1])
-        except curses.error:
-            pass # ignore errs if screen too small
-
-    # redraw menu section
-    menu_start_y = ascii_art_height + 1
-    stdscr.addstr(menu_start_y, 0, " ╔═════Menu═════════════════════╗")
-    for idx, row in enumerate(menu_items_for_layout): # use passed menu items
-        stdscr.addstr(menu_start_y + idx + 1, 1, f"║ {row}")
-    stdscr.addstr(menu_start_y + len(menu_items_for_layout) + 1, 0, " ╚══════════════════════════════╝")
-
-    # redraw messages section
-    messages_start_y = menu_start_y
-    stdscr.addstr(messages_start_y, menu_width, "══════Messages══════════════════════════")
-    stdscr.addstr(messages_start_y + len(menu_items_for_layout) + 1, menu_width, "═════════════════════════════════════════")
-
-    max_history_lines = len(menu_items_for_layout)
-    display_history = history[1 : max_history_lines + 1] if len(history) > 1 else []
-    for i, hist_entry in enumerate(display_history):
-        try:
-            truncated_entry = hist_entry[: history_width - 4]
-            stdscr.addstr(messages_start_y + i + 1, menu_width + 1, truncated_entry)
-        except curses.error:
-            break # stop if out of space
-    
-    stdscr.refresh() # update screen before getting input
+    layout = _get_layout(stdscr, history, menu_items_for_layout)
+    layout.set_highlight(None) # no selection while typing
+    layout.draw_messages(history)
+
+    win = layout.input_win or stdscr
+    win.erase() # clear previous prompt and input lines
+    _put(win, 0, 0, prompt)
+    win.noutrefresh()
+    curses.doupdate() # update screen before getting input
 
     curses.echo() # enable echoing characters
     curses.curs_set(1) # show cursor
 
-    stdscr.move(input_y, 0) # move cursor to input field
+    input_y = 1 if layout.input_win else stdscr.getmaxyx()[0] - 2
+    win.move(input_y, 0) # move cursor to input field
     # get string from user, limit length to screen width
-    user_input = stdscr.getstr(input_y, 0, max_x - 2).decode("utf-8").strip()
+    user_input = win.getstr(input_y, 0, max(1, win.getmaxyx()[1] - 2)).decode("utf-8").strip()
 
     curses.noecho() # disable echoing
     curses.curs_set(0) # hide cursor